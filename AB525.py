@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 
-from pycomm3 import CIPDriver, Services, SINT, INT
+from pycomm3 import Services, SINT, INT
 import struct
 import time
 from pymodbus.client import ModbusTcpClient
 import string
+from driveSession import ManagedSession, SessionUnavailable
+import metrics
+from paramCache import ParamCache, decode_read_basic, revision_key, ATTRIBUTE_READ_BASIC
+from pcccFrames import PCCCEncoder, check_reply, PCCC_SERVICE, PCCC_CLASS, CMD_START, CMD_STOP, CMD_RELEASE
+from implicitIO import IOConnection, IOConnectionError, DEFAULT_RPI
 
 # -------------------------------------------------------------
 # PowerFlex 525 Parameter Access via CIP Explicit Messaging
@@ -15,6 +20,80 @@ import string
 
 PF525_CLASS = 0x93
 PF525_ATTRIBUTE_VALUE = 3
+PF525_ATTRIBUTE_PARAM_VALUE = 9   # Attribute read by read_param / read_params
+
+PCCC_RETRIES = 3   # resends of a PCCC frame whose reply does not confirm it
+MAX_DESCRIPTORS_PER_PACKET = 10   # 40 byte Read Basic replies; stays inside a 500 byte connection
+IDENTITY_CLASS = 0x01
+
+# Parameters whose descriptors are loaded on connect (telemetry, nameplate, ramps, control, motor data)
+DESCRIPTOR_PARAMS = [1, 2, 3, 4, 5, 15, 31, 32, 33, 34, 35, 36, 37, 40, 41, 42, 44, 46, 47,
+                     501, 502, 503, 504]
+
+SPEED_WRITE_MAX_RATE = 5.0   # Hz, upper bound on speed reference writes while running
+
+# -------------------------------------------------------------
+# CIP Multiple Service Packet (service 0x0A to the Message Router)
+# Request data:  UINT count, UINT offsets[count], embedded requests
+# Reply data:    UINT count, UINT offsets[count], embedded replies
+# Offsets are measured from the start of the count field.
+# -------------------------------------------------------------
+
+MESSAGE_ROUTER_CLASS = 0x02
+SERVICE_MULTIPLE_SERVICE_PACKET = 0x0A
+SERVICE_GET_ATTRIBUTE_SINGLE = 0x0E
+SERVICE_SET_ATTRIBUTE_SINGLE = 0x10
+MAX_SERVICES_PER_PACKET = 32   # Keeps request/reply well inside a 500 byte connected message
+MAX_WRITES_PER_PACKET = 24     # Set Attribute Single carries ~14 bytes each, same 500 byte budget
+
+
+def build_logical_path(class_code, instance, attribute=None):
+    """
+    Encode a class/instance/attribute EPATH (8-bit or 16-bit logical segments).
+    Returns the path size in 16-bit words followed by the padded path bytes.
+    """
+    path = bytes([0x20, class_code])
+    if instance <= 0xFF:
+        path += bytes([0x24, instance])
+    else:
+        path += bytes([0x25, 0x00]) + struct.pack('<H', instance)
+    if attribute is not None:
+        path += bytes([0x30, attribute])
+    return bytes([len(path) // 2]) + path
+
+
+def build_multiple_service_request(requests):
+    """
+    Pack a list of (service, class_code, instance, attribute, data) tuples into
+    the request data of a single Multiple Service Packet.
+    """
+    embedded = [bytes([service]) + build_logical_path(class_code, instance, attribute) + data
+                for service, class_code, instance, attribute, data in requests]
+
+    count = len(embedded)
+    offset = 2 + 2 * count
+    header = struct.pack('<H', count)
+    for req in embedded:
+        header += struct.pack('<H', offset)
+        offset += len(req)
+    return header + b''.join(embedded)
+
+
+def parse_multiple_service_response(data):
+    """
+    Split the reply data of a Multiple Service Packet into a list of
+    (general_status, reply_data) tuples, in request order.
+    """
+    count = struct.unpack_from('<H', data, 0)[0]
+    offsets = struct.unpack_from(f'<{count}H', data, 2)
+    replies = []
+    for i, start in enumerate(offsets):
+        end = offsets[i + 1] if i + 1 < count else len(data)
+        status = data[start + 2]
+        ext_words = data[start + 3]
+        replies.append((status, bytes(data[start + 4 + 2 * ext_words:end])))
+    return replies
+
 
 PARAM_NUM = 41      # N41
 BIT_NUM = 1         # N41.1 → bit 1
@@ -49,47 +128,186 @@ class PowerFlex525:
     toggleState = False
     #speed = 0
 
-    def __init__(self, ip):
+    def __init__(self, ip, speedWriteRate=SPEED_WRITE_MAX_RATE):
         self.ip = ip
         self.drive_path = ip
         self.session = None
         self.speed = 0
         self.toggleState = False
+        self.pccc = PCCCEncoder()
+        self.io = None                 # IOConnection while in implicit I/O mode
+        self.paramCache = None
+        self.revisionKey = None
+        self.descriptors = {}          # param number -> ParamDescriptor for this drive's firmware
+        self.noDescriptor = set()      # parameters whose Read Basic the drive rejected
+
+        # Speed setpoint channel: setSpeed only records the latest value, flush_speed sends it
+        self.speedWriteRate = speedWriteRate
+        self.sentSpeed = None          # last speed reference confirmed by the drive
+        self.nextSpeedWrite = 0.0
+        self.speedWrites = 0
 
     def setSpeed(self, var):
-        #print(self.speed)
-        self.speed = var
-
-        if self.toggleState:
-            self.write_PCCC_param(self.toggleState)
-
-    def get_high_byte(self, value: int) -> str:
         """
-        Extracts the high byte (upper 8 bits) as an integer (0-255).
-        Example: 0x1234 (4660) -> 0x12 (18)
+        Set the speed setpoint (Hz). Never touches the network, so it is safe to call
+        from any thread as often as you like; rapid changes coalesce into the latest value.
         """
-        # Right shift 8 bits to move the top byte to the bottom
-
-        #print("High: ", bytes([((value * 100) >> 8 )& 0xFF]))
-        return bytes([((value * 100) >> 8 )& 0xFF])
+        self.speed = var
 
-    def get_low_byte(self, value: int) -> str:
+    def flush_speed(self):
         """
-        Extracts the low byte (lower 8 bits) as an integer (0-255).
-        Example: 0x1234 (4660) -> 0x34 (52)
+        Send the speed setpoint if the drive is running, the value changed since the last
+        confirmed write and at least 1 / speedWriteRate seconds have passed.
+        Call from the thread that owns the session. Returns True if a frame was sent.
         """
-        # Mask with 0xFF to keep only the bottom 8 bits
-        #print("Low: ", bytes([(value * 100)& 0xFF]))
-        return bytes([(value* 100)& 0xFF])
-
+        if not self.toggleState or self.speed == self.sentSpeed:
+            return False
+        now = time.monotonic()
+        if now < self.nextSpeedWrite:
+            return False
+        self.nextSpeedWrite = now + 1.0 / self.speedWriteRate
+        self.write_PCCC_speed()
+        return True
 
     def connect(self):
         print(f"Connecting to PowerFlex525 at {self.ip} ...")
-        self.session = CIPDriver(self.drive_path)
+        # Managed session: reconnects with backoff and replays the in-flight request after a drop
+        self.session = ManagedSession(self.drive_path)
         self.session.open()
         print("Connected.")
+        self.load_descriptors(DESCRIPTOR_PARAMS)
+
+    # -------------------------------------------------------------
+    # Parameter descriptors
+    # -------------------------------------------------------------
+
+    def read_revision_key(self):
+        """Product code + firmware revision from the Identity object, e.g. '150-7.1'."""
+        request_data = build_multiple_service_request([
+            (SERVICE_GET_ATTRIBUTE_SINGLE, IDENTITY_CLASS, 1, 3, b''),
+            (SERVICE_GET_ATTRIBUTE_SINGLE, IDENTITY_CLASS, 1, 4, b''),
+        ])
+        response = self.session.generic_message(
+            service=SERVICE_MULTIPLE_SERVICE_PACKET,
+            class_code=MESSAGE_ROUTER_CLASS,
+            instance=1,
+            request_data=request_data
+        )
+        (productStatus, product), (revisionStatus, revision) = parse_multiple_service_response(response.value)
+        if productStatus or revisionStatus:
+            raise ValueError(f"identity read failed, CIP status 0x{productStatus or revisionStatus:02x}")
+        return revision_key(struct.unpack_from('<H', product)[0], revision[0], revision[1])
+
+    def read_descriptors(self, param_numbers):
+        """Read DPI Read Basic for each parameter, batched. Parameters that fail are skipped."""
+        descriptors = []
+        param_numbers = list(param_numbers)
+        for first in range(0, len(param_numbers), MAX_DESCRIPTORS_PER_PACKET):
+            chunk = param_numbers[first:first + MAX_DESCRIPTORS_PER_PACKET]
+            request_data = build_multiple_service_request(
+                [(SERVICE_GET_ATTRIBUTE_SINGLE, PF525_CLASS, param, ATTRIBUTE_READ_BASIC, b'') for param in chunk]
+            )
+            response = self.session.generic_message(
+                service=SERVICE_MULTIPLE_SERVICE_PACKET,
+                class_code=MESSAGE_ROUTER_CLASS,
+                instance=1,
+                request_data=request_data
+            )
+            for param, (status, raw) in zip(chunk, parse_multiple_service_response(response.value)):
+                if status != 0:
+                    print(f"ERROR reading descriptor of parameter {param}: CIP status 0x{status:02x}")
+                    self.noDescriptor.add(param)
+                    continue
+                descriptors.append(decode_read_basic(param, raw))
+        return descriptors
+
+    def load_descriptors(self, param_numbers=(), cache=None):
+        """
+        Load this drive's parameter descriptors from the on-disk cache, reading (and
+        caching) any of param_numbers that are not there yet. Failures leave reads and
+        writes on the probing fallback, so a drive without Read Basic still works.
+        """
+        try:
+            self.paramCache = cache or self.paramCache or ParamCache()
+            revisionKey = self.read_revision_key()
+            if revisionKey != self.revisionKey:
+                self.noDescriptor = set()
+            self.revisionKey = revisionKey
+            self.descriptors = self.paramCache.descriptors(self.revisionKey)
+        except SessionUnavailable:
+            return False
+        except Exception as e:
+            print(f"ERROR loading parameter descriptors: {e}")
+            return False
+        return self.fetch_descriptors(param_numbers)
+
+    def fetch_descriptors(self, param_numbers):
+        """
+        Read and cache the descriptors of param_numbers that are not known yet, skipping
+        parameters the drive already rejected. Needs load_descriptors() to have identified
+        the firmware first. Returns False if reading failed.
+        """
+        if self.revisionKey is None:
+            return False
+        missing = [p for p in param_numbers if p not in self.descriptors and p not in self.noDescriptor]
+        if not missing:
+            return True
+        try:
+            descriptors = self.read_descriptors(missing)
+        except SessionUnavailable:
+            return False
+        except Exception as e:
+            print(f"ERROR loading parameter descriptors: {e}")
+            return False
+        if descriptors:
+            self.paramCache.update(self.revisionKey, descriptors)
+            self.paramCache.save()
+        return True
+
+    def descriptor(self, param_number):
+        """Descriptor for one parameter, read from the drive and cached on first use (None if unavailable)."""
+        desc = self.descriptors.get(param_number)
+        if desc is None:
+            self.fetch_descriptors([param_number])
+            desc = self.descriptors.get(param_number)
+        return desc
+
+    @property
+    def linkUp(self):
+        if self.io is not None:
+            return self.io.alive
+        return self.session is not None and self.session.connected
+
+    def keepalive(self):
+        if self.session:
+            self.session.keepalive()
+
+    def open_io(self, rpi=DEFAULT_RPI, **kwargs):
+        """
+        Switch to implicit I/O: telemetry and control go over a Class 1 connection at the
+        given RPI instead of explicit reads and PCCC writes. kwargs go to IOConnection.
+        """
+        host, _, port = self.ip.partition(":")
+        if port:
+            kwargs.setdefault("tcpPort", int(port))
+        io = IOConnection(host, rpi, **kwargs)
+        try:
+            io.open()
+        except (OSError, IOConnectionError) as e:
+            print(f"ERROR opening I/O connection to {self.ip}: {e}")
+            return False
+        io.set_output(CMD_RELEASE, self.speed)
+        self.io = io
+        print(f"I/O connection open, RPI {io.toApi * 1000:.1f} ms")
+        return True
+
+    def close_io(self):
+        io, self.io = self.io, None
+        if io is not None:
+            io.close()
 
     def disconnect(self):
+        self.close_io()
         if self.session:
             print("Closing connection...")
             self.session.close()
@@ -101,7 +319,15 @@ class PowerFlex525:
         session: open CIPDriver session
         param_number: parameter instance #
         value: numeric value to write (float or int)
+        Parameters with a cached descriptor are written once with the right encoding;
+        the probing below is only the fallback for drives without descriptors.
+        Returns True once the drive accepts one of the encodings, False if it took none
+        (or the request never reached it).
         """
+        if class_code == PF525_CLASS and attribute == PF525_ATTRIBUTE_PARAM_VALUE \
+                and self.descriptors.get(param_number) is not None:
+            return self.write_param(param_number, value)
+
         # 1) Read the current raw value so we know expected size/type
         try:
             read_resp = self.session.generic_message(
@@ -136,7 +362,7 @@ class PowerFlex525:
             candidates = [('REAL32', struct.pack('<f', float(value))),
                         ('INT16', struct.pack('<h', int(value)))]
 
-        # Attempt writes, show the response
+        # Attempt writes until the drive accepts one
         for tag, payload in candidates:
             try:
             #    print(f"[diag] Trying write as {tag}. payload={payload.hex()}")
@@ -173,10 +399,62 @@ class PowerFlex525:
             except Exception as e:
                 print(f"[diag] verify read failed after {tag}: {e}")
             """
+            if write_resp is not None and not getattr(write_resp, 'error', None):
+                return True
+        return False
+
     # -------------------------------------------------------------
     # Read parameter value
     # -------------------------------------------------------------
-    def read_param(self, param_number, divideBy = 1):
+    def write_param(self, param_number, value):
+        """
+        Write a raw parameter value in one request, encoded per the parameter's descriptor
+        and checked against its limits. Returns True on success.
+        """
+        desc = self.descriptor(param_number)
+        if desc is None:
+            return self.write_param_diagnostic(self.session, param_number, value)
+        if not desc.in_range(value):
+            print(f"ERROR writing parameter {param_number} ({desc.name}): {value} outside {desc.minimum}..{desc.maximum}")
+            return False
+        try:
+            response = self.session.generic_message(
+                service=Services.set_attribute_single,
+                class_code=PF525_CLASS,
+                instance=param_number,
+                attribute=PF525_ATTRIBUTE_PARAM_VALUE,
+                request_data=desc.encode(value)
+            )
+        except SessionUnavailable:
+            return False
+        except Exception as e:
+            print(f"ERROR writing parameter {param_number}: {e}")
+            return False
+        if getattr(response, 'error', None):
+            print(f"ERROR writing parameter {param_number}: {response.error}")
+            return False
+        return True
+
+    def read_param(self, param_number, divideBy = 1, default = 0):
+        desc = self.descriptors.get(param_number)
+        if desc is not None:
+            # Known encoding: decode the raw bytes directly instead of assuming INT
+            try:
+                response = self.session.generic_message(
+                    service=Services.get_attribute_single,
+                    class_code=PF525_CLASS,
+                    instance=param_number,
+                    attribute=PF525_ATTRIBUTE_PARAM_VALUE,
+                    data_type=None
+                )
+                return desc.decode(response.value) / divideBy
+            except SessionUnavailable:
+                return default
+            except Exception as e:
+                metrics.inc("param_read_errors_total", param=param_number)
+                print(f"ERROR reading parameter {param_number}: {e}")
+                return default
+
         try:
             response = self.session.generic_message(
                 service=Services.get_attribute_single,
@@ -199,56 +477,175 @@ class PowerFlex525:
             
             return val/divideBy
 
+        except SessionUnavailable:
+            return default
         except Exception as e:
+            metrics.inc("param_read_errors_total", param=param_number)
             print(f"ERROR reading parameter {param_number}: {e}")
-            return 0
+            return default
 
 
-    def read_PCCC_param(self, param_number):
-        try:
-            # Build a PCCC-style request payload that matches the captured message.
-            # Observed request pattern: 0x29 <param lo> <param hi> 0x00 0x00
+    def read_params(self, param_numbers, divideBy=1, default=0):
+        """
+        Read several parameters with one CIP Multiple Service Packet per
+        MAX_SERVICES_PER_PACKET instances instead of one round trip each.
+        divideBy is either one divisor for all parameters or a list matching param_numbers.
+        Returns the values in request order; failed reads return default (0 like read_param,
+        or pass default=None to tell failed reads apart from real zeros).
+        """
+        param_numbers = list(param_numbers)
+        if isinstance(divideBy, (list, tuple)):
+            divisors = list(divideBy)
+        else:
+            divisors = [divideBy] * len(param_numbers)
+
+        values = []
+        for first in range(0, len(param_numbers), MAX_SERVICES_PER_PACKET):
+            chunk = param_numbers[first:first + MAX_SERVICES_PER_PACKET]
+            request_data = build_multiple_service_request(
+                [(SERVICE_GET_ATTRIBUTE_SINGLE, PF525_CLASS, param, PF525_ATTRIBUTE_PARAM_VALUE, b'')
+                 for param in chunk]
+            )
+            try:
+                response = self.session.generic_message(
+                    service=SERVICE_MULTIPLE_SERVICE_PACKET,
+                    class_code=MESSAGE_ROUTER_CLASS,
+                    instance=1,
+                    request_data=request_data
+                )
+                replies = parse_multiple_service_response(response.value)
+                if len(replies) != len(chunk):
+                    raise ValueError(f"expected {len(chunk)} replies, got {len(replies)}")
+            except SessionUnavailable:
+                values.extend([None] * len(chunk))
+                continue
+            except Exception as e:
+                metrics.inc("param_read_errors_total", len(chunk), param="batch")
+                print(f"ERROR reading parameters {chunk}: {e}")
+                values.extend([None] * len(chunk))
+                continue
+
+            for param, (status, raw) in zip(chunk, replies):
+                if status != 0 or len(raw) < 2:
+                    metrics.inc("param_read_errors_total", param=param)
+                    print(f"ERROR reading parameter {param}: CIP status 0x{status:02x}")
+                    values.append(None)
+                else:
+                    desc = self.descriptors.get(param)
+                    if desc is not None and len(raw) >= desc.size:
+                        values.append(desc.decode(raw))
+                    else:
+                        # Same decoding as read_param (data_type=INT)
+                        values.append(struct.unpack_from('<h', raw)[0])
 
-            #For Start PCCCC
-            request_data = b"\x07\x4D\x00\xE8\x46\xF1\x30\x0F\x00\x32\x8B\x68\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x03\x00" # + struct.pack('<H', int(param_number)) + b"\x00\x00"
+        return [default if val is None else val / div for val, div in zip(values, divisors)]
 
+    def write_params(self, values):
+        """
+        Write several raw parameter values in the given order, with one Multiple Service
+        Packet per run of up to MAX_WRITES_PER_PACKET parameters. values is a list of
+        (param, value) pairs or a dict; each is encoded per its descriptor and values outside
+        the descriptor limits are not sent. Parameters without a descriptor keep the probing
+        fallback (write_param_diagnostic). Returns success flags in request order.
+        """
+        values = list(values.items() if isinstance(values, dict) else values)
+        self.fetch_descriptors([param for param, _ in values])
+
+        flags = [False] * len(values)
+        batch = []                      # (index, param, encoded value)
+        for i, (param, value) in enumerate(values):
+            desc = self.descriptors.get(param)
+            if desc is None:
+                # Flush what is queued first so the drive still sees the caller's order
+                self._write_batch(batch, flags)
+                batch = []
+                flags[i] = self.write_param_diagnostic(self.session, param, value)
+                continue
+            if not desc.in_range(value):
+                print(f"ERROR writing parameter {param} ({desc.name}): {value} outside {desc.minimum}..{desc.maximum}")
+                continue
+            try:
+                batch.append((i, param, desc.encode(value)))
+            except (struct.error, TypeError, ValueError) as e:
+                print(f"ERROR writing parameter {param}: {e}")
+                continue
+            if len(batch) == MAX_WRITES_PER_PACKET:
+                self._write_batch(batch, flags)
+                batch = []
+        self._write_batch(batch, flags)
+        return flags
+
+    def _write_batch(self, batch, flags):
+        """Send [(index, param, data)] as one Multiple Service Packet, setting flags[index] on success."""
+        if not batch:
+            return
+        request_data = build_multiple_service_request(
+            [(SERVICE_SET_ATTRIBUTE_SINGLE, PF525_CLASS, param, PF525_ATTRIBUTE_PARAM_VALUE, data)
+             for _, param, data in batch]
+        )
+        try:
             response = self.session.generic_message(
-                service=0x4b,            # CIP service used for this drive/capture
-                class_code=103,          # PCCC related class
+                service=SERVICE_MULTIPLE_SERVICE_PACKET,
+                class_code=MESSAGE_ROUTER_CLASS,
                 instance=1,
                 request_data=request_data
             )
+            replies = parse_multiple_service_response(response.value)
+            if len(replies) != len(batch):
+                raise ValueError(f"expected {len(batch)} replies, got {len(replies)}")
+        except SessionUnavailable:
+            return
+        except Exception as e:
+            print(f"ERROR writing parameters {[param for _, param, _ in batch]}: {e}")
+            return
 
-            raw = getattr(response, 'value', None)
-            print("[PCCC] raw response:", raw)
-
-            # If we received bytes, show a hex and int dump to mimic the capture view
-            if isinstance(raw, (bytes, bytearray)):
-                ints = list(raw)
-                hex_dump = ' '.join(f"{b:02x}" for b in ints)
-                print("[PCCC] bytes:", ints)
-                print("[PCCC] hex:", hex_dump)
+        for (i, param, _), (status, _) in zip(batch, replies):
+            if status != 0:
+                print(f"ERROR writing parameter {param}: CIP status 0x{status:02x}")
+            else:
+                flags[i] = True
 
-                # Try to interpret first 4 bytes as a little-endian REAL (float)
-                parsed_float = None
-                if len(raw) >= 4:
-                    try:
-                        parsed_float = struct.unpack('<f', raw[0:4])[0]
-                        print("[PCCC] float(first4):", parsed_float)
-                    except Exception:
-                        parsed_float = None
 
-                
-                # Return the raw bytes (callers can inspect) but also provide parsed_float
-                return {'raw': raw, 'ints': ints, 'hex': hex_dump, 'float': parsed_float}
+    def send_pccc(self, request_data, tns, retries=PCCC_RETRIES):
+        """
+        Send one Execute PCCC frame and confirm the reply echoes its TNS with STS 0.
+        Resends the same frame up to `retries` times; returns (ok, reply data).
+        """
+        for attempt in range(retries):
+            try:
+                response = self.session.generic_message(
+                    service=PCCC_SERVICE,
+                    class_code=PCCC_CLASS,
+                    instance=1,
+                    request_data=request_data
+                )
+            except SessionUnavailable:
+                return False, b""
+            except Exception as e:
+                print(f"ERROR sending PCCC frame: {e}")
+                continue
 
-            # Non-bytes response: return as-is
-            return raw
+            ok, sts, data = check_reply(getattr(response, 'value', None), tns)
+            if ok:
+                return True, data
+            metrics.inc("pccc_unconfirmed_total")
+            print(f"[PCCC] TNS {tns} not confirmed (STS {sts}), attempt {attempt + 1}/{retries}")
+        return False, b""
 
-        except Exception as e:
-            print(f"ERROR reading parameter {param_number}: {e}")
+    def read_PCCC_param(self, param_number):
+        # Typed read of the N41 control words: [command, unused, speed reference]
+        buffer, tns = self.pccc.typed_read("N41:0", 3)
+        ok, data = self.send_pccc(buffer, tns)
+        if not ok:
+            print(f"ERROR reading parameter {param_number}")
             return None
 
+        ints = list(data)
+        hex_dump = ' '.join(f"{b:02x}" for b in ints)
+        words = [w[0] for w in struct.iter_unpack('<h', data[:len(data) // 2 * 2])]
+        print("[PCCC] hex:", hex_dump)
+        return {'raw': data, 'ints': ints, 'hex': hex_dump, 'words': words}
+
 
     def printResponse(self, response):
             raw = getattr(response, 'value', None)
@@ -280,90 +677,47 @@ class PowerFlex525:
 
 
     def prepControls(self):
-
-        try:
-
-            prepControls1 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x03\xe9\x67\x00\x00\x01\x00\x00\x24\x4E\x34\x32\x3A\x33\x00\x99\x09\x03\x42\x05\x00" # + struct.pack('<H', int(param_number)) + b"\x00\x00"
-            prepControls2 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x03\xe9\x67\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x99\x09\x07\x42\x00\x00\x00\x00\x00\x00" #+ self.get_low_byte(self.speed) + self.get_high_byte(self.speed) # + struct.pack('<H', int(param_number)) + b"\x00\x00"
-
-            
-            response1 = self.session.generic_message(
-                    service=0x4b, #0x4b           # CIP service used for this drive/capture
-                    class_code=103,          # PCCC related class
-                    instance=1,
-                    request_data=prepControls1
-                )
-
-            response2 = self.session.generic_message(
-                    service=0x4b, #0x4b           # CIP service used for this drive/capture
-                    class_code=103,          # PCCC related class
-                    instance=1,
-                    request_data=prepControls2
-                )        
-
-            self.printResponse(response1)
-            self.printResponse(response2)
-            self.printResponse(response2)
-
-
-        except Exception as e:
-            print(f"ERROR reading parameter: {e}")
-            return None
+        # N42:3 = 5, then clear the N41 control words
+        buffer, tns = self.pccc.typed_write("N42:3", (5,))
+        ok1, _ = self.send_pccc(buffer, tns)
+        buffer, tns = self.pccc.control(CMD_RELEASE, 0)
+        ok2, _ = self.send_pccc(buffer, tns)
+        if not (ok1 and ok2):
+            print("ERROR preparing PCCC controls")
+        return ok1 and ok2
 
     def write_PCCC_param(self, toggleState):
-        print("Write param")
-        for i in range(20):
-
-            try:
-                # Build a PCCC-style request payload that matches the captured message.
-                # Observed request pattern: 0x29 <param lo> <param hi> 0x00 0x00
-
-                
-
-                if(toggleState):
-                #For Start PCCCC
-                    request_data1 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x6f\x91\x67\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x99\x09\x07\x42\x02\x00\x00\x00" + self.get_low_byte(self.speed) + self.get_high_byte(self.speed)  # + struct.pack('<H', int(param_number)) + b"\x00\x00"
-                    request_data2 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x6f\x91\x67\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x99\x09\x07\x42\x02\x00\x00\x00" + self.get_low_byte(self.speed) + self.get_high_byte(self.speed)  # + struct.pack('<H', int(param_number)) + b"\x00\x00"
-                    request_data3 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x6f\x91\x67\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x99\x09\x07\x42\x00\x00\x00\x00" + self.get_low_byte(self.speed) + self.get_high_byte(self.speed) 
-                else:
-                    request_data1 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x6f\x91\x67\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x99\x09\x07\x42\x09\x00\x00\x00" + self.get_low_byte(self.speed) + self.get_high_byte(self.speed) # + struct.pack('<H', int(param_number)) + b"\x00\x00"
-                    request_data2 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x6f\x91\x67\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x99\x09\x07\x42\x09\x00\x00\x00" + self.get_low_byte(self.speed) + self.get_high_byte(self.speed) # + struct.pack('<H', int(param_number)) + b"\x00\x00"
-                    request_data3 = b"\x07\x4D\x00\x31\x55\x8b\x09\x0f\x00\x6f\x91\x67\x00\x00\x03\x00\x00\x24\x4E\x34\x31\x3A\x30\x00\x99\x09\x07\x42\x00\x00\x00\x00" + self.get_low_byte(self.speed) + self.get_high_byte(self.speed) 
-                
-                self.toggleState = toggleState
-                response1 = self.session.generic_message(
-                    service=0x4b, #0x4b           # CIP service used for this drive/capture
-                    class_code=103,          # PCCC related class
-                    instance=1,
-                    request_data=request_data1
-                )
-
-                response2 = self.session.generic_message(
-                    service=0x4b, #0x4b           # CIP service used for this drive/capture
-                    class_code=103,          # PCCC related class
-                    instance=1,
-                    request_data=request_data2
-                )
-
-                response3 = self.session.generic_message(
-                    service=0x4b, #0x4b           # CIP service used for this drive/capture
-                    class_code=103,          # PCCC related class
-                    instance=1,
-                    request_data=request_data3
-                )
-
-                for i in range(10):
-                    self.printResponse(response1)  
-                    self.printResponse(response1) 
-                # self.printResponse(response1)   
-                    self.printResponse(response2)   
-                    self.printResponse(response3)       
-    
-    
-
-            except Exception as e:
-                print(f"ERROR reading parameter: {e}")
-                return None
+        """
+        Start (True) or stop (False) the drive at self.speed: one command frame followed
+        by one release frame, each confirmed by its reply before moving on.
+        """
+        self.toggleState = toggleState
+        if self.io is not None:
+            # The output image carries the same command word; hold it for a few packets
+            self.io.pulse(CMD_START if toggleState else CMD_STOP, self.speed, CMD_RELEASE)
+            self.sentSpeed = self.speed
+            return True
+        buffer, tns = self.pccc.control(CMD_START if toggleState else CMD_STOP, self.speed)
+        if not self.send_pccc(buffer, tns)[0]:
+            print(f"ERROR writing {'start' if toggleState else 'stop'} command")
+            return False
+        return self.write_PCCC_speed()
+
+    def write_PCCC_speed(self):
+        """Update the speed reference without a new start/stop command (single frame)."""
+        speed = self.speed
+        if self.io is not None:
+            self.io.set_output(CMD_RELEASE, speed)
+            self.sentSpeed = speed
+            return True
+        buffer, tns = self.pccc.control(CMD_RELEASE, speed)
+        ok, _ = self.send_pccc(buffer, tns)
+        self.speedWrites += 1
+        if ok:
+            self.sentSpeed = speed
+        else:
+            print("ERROR writing speed reference")
+        return ok
 
 
     def calibrate(self):
@@ -0,0 +1,162 @@
+"""
+Background acquisition engine for the PowerFlex525.
+
+The engine thread owns the drive session: it polls the telemetry parameters at a
+fixed, drift-compensated rate and runs any queued drive commands (speed changes,
+start/stop) between polls so the CIP session is only ever used from one thread.
+Speed setpoint changes are not queued: the engine flushes pf's coalesced setpoint
+once per poll, so an unchanged slider costs no drive traffic.
+Samples are published into a bounded deque which the Tk main loop drains.
+"""
+
+import collections
+import math
+import queue
+import threading
+import time
+
+import metrics
+from implicitIO import INPUT_FIELDS
+
+
+# Telemetry read every poll (parameter number, divisor)
+TELEMETRY_PARAMS = [4, 3, 15, 5]            # Output voltage, output current, RPM, DC bus voltage
+TELEMETRY_DIVISORS = [10, 100, 1, 1]
+
+DEFAULT_POLL_PERIOD = 0.05   # seconds
+DEFAULT_BUFFER_SIZE = 4096   # samples kept if the GUI falls behind
+
+
+class Sample:
+    """
+    One telemetry poll. timestamp is time.monotonic() when the request was sent and dt is
+    the time since the previous valid sample, so skipping invalid samples loses no time.
+    valid is False when any value failed to read (failed values are NaN, never 0);
+    stale is True when the link was down and no request reached the drive at all.
+    """
+
+    __slots__ = ("timestamp", "dt", "voltage", "current", "rpm", "busVoltage", "latency", "valid", "stale")
+
+    def __init__(self, timestamp, dt, voltage, current, rpm, busVoltage, latency, valid=True, stale=False):
+        self.timestamp = timestamp
+        self.dt = dt
+        self.voltage = voltage
+        self.current = current
+        self.rpm = rpm
+        self.busVoltage = busVoltage
+        self.latency = latency
+        self.valid = valid
+        self.stale = stale
+
+
+def read_sample(pf, prevTimestamp):
+    """Poll the telemetry parameters once. Returns the Sample (see Sample for the flags)."""
+    if pf.io is not None:
+        return read_io_sample(pf.io, prevTimestamp)
+
+    start = time.monotonic()
+    values = pf.read_params(TELEMETRY_PARAMS, TELEMETRY_DIVISORS, default=None)
+    end = time.monotonic()
+
+    valid = None not in values
+    voltage, current, rpm, busVoltage = [math.nan if v is None else v for v in values]
+    dt = 0.0 if prevTimestamp is None else start - prevTimestamp
+    return Sample(start, dt, voltage, current, rpm, busVoltage, end - start,
+                  valid=valid, stale=not valid and not pf.linkUp)
+
+
+def read_io_sample(io, prevTimestamp):
+    """
+    Sample the latest input image of an implicit I/O connection. No request is sent:
+    timestamp is when the image arrived and latency is how old it is.
+    """
+    now = time.monotonic()
+    latest = io.latest
+    if latest is None or not io.alive:
+        dt = 0.0 if prevTimestamp is None else now - prevTimestamp
+        return Sample(now, dt, math.nan, math.nan, math.nan, math.nan, 0.0, valid=False, stale=True)
+
+    arrived, values = latest
+    values = dict(zip(INPUT_FIELDS, values))
+    dt = 0.0 if prevTimestamp is None else arrived - prevTimestamp
+    return Sample(arrived, dt, values["voltage"], values["current"], values["rpm"], values["busVoltage"],
+                  now - arrived)
+
+
+class AcquisitionEngine(threading.Thread):
+
+    def __init__(self, pf, period=DEFAULT_POLL_PERIOD, bufferSize=DEFAULT_BUFFER_SIZE):
+        super().__init__(name=f"acquisition-{pf.ip}", daemon=True)
+        self.pf = pf
+        self.period = period
+
+        # deque.append / popleft are atomic, so producer and consumer need no lock.
+        # When full the oldest samples are dropped instead of blocking the poll loop.
+        self.samples = collections.deque(maxlen=bufferSize)
+        self.commands = queue.SimpleQueue()
+
+        self.overruns = 0
+        self.pollCount = 0
+        self.invalidCount = 0
+        self._stopEvent = threading.Event()
+
+    def submit(self, func, *args):
+        """Queue a drive call (e.g. pf.write_PCCC_param) to run on the engine thread before the next poll."""
+        self.commands.put((func, args))
+
+    def drain(self):
+        """Return every sample published since the last drain, oldest first."""
+        out = []
+        try:
+            while True:
+                out.append(self.samples.popleft())
+        except IndexError:
+            pass
+        return out
+
+    def stop(self, timeout=2.0):
+        self._stopEvent.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def _runCommands(self):
+        while True:
+            try:
+                func, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"ERROR running drive command {getattr(func, '__name__', func)}: {e}")
+
+    def run(self):
+        prevTimestamp = None
+        nextDeadline = time.monotonic()
+
+        while not self._stopEvent.is_set():
+            self._runCommands()
+            self.pf.flush_speed()
+
+            sample = read_sample(self.pf, prevTimestamp)
+            if sample.valid:
+                prevTimestamp = sample.timestamp
+            else:
+                self.invalidCount += 1
+                metrics.inc("poll_invalid_total")
+            self.samples.append(sample)
+            self.pollCount += 1
+            metrics.observe("poll_seconds", sample.latency)
+
+            # Deadlines advance by a fixed period so timer error does not accumulate.
+            # If the drive was too slow, skip the missed ticks but keep the original phase.
+            nextDeadline += self.period
+            delay = nextDeadline - time.monotonic()
+            if delay < 0:
+                missed = int(-delay // self.period) + 1
+                self.overruns += missed
+                metrics.inc("poll_overruns_total", missed)
+                nextDeadline += missed * self.period
+                delay = nextDeadline - time.monotonic()
+
+            self._stopEvent.wait(max(delay, 0))
@@ -0,0 +1,344 @@
+"""
+asyncio client for the PowerFlex525.
+
+EnipTransport is a non-blocking EtherNet/IP session: unconnected CIP requests go out as
+SendRRData and every request carries its own sender context, so any number of them can
+be written back to back without waiting for the previous reply (pipelining). One reader
+task matches replies to the waiting futures by context. maxOutstanding bounds the
+pipeline depth per session.
+
+AsyncPowerFlex525 mirrors the blocking PowerFlex525 calls on top of it, so one event loop
+can poll many drives (one transport each) with many requests in flight on each:
+
+    async with AsyncPowerFlex525("192.168.1.10") as pf:
+        freq, current = await asyncio.gather(pf.read_param(1, 100), pf.read_param(3, 100))
+"""
+
+import asyncio
+import itertools
+import struct
+
+import enipFrames
+import metrics
+from enipFrames import CMD_REGISTER_SESSION, CMD_UNREGISTER_SESSION, CMD_SEND_RR_DATA, ITEM_UNCONNECTED_DATA
+from AB525 import (PF525_CLASS, PF525_ATTRIBUTE_PARAM_VALUE, PCCC_RETRIES, MAX_SERVICES_PER_PACKET,
+                   MAX_DESCRIPTORS_PER_PACKET, IDENTITY_CLASS, MESSAGE_ROUTER_CLASS,
+                   SERVICE_MULTIPLE_SERVICE_PACKET, SERVICE_GET_ATTRIBUTE_SINGLE, SERVICE_SET_ATTRIBUTE_SINGLE,
+                   build_logical_path, build_multiple_service_request, parse_multiple_service_response)
+from paramCache import ParamCache, decode_read_basic, revision_key, ATTRIBUTE_READ_BASIC
+from pcccFrames import PCCCEncoder, check_reply, PCCC_SERVICE, PCCC_CLASS
+
+
+DEFAULT_TIMEOUT = 5.0
+MAX_OUTSTANDING = 16        # pipelined requests per session
+
+
+class CIPError(Exception):
+    """A CIP request completed with a non-zero general status."""
+
+    def __init__(self, status, ext=()):
+        super().__init__(f"CIP status 0x{status:02x}" + (f" ext {list(ext)}" if ext else ""))
+        self.status = status
+        self.ext = list(ext)
+
+
+class EnipTransport:
+    """One EtherNet/IP TCP session with pipelined unconnected (SendRRData) requests."""
+
+    def __init__(self, host, port=enipFrames.ENIP_TCP_PORT, timeout=DEFAULT_TIMEOUT,
+                 maxOutstanding=MAX_OUTSTANDING):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.session = 0
+        self._reader = None
+        self._writer = None
+        self._readTask = None
+        self._pending = {}                  # sender context -> future
+        self._contexts = itertools.count(1)
+        self._slots = asyncio.Semaphore(maxOutstanding)
+        self._openLock = asyncio.Lock()
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def open(self):
+        async with self._openLock:
+            if self.connected:
+                return
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+            try:
+                self._writer.write(enipFrames.encap(CMD_REGISTER_SESSION, struct.pack("<HH", 1, 0)))
+                _, session, status, _, _ = await asyncio.wait_for(self._read_encap(), self.timeout)
+                if status:
+                    raise ConnectionError(f"RegisterSession rejected, status 0x{status:x}")
+            except BaseException:
+                # Not connected until the session is registered, so the next request reopens
+                self._writer.close()
+                self._reader = self._writer = None
+                raise
+            self.session = session
+            self._readTask = asyncio.get_running_loop().create_task(self._read_loop())
+
+    async def close(self):
+        if self._writer is None:
+            return
+        writer, self._writer = self._writer, None
+        try:
+            writer.write(enipFrames.encap(CMD_UNREGISTER_SESSION, session=self.session))
+            writer.close()
+            await writer.wait_closed()
+        except (OSError, ConnectionError):
+            pass
+        if self._readTask is not None:
+            self._readTask.cancel()
+            self._readTask = None
+        self._fail_pending(ConnectionError("session closed"))
+
+    async def _read_encap(self):
+        header = await self._reader.readexactly(enipFrames.HEADER.size)
+        length = struct.unpack_from("<H", header, 2)[0]
+        return enipFrames.parse_encap(header + await self._reader.readexactly(length))
+
+    async def _read_loop(self):
+        try:
+            while True:
+                command, _, status, context, data = await self._read_encap()
+                future = self._pending.pop(context, None)
+                if future is None or future.done():
+                    continue            # reply to a request that already timed out
+                if status:
+                    future.set_exception(ConnectionError(f"encapsulation status 0x{status:x}"))
+                elif command != CMD_SEND_RR_DATA:
+                    future.set_exception(ConnectionError(f"unexpected reply command 0x{command:04x}"))
+                else:
+                    future.set_result(data)
+        except Exception as e:
+            # Link errors and unparseable replies alike: drop the link so the next request reopens it
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._fail_pending(ConnectionError(f"link to {self.host}:{self.port} lost ({e})"))
+
+    def _fail_pending(self, exc):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def request(self, service, path, data=b""):
+        """
+        Send one Message Router request and return its reply data. Raises CIPError on a
+        non-zero general status, ConnectionError / asyncio.TimeoutError on link problems.
+        The session is (re)opened on demand.
+        """
+        message = enipFrames.cip_request(service, path, bytes(data))
+        async with self._slots:
+            if not self.connected:
+                await self.open()
+            context = struct.pack("<Q", next(self._contexts))
+            future = asyncio.get_running_loop().create_future()
+            self._pending[context] = future
+            with metrics.timer("cip_request_seconds", service=f"0x{service:02X}", transport="async"):
+                self._writer.write(enipFrames.encap(
+                    CMD_SEND_RR_DATA, enipFrames.rr_data(message), self.session, context=context))
+                try:
+                    data = await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self._pending.pop(context, None)
+                    metrics.inc("cip_request_timeouts_total", transport="async")
+                    raise
+
+        items = dict(enipFrames.parse_cpf(data, 6))
+        _, status, ext, reply = enipFrames.parse_cip_reply(items.get(ITEM_UNCONNECTED_DATA, b"\x00\x00\x00\x00"))
+        if status:
+            raise CIPError(status, ext)
+        return reply
+
+
+def _path(class_code, instance, attribute=None):
+    """build_logical_path without the leading size byte (cip_request adds it)."""
+    return build_logical_path(class_code, instance, attribute)[1:]
+
+
+class AsyncPowerFlex525:
+
+    def __init__(self, ip, timeout=DEFAULT_TIMEOUT, maxOutstanding=MAX_OUTSTANDING):
+        self.ip = ip
+        host, _, port = ip.partition(":")
+        self.transport = EnipTransport(host, int(port) if port else enipFrames.ENIP_TCP_PORT,
+                                       timeout, maxOutstanding)
+        self.pccc = PCCCEncoder()
+        self.paramCache = None
+        self.revisionKey = None
+        self.descriptors = {}          # param number -> ParamDescriptor for this drive's firmware
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.disconnect()
+
+    async def connect(self, descriptorParams=()):
+        await self.transport.open()
+        if descriptorParams:
+            await self.load_descriptors(descriptorParams)
+
+    async def disconnect(self):
+        await self.transport.close()
+
+    @property
+    def linkUp(self):
+        return self.transport.connected
+
+    # -------------------------------------------------------------
+    # Parameter descriptors
+    # -------------------------------------------------------------
+
+    async def multiple_service(self, requests):
+        """One Multiple Service Packet; returns [(status, data)] in request order."""
+        reply = await self.transport.request(SERVICE_MULTIPLE_SERVICE_PACKET, _path(MESSAGE_ROUTER_CLASS, 1),
+                                             build_multiple_service_request(requests))
+        replies = parse_multiple_service_response(reply)
+        if len(replies) != len(requests):
+            raise ValueError(f"expected {len(requests)} replies, got {len(replies)}")
+        return replies
+
+    async def read_revision_key(self):
+        (productStatus, product), (revisionStatus, revision) = await self.multiple_service([
+            (SERVICE_GET_ATTRIBUTE_SINGLE, IDENTITY_CLASS, 1, 3, b''),
+            (SERVICE_GET_ATTRIBUTE_SINGLE, IDENTITY_CLASS, 1, 4, b''),
+        ])
+        if productStatus or revisionStatus:
+            raise CIPError(productStatus or revisionStatus)
+        return revision_key(struct.unpack_from('<H', product)[0], revision[0], revision[1])
+
+    async def load_descriptors(self, param_numbers=(), cache=None):
+        """Same as PowerFlex525.load_descriptors; the batched Read Basic packets are pipelined."""
+        try:
+            self.paramCache = cache or self.paramCache or ParamCache()
+            self.revisionKey = await self.read_revision_key()
+            self.descriptors = self.paramCache.descriptors(self.revisionKey)
+            missing = [p for p in param_numbers if p not in self.descriptors]
+            if not missing:
+                return True
+            chunks = [missing[i:i + MAX_DESCRIPTORS_PER_PACKET]
+                      for i in range(0, len(missing), MAX_DESCRIPTORS_PER_PACKET)]
+            results = await asyncio.gather(*(self.multiple_service(
+                [(SERVICE_GET_ATTRIBUTE_SINGLE, PF525_CLASS, p, ATTRIBUTE_READ_BASIC, b'') for p in chunk])
+                for chunk in chunks))
+            descriptors = []
+            for chunk, replies in zip(chunks, results):
+                for param, (status, raw) in zip(chunk, replies):
+                    if status != 0:
+                        print(f"ERROR reading descriptor of parameter {param}: CIP status 0x{status:02x}")
+                        continue
+                    descriptors.append(decode_read_basic(param, raw))
+            self.paramCache.update(self.revisionKey, descriptors)
+            self.paramCache.save()
+        except Exception as e:
+            print(f"ERROR loading parameter descriptors: {e}")
+            return False
+        return True
+
+    def _decode(self, param_number, raw):
+        desc = self.descriptors.get(param_number)
+        if desc is not None and len(raw) >= desc.size:
+            return desc.decode(raw)
+        return struct.unpack_from('<h', raw)[0]
+
+    # -------------------------------------------------------------
+    # Parameter access
+    # -------------------------------------------------------------
+
+    async def read_param(self, param_number, divideBy=1, default=0):
+        try:
+            raw = await self.transport.request(SERVICE_GET_ATTRIBUTE_SINGLE,
+                                               _path(PF525_CLASS, param_number, PF525_ATTRIBUTE_PARAM_VALUE))
+            return self._decode(param_number, raw) / divideBy
+        except Exception as e:
+            metrics.inc("param_read_errors_total", param=param_number)
+            print(f"ERROR reading parameter {param_number}: {e}")
+            return default
+
+    async def read_params(self, param_numbers, divideBy=1, default=0):
+        """
+        Like PowerFlex525.read_params, but every Multiple Service Packet of the batch is
+        in flight at once.
+        """
+        param_numbers = list(param_numbers)
+        if isinstance(divideBy, (list, tuple)):
+            divisors = list(divideBy)
+        else:
+            divisors = [divideBy] * len(param_numbers)
+
+        chunks = [param_numbers[i:i + MAX_SERVICES_PER_PACKET]
+                  for i in range(0, len(param_numbers), MAX_SERVICES_PER_PACKET)]
+        results = await asyncio.gather(*(self.multiple_service(
+            [(SERVICE_GET_ATTRIBUTE_SINGLE, PF525_CLASS, param, PF525_ATTRIBUTE_PARAM_VALUE, b'') for param in chunk])
+            for chunk in chunks), return_exceptions=True)
+
+        values = []
+        for chunk, replies in zip(chunks, results):
+            if isinstance(replies, Exception):
+                metrics.inc("param_read_errors_total", len(chunk), param="batch")
+                print(f"ERROR reading parameters {chunk}: {replies}")
+                values.extend([None] * len(chunk))
+                continue
+            for param, (status, raw) in zip(chunk, replies):
+                if status != 0 or len(raw) < 2:
+                    metrics.inc("param_read_errors_total", param=param)
+                    print(f"ERROR reading parameter {param}: CIP status 0x{status:02x}")
+                    values.append(None)
+                else:
+                    values.append(self._decode(param, raw))
+
+        return [default if val is None else val / div for val, div in zip(values, divisors)]
+
+    async def write_param(self, param_number, value):
+        """Write a raw value, encoded per the descriptor (INT without one). Returns True on success."""
+        desc = self.descriptors.get(param_number)
+        if desc is not None and not desc.in_range(value):
+            print(f"ERROR writing parameter {param_number} ({desc.name}): {value} outside {desc.minimum}..{desc.maximum}")
+            return False
+        data = desc.encode(value) if desc is not None else struct.pack('<h', int(round(value)))
+        try:
+            await self.transport.request(SERVICE_SET_ATTRIBUTE_SINGLE,
+                                         _path(PF525_CLASS, param_number, PF525_ATTRIBUTE_PARAM_VALUE), data)
+        except Exception as e:
+            print(f"ERROR writing parameter {param_number}: {e}")
+            return False
+        return True
+
+    # -------------------------------------------------------------
+    # PCCC
+    # -------------------------------------------------------------
+
+    async def send_pccc(self, request_data, tns, retries=PCCC_RETRIES):
+        """
+        Send one Execute PCCC frame and confirm the reply echoes its TNS with STS 0.
+        The frame is copied up front (PCCCEncoder reuses its buffers), so several frames
+        may be in flight. Returns (ok, reply data).
+        """
+        frame = bytes(request_data)
+        for attempt in range(retries):
+            try:
+                reply = await self.transport.request(PCCC_SERVICE, _path(PCCC_CLASS, 1), frame)
+            except Exception as e:
+                print(f"ERROR sending PCCC frame: {e}")
+                continue
+            ok, sts, data = check_reply(reply, tns)
+            if ok:
+                return True, data
+            metrics.inc("pccc_unconfirmed_total")
+            print(f"[PCCC] TNS {tns} not confirmed (STS {sts}), attempt {attempt + 1}/{retries}")
+        return False, b""
+
+    async def control(self, command, speed):
+        """Write the N41 command word and speed reference (Hz) in one PCCC frame."""
+        buffer, tns = self.pccc.control(command, speed)
+        ok, _ = await self.send_pccc(buffer, tns)
+        return ok
@@ -0,0 +1,385 @@
+"""
+Benchmarks for the drive I/O, thermal model and plotting hot paths.
+
+Drive benchmarks run against local DriveSimulator instances, so they need no hardware
+and give the same numbers on any machine with the same network settings. Every run
+writes one JSON file (metadata + one result dict per benchmark); compare two files
+to catch regressions between revisions.
+
+Usage:
+    python benchmarks.py --output before.json
+    python benchmarks.py --output after.json --latency 0.002 --jitter 0.0005
+    python benchmarks.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import temperatureCalculation
+from AB525 import PowerFlex525
+from acquisitionEngine import TELEMETRY_PARAMS, TELEMETRY_DIVISORS
+from driveSimulator import DriveSimulator
+from sampleStore import SampleStore
+
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_THRESHOLD = 0.10        # relative change counted as a regression
+SIM_PORT = 45818                # away from 44818 so a real drive / simulator can keep running
+
+HISTORY_LENGTHS = [1000, 10000, 36000]
+EXPORT_LENGTHS = [1000, 10000, 36000]
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def summarize(durations):
+    """Throughput and latency percentiles (ms) for a list of per-call durations in seconds."""
+    ordered = sorted(durations)
+    n = len(ordered)
+    total = sum(ordered)
+    return {
+        "calls": n,
+        "calls_per_s": n / total if total else math.inf,
+        "mean_ms": 1000 * total / n,
+        "p50_ms": 1000 * ordered[n // 2],
+        "p99_ms": 1000 * ordered[min(n - 1, int(n * 0.99))],
+        "max_ms": 1000 * ordered[-1],
+    }
+
+
+def time_calls(func, count, *args):
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class SimulatedDrive:
+    """Context manager: a DriveSimulator plus a connected PowerFlex525 pointed at it."""
+
+    def __init__(self, args):
+        self.sim = DriveSimulator(port=SIM_PORT, latency=args.latency, jitter=args.jitter,
+                                  loss=args.loss, seed=args.seed)
+
+    def __enter__(self):
+        self.sim.start()
+        self.pf = PowerFlex525(self.sim.path)
+        self.pf.connect()
+        self.pf.read_param(1)          # first request also does the Forward Open
+        return self.pf
+
+    def __exit__(self, *exc):
+        self.pf.disconnect()
+        self.sim.stop()
+
+
+# -------------------------------------------------------------
+# Drive I/O
+# -------------------------------------------------------------
+
+@benchmark
+def drive_read_param(args):
+    """Single parameter reads (one request each)."""
+    with SimulatedDrive(args) as pf:
+        return summarize(time_calls(pf.read_param, args.iterations, 3, 100))
+
+
+@benchmark
+def drive_read_params(args):
+    """The four telemetry parameters in one Multiple Service Packet."""
+    with SimulatedDrive(args) as pf:
+        result = summarize(time_calls(pf.read_params, args.iterations, TELEMETRY_PARAMS, TELEMETRY_DIVISORS))
+    result["params_per_s"] = result["calls_per_s"] * len(TELEMETRY_PARAMS)
+    return result
+
+
+@benchmark
+def drive_write_pccc(args):
+    """Start command (command + release frame), speed change (one frame) and an idle flush."""
+    with SimulatedDrive(args) as pf:
+        pf.prepControls()
+        count = max(args.iterations // 4, 10)
+        start = summarize(time_calls(pf.write_PCCC_param, count, True))
+
+        speeds = iter(range(1, count + 1))
+
+        def change():
+            pf.setSpeed(next(speeds))
+            pf.write_PCCC_speed()
+        speed = summarize(time_calls(change, count))
+
+        pf.nextSpeedWrite = 0.0
+        idle = summarize(time_calls(pf.flush_speed, count))
+        pf.write_PCCC_param(False)
+
+    return {"start": start, "speed_change": speed, "idle_flush": idle}
+
+
+@benchmark
+def drive_read_param_async(args):
+    """Single parameter reads through AsyncPowerFlex525, MAX_OUTSTANDING requests in flight."""
+    import asyncio
+    from asyncAB525 import AsyncPowerFlex525, MAX_OUTSTANDING
+
+    async def run_reads(sim):
+        async with AsyncPowerFlex525(sim.path) as pf:
+            await pf.read_param(3, 100)
+            start = time.perf_counter()
+            await asyncio.gather(*(pf.read_param(3, 100) for _ in range(args.iterations)))
+            return time.perf_counter() - start
+
+    sim = DriveSimulator(port=SIM_PORT, latency=args.latency, jitter=args.jitter, loss=args.loss, seed=args.seed)
+    sim.start()
+    try:
+        elapsed = asyncio.run(run_reads(sim))
+    finally:
+        sim.stop()
+    return {"calls": args.iterations, "pipeline_depth": MAX_OUTSTANDING,
+            "calls_per_s": args.iterations / elapsed, "mean_ms": 1000 * elapsed / args.iterations}
+
+
+# -------------------------------------------------------------
+# Thermal model
+# -------------------------------------------------------------
+
+@benchmark
+def thermal_update(args):
+    """TemperatureCalculation.UpdateParameters steps per second for each integrator."""
+    steps = args.iterations * 50
+    rng = random.Random(args.seed)
+    losses = [rng.uniform(0.0, 2.0) for _ in range(steps)]
+    result = {}
+    for integrator in temperatureCalculation.INTEGRATORS:
+        calc = temperatureCalculation.TemperatureCalculation()
+        calc.integrator = integrator
+        update = calc.UpdateParameters
+        start = time.perf_counter()
+        for loss in losses:
+            update(loss, 0.05)
+        elapsed = time.perf_counter() - start
+        result[integrator] = {"steps": steps, "steps_per_s": steps / elapsed}
+
+    # Vectorized replay of the same profile
+    timestamps = [i * 0.05 for i in range(steps)]
+    calc = temperatureCalculation.TemperatureCalculation()
+    start = time.perf_counter()
+    calc.ReplayRun(losses, timestamps)
+    result["replay"] = {"steps": steps, "steps_per_s": steps / (time.perf_counter() - start)}
+    return result
+
+
+# -------------------------------------------------------------
+# Plotting and export
+# -------------------------------------------------------------
+
+class _Value:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def get(self):
+        return self.rng.uniform(0.0, 100.0)
+
+
+class _GraphParent:
+    """Stands in for CalibrationGUI: every StringVar GraphWindow reads returns noise."""
+
+    def __init__(self, seed):
+        rng = random.Random(seed)
+        for name in ("voltage_var", "current_var", "rpm_var", "inputPower_var", "busVoltage_var",
+                     "outTorque_var", "outPower_var", "effi_var", "loss_var", "i2r_var",
+                     "speedLoss_var", "temp_var"):
+            setattr(self, name, _Value(rng))
+
+    def updateVariables(self):
+        pass
+
+
+@benchmark
+def graph_sample(args):
+    """GraphWindow.sample time per call with the history already holding N samples."""
+    import tkinter as tk
+    import menu_gui
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"skipped": f"no display ({e})"}
+    root.withdraw()
+
+    result = {}
+    try:
+        for history in HISTORY_LENGTHS:
+            window = menu_gui.GraphWindow(root, _GraphParent(args.seed))
+            window.running = True
+            window.redraw_full()
+            root.update()
+            # Prefill history as if the window had been sampling for a while
+            rng = random.Random(args.seed)
+            for i in range(history):
+                row = [i * 0.5] + [rng.uniform(0.0, 100.0) for _ in range(6)]
+                window.store.append(row)
+                for decimator, value in zip(window.decimators, row[1:]):
+                    decimator.add(row[0], value)
+            window.start_time = time.time() - history * 0.5
+            window.redraw_full()
+            root.update()
+
+            durations = []
+            for _ in range(max(args.iterations // 10, 20)):
+                start = time.perf_counter()
+                window.sample()
+                root.update_idletasks()
+                durations.append(time.perf_counter() - start)
+                root.after_cancel(window.after_id)
+            result[str(history)] = summarize(durations)
+            window.running = False
+            window.root.destroy()
+    finally:
+        root.destroy()
+    return result
+
+
+@benchmark
+def csv_export(args):
+    """GraphWindow's CSV export (write_samples_csv) time against sample count."""
+    from menu_gui import write_samples_csv
+
+    header = ["time_s", "p1", "p2", "p3", "I2R Losses", "Speed Losses", "Temperature"]
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.csv")
+        rng = random.Random(args.seed)
+        for count in EXPORT_LENGTHS:
+            store = SampleStore(header, count)
+            for i in range(count):
+                store.append([i * 0.5] + [rng.uniform(0.0, 100.0) for _ in range(6)])
+            durations = time_calls(write_samples_csv, 5, path, header, store)
+            result[str(count)] = {"export_ms": 1000 * statistics.median(durations),
+                                  "rows_per_s": count / statistics.median(durations),
+                                  "bytes": os.path.getsize(path)}
+    return result
+
+
+# -------------------------------------------------------------
+# Results
+# -------------------------------------------------------------
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    selected = [b for b in BENCHMARKS if not args.only or b.__name__ in args.only]
+    results = {}
+    for bench in selected:
+        print(f"Running {bench.__name__} ...", flush=True)
+        start = time.perf_counter()
+        try:
+            results[bench.__name__] = bench(args)
+        except Exception as e:
+            print(f"ERROR in {bench.__name__}: {e}")
+            results[bench.__name__] = {"error": str(e)}
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    return {
+        "meta": {
+            "revision": revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "loss": args.loss,
+        },
+        "results": results,
+    }
+
+
+def flatten(results, prefix=""):
+    """Nested result dicts to {"bench.sub.metric": value} for numeric metrics."""
+    out = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            out.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(before, after, threshold=DEFAULT_THRESHOLD):
+    """
+    Print every throughput (*_per_s, higher is better) and latency (*_ms, lower is better)
+    metric side by side. Returns the names of metrics that got worse by more than threshold.
+    """
+    old = flatten(before["results"])
+    new = flatten(after["results"])
+    regressions = []
+    print(f"{'metric':60s} {'before':>12s} {'after':>12s} {'change':>8s}")
+    for name in sorted(old.keys() & new.keys()):
+        if name.endswith("_per_s"):
+            higherBetter = True
+        elif name.endswith("_ms"):
+            higherBetter = False
+        else:
+            continue
+        a, b = old[name], new[name]
+        if not a or not math.isfinite(a) or not math.isfinite(b):
+            continue
+        change = (b - a) / a
+        worse = -change if higherBetter else change
+        flag = "  REGRESSION" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:60s} {a:12.3f} {b:12.3f} {change:+8.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark drive I/O, thermal model and plotting")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument("--only", nargs="*", help="benchmark names to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated drive reply delay (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="simulated +/- reply delay (s)")
+    parser.add_argument("--loss", type=float, default=0.0, help="simulated loss probability")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], "r", encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.compare[1], "r", encoding="utf-8") as f:
+            after = json.load(f)
+        regressions = compare(before, after, args.threshold)
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    report = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
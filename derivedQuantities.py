@@ -0,0 +1,169 @@
+"""
+Derived-quantity pipeline: everything computed from one telemetry sample, without Tk.
+
+A DerivedSample (a __slots__ record of floats) starts with the measured values, then the
+derived quantities are evaluated once each in dependency order. Each quantity is a plain
+function of the motor model and its inputs, registered with @derived:
+
+    voltage, current, rpm, busVoltage, measuredTorque, measuredSpeed, commandedFreq
+        -> torque, shaftSpeed -> shaftPower
+        -> inputPower -> efficiency, loss
+        -> i2r
+
+Pipeline.process() also steps the (stateful) thermal model with the sample's power loss
+and dt, so the record it returns holds every value the GUI shows or records. The GUI,
+headless runs and tests all share it.
+"""
+
+import graphlib
+import math
+
+
+# -------------------------------------------------------------
+# Sample record
+# -------------------------------------------------------------
+
+MEASURED_FIELDS = ("time", "dt", "voltage", "current", "rpm", "busVoltage",
+                   "measuredTorque", "measuredSpeed", "commandedFreq", "measuredTemp")
+THERMAL_FIELDS = ("deltaTemp", "timeConstant", "maxTempRise", "temperature")
+
+QUANTITIES = {}     # name -> (function, input names)
+
+
+def derived(*inputs):
+    """Register a derived quantity named after the function, computed from `inputs`."""
+    def register(func):
+        QUANTITIES[func.__name__] = (func, inputs)
+        return func
+    return register
+
+
+# -------------------------------------------------------------
+# Quantities (model is the TemperatureCalculation holding the motor constants)
+# -------------------------------------------------------------
+
+@derived("current", "measuredTorque")
+def torque(model, current, measuredTorque):
+    """Nm: transducer measurement when available, else TorqueConstant * current."""
+    if measuredTorque is not None and not math.isnan(measuredTorque):
+        return measuredTorque
+    return model.TorqueConstant * current
+
+
+@derived("rpm", "measuredSpeed")
+def shaftSpeed(model, rpm, measuredSpeed):
+    """RPM: transducer measurement when available, else the drive's output RPM."""
+    if measuredSpeed is not None and not math.isnan(measuredSpeed):
+        return measuredSpeed
+    return rpm
+
+
+@derived("torque", "shaftSpeed")
+def shaftPower(model, torque, shaftSpeed):
+    """kW"""
+    return torque * shaftSpeed / 9550
+
+
+@derived("voltage")
+def inputPower(model, voltage):
+    """kW"""
+    return voltage * voltage / 1000
+
+
+@derived("shaftPower", "inputPower")
+def efficiency(model, shaftPower, inputPower):
+    """Percent; 0 while there is no input power."""
+    if inputPower == 0:
+        return 0.0
+    return shaftPower / inputPower * 100
+
+
+@derived("inputPower", "shaftPower")
+def loss(model, inputPower, shaftPower):
+    """kW, heat fed to the thermal model."""
+    return inputPower - shaftPower
+
+
+@derived("current")
+def i2r(model, current):
+    """kW of stator copper loss."""
+    return current ** 2 * model.StatorResistance / 1000
+
+
+FIELDS = MEASURED_FIELDS + tuple(QUANTITIES) + THERMAL_FIELDS
+
+
+class DerivedSample:
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        for name in FIELDS:
+            setattr(self, name, values.get(name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+
+# Recording columns (File > Start Recording, headless runs): header, DerivedSample field
+RECORD_FIELDS = [
+    ("time_s", "time"), ("voltage_V", "voltage"), ("current_A", "current"), ("rpm", "rpm"),
+    ("input_power_kW", "inputPower"), ("bus_voltage_V", "busVoltage"), ("torque_Nm", "torque"),
+    ("shaft_power_kW", "shaftPower"), ("efficiency_pct", "efficiency"), ("power_loss_kW", "loss"),
+    ("i2r_kW", "i2r"), ("delta_temp_C", "deltaTemp"), ("time_constant", "timeConstant"),
+    ("max_temp_rise_C", "maxTempRise"), ("temperature_C", "temperature"), ("commanded_freq", "commandedFreq"),
+    ("measured_temp_C", "measuredTemp"),    # thermocouple, NaN when none is connected (thermalFit input)
+]
+RECORD_COLUMNS = [column for column, _ in RECORD_FIELDS]
+
+
+def record_row(record):
+    """DerivedSample -> tuple in RECORD_COLUMNS order."""
+    return tuple(getattr(record, field) for _, field in RECORD_FIELDS)
+
+
+# -------------------------------------------------------------
+# Pipeline
+# -------------------------------------------------------------
+
+class Pipeline:
+
+    def __init__(self, model, quantities=None):
+        self.model = model
+        quantities = QUANTITIES if quantities is None else quantities
+        # Resolve the evaluation order once; only derived quantities have dependencies to sort
+        graph = {name: [i for i in inputs if i in quantities] for name, (_, inputs) in quantities.items()}
+        self.steps = [(name,) + quantities[name] for name in graphlib.TopologicalSorter(graph).static_order()]
+        self.startTime = None
+
+    def reset(self):
+        self.startTime = None
+
+    def evaluate(self, record):
+        """Fill every derived quantity of record from its measured fields, in dependency order."""
+        model = self.model
+        for name, func, inputs in self.steps:
+            setattr(record, name, func(model, *[getattr(record, i) for i in inputs]))
+        return record
+
+    def process(self, sample, measuredTorque=None, measuredSpeed=None, commandedFreq=None, measuredTemp=None):
+        """
+        One acquisition Sample (valid) -> DerivedSample, stepping the thermal model by
+        sample.dt. time is seconds since the first processed sample. measuredTemp (degC,
+        e.g. a winding thermocouple) is only recorded; it is NaN when not measured.
+        """
+        if self.startTime is None:
+            self.startTime = sample.timestamp
+        record = DerivedSample(
+            time=sample.timestamp - self.startTime, dt=sample.dt, voltage=sample.voltage,
+            current=sample.current, rpm=sample.rpm, busVoltage=sample.busVoltage,
+            measuredTorque=measuredTorque, measuredSpeed=measuredSpeed, commandedFreq=commandedFreq,
+            measuredTemp=math.nan if measuredTemp is None else measuredTemp)
+        self.evaluate(record)
+
+        model = self.model
+        model.UpdateParameters(record.loss, sample.dt)
+        record.deltaTemp = model.currDeltaTemp
+        record.timeConstant = model.timeConstant
+        record.maxTempRise = model.maximumTemp
+        record.temperature = model.currentTemperature
+        return record
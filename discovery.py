@@ -0,0 +1,164 @@
+"""
+EtherNet/IP device discovery (ListIdentity over UDP).
+
+Every EtherNet/IP device answers a ListIdentity request on UDP 44818 with its vendor,
+product code, revision, serial number and product name. scan() sends the request as a
+broadcast on every local IPv4 network and, with sweep=True, also unicast to every host
+address of those networks (for switches / routers that drop broadcasts). All requests go
+out of one non-blocking socket, `parallel` at a time, and replies are collected until
+`timeout` after the last send, so a /24 takes about as long as the timeout.
+
+Results are cached for `ttl` seconds so repeated scans (e.g. reopening the picker) are
+instant:
+
+    finder = Discovery()
+    for device in finder.scan(sweep=True):
+        print(device.ip, device.productName, device.revision)
+"""
+
+import collections
+import ipaddress
+import select
+import socket
+import struct
+import subprocess
+import time
+
+import enipFrames
+from enipFrames import CMD_LIST_IDENTITY, ITEM_LIST_IDENTITY
+
+
+DEFAULT_TIMEOUT = 0.5       # seconds to wait for replies after the last request
+DEFAULT_TTL = 30.0          # seconds a discovered device stays cached
+DEFAULT_PARALLEL = 64       # unicast requests sent per burst
+BURST_GAP = 0.002           # seconds between bursts, keeps the switch / NIC queues short
+MAX_SWEEP_HOSTS = 1024      # larger networks are broadcast to but not swept
+
+ETHERNET_PREFIXES = ("eth", "en", "enp")
+
+# Identity item after the protocol version and sockaddr:
+# vendor, device type, product code, revision major/minor, status, serial
+IDENTITY = struct.Struct("<HHHBBHI")
+
+
+DiscoveredDevice = collections.namedtuple(
+    "DiscoveredDevice", "ip port vendor deviceType productCode revision serial productName seen")
+
+
+def parse_list_identity(data, addr):
+    """Devices in one ListIdentity reply; addr is the (ip, port) the reply came from."""
+    devices = []
+    for itemType, item in enipFrames.parse_cpf(data):
+        if itemType != ITEM_LIST_IDENTITY or len(item) < 18 + IDENTITY.size + 1:
+            continue
+        _, port = enipFrames.parse_sockaddr(item[2:18])
+        vendor, deviceType, productCode, major, minor, _, serial = IDENTITY.unpack_from(item, 18)
+        offset = 18 + IDENTITY.size
+        name = item[offset + 1:offset + 1 + item[offset]].decode("ascii", "replace")
+        devices.append(DiscoveredDevice(addr[0], port or addr[1], vendor, deviceType, productCode,
+                                        f"{major}.{minor}", serial, name, time.time()))
+    return devices
+
+
+def local_networks(prefixes=ETHERNET_PREFIXES):
+    """IPv4 networks of the local Ethernet interfaces as [(ifname, IPv4Interface)], via `ip -4 -o addr`."""
+    try:
+        out = subprocess.check_output(["ip", "-4", "-o", "addr"], stderr=subprocess.DEVNULL, text=True)
+    except (OSError, subprocess.SubprocessError):
+        return []
+    networks = []
+    for line in out.splitlines():
+        # "<idx>: <ifname>    inet <ip>/<prefix> brd ... scope global ..."
+        parts = line.split()
+        if len(parts) < 4 or "inet" not in parts:
+            continue
+        ifname = parts[1]
+        if prefixes and not ifname.startswith(prefixes):
+            continue
+        try:
+            networks.append((ifname, ipaddress.IPv4Interface(parts[parts.index("inet") + 1])))
+        except ValueError:
+            continue
+    return networks
+
+
+def list_identity(targets, port=enipFrames.ENIP_TCP_PORT, timeout=DEFAULT_TIMEOUT,
+                  parallel=DEFAULT_PARALLEL):
+    """
+    Send ListIdentity to every address in targets (broadcast or unicast) and collect the
+    replies. Returns {ip: DiscoveredDevice}.
+    """
+    request = enipFrames.encap(CMD_LIST_IDENTITY)
+    devices = {}
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.setblocking(False)
+
+        def collect(wait):
+            deadline = time.monotonic() + wait
+            while True:
+                remaining = deadline - time.monotonic()
+                readable, _, _ = select.select([sock], [], [], max(remaining, 0))
+                if not readable:
+                    if remaining <= 0:
+                        return
+                    continue
+                try:
+                    packet, addr = sock.recvfrom(1500)
+                    command, _, status, _, data = enipFrames.parse_encap(packet)
+                except (OSError, struct.error):
+                    continue
+                if command == CMD_LIST_IDENTITY and not status:
+                    for device in parse_list_identity(data, addr):
+                        devices[device.ip] = device
+
+        targets = list(targets)
+        for first in range(0, len(targets), parallel):
+            for target in targets[first:first + parallel]:
+                try:
+                    sock.sendto(request, (str(target), port))
+                except OSError:
+                    pass            # unreachable / no route for this address
+            collect(BURST_GAP)
+        collect(timeout)
+    return devices
+
+
+class Discovery:
+    """ListIdentity scanner with a TTL cache of the devices it has seen."""
+
+    def __init__(self, ttl=DEFAULT_TTL, timeout=DEFAULT_TIMEOUT, parallel=DEFAULT_PARALLEL,
+                 port=enipFrames.ENIP_TCP_PORT):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.parallel = parallel
+        self.port = port
+        self._devices = {}          # ip -> DiscoveredDevice
+        self._scanned = {}          # (sweep, networks) -> time of the last scan
+
+    def devices(self):
+        """Cached devices seen within the TTL, sorted by IP."""
+        now = time.time()
+        self._devices = {ip: d for ip, d in self._devices.items() if now - d.seen < self.ttl}
+        return sorted(self._devices.values(), key=lambda d: ipaddress.IPv4Address(d.ip))
+
+    def scan(self, sweep=False, networks=None, refresh=False):
+        """
+        Discover devices on networks (IPv4Network / CIDR strings, default: the local
+        Ethernet networks). Repeating a scan within the TTL returns the cache unless refresh.
+        """
+        if networks is None:
+            networks = [iface.network for _, iface in local_networks()]
+        networks = [ipaddress.IPv4Network(n, strict=False) for n in networks]
+        key = (sweep, tuple(networks))
+        if not refresh and time.time() - self._scanned.get(key, 0.0) < self.ttl:
+            return self.devices()
+
+        targets = ["255.255.255.255"] + [str(n.broadcast_address) for n in networks if n.prefixlen < 31]
+        if sweep:
+            for network in networks:
+                if network.num_addresses <= MAX_SWEEP_HOSTS:
+                    targets.extend(network.hosts())
+        self._devices.update(list_identity(targets, self.port, self.timeout, self.parallel))
+        self._scanned[key] = time.time()
+        return self.devices()
@@ -0,0 +1,187 @@
+"""
+Drive configuration transfer: bulk parameter download / upload for a PowerFlex525.
+
+A configuration is a {parameter number: raw value} dict, raw meaning drive units
+(e.g. 1234 for 12.34 A on a two-decimal parameter). apply() reads the drive's current
+values in batched reads, writes only the parameters that differ in batched Multiple
+Service Packets and verifies the result with one more batched read, so commissioning a
+bench drive costs a handful of round trips instead of a write + read-back per parameter.
+
+Full drive images are stored in a compact binary file:
+    magic, creation time, revision key (length-prefixed UTF-8), record count,
+    then one (UINT parameter, float64 raw value) record per parameter
+"""
+
+import os
+import struct
+import time
+
+
+IMAGE_MAGIC = b"CXDRV1\x00\x00"
+IMAGE_RECORD = struct.Struct("<Hd")
+
+# P031 (Motor NP Volts) is the first programmable parameter; 1-30 are read-only displays
+FIRST_CONFIG_PARAM = 31
+LAST_PARAM = 700
+CONFIG_PARAMS = range(FIRST_CONFIG_PARAM, LAST_PARAM + 1)
+
+# Start sequence configuration: P044 Maximum Freq (raw) plus the motor nameplate / model
+# parameters as (parameter, motor profile key, scale from engineering units to raw)
+MAXIMUM_FREQ = (44, 15000)
+MOTOR_PARAMS = [
+    (31, "npVolts", 1), (32, "npHz", 1), (33, "olCurrent", 10), (34, "npFla", 10),
+    (35, "numPoles", 1), (36, "npRpm", 1), (37, "npPower", 100),
+    (501, "irVolt", 100), (502, "ixdVolt", 100), (503, "ixqVolt", 100), (504, "bemf", 10),
+]
+
+
+class DriveImage:
+    """Parameter values captured from (or destined for) one drive."""
+
+    def __init__(self, values, revisionKey=None, created=None):
+        self.values = dict(values)
+        self.revisionKey = revisionKey
+        self.created = time.time() if created is None else created
+
+    def save(self, path):
+        key = (self.revisionKey or "").encode("utf-8")
+        body = b"".join(IMAGE_RECORD.pack(param, value) for param, value in sorted(self.values.items()))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(IMAGE_MAGIC + struct.pack("<dH", self.created, len(key)) + key
+                    + struct.pack("<H", len(self.values)) + body)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(IMAGE_MAGIC):
+            raise ValueError(f"{path} is not a drive image")
+        offset = len(IMAGE_MAGIC)
+        created, keyLength = struct.unpack_from("<dH", data, offset)
+        offset += 10
+        revisionKey = data[offset:offset + keyLength].decode("utf-8") or None
+        offset += keyLength
+        count = struct.unpack_from("<H", data, offset)[0]
+        offset += 2
+        if len(data) < offset + count * IMAGE_RECORD.size:
+            raise ValueError(f"{path} is truncated")
+        values = {}
+        for param, value in IMAGE_RECORD.iter_unpack(data[offset:offset + count * IMAGE_RECORD.size]):
+            values[param] = int(value) if value.is_integer() else value
+        return cls(values, revisionKey, created)
+
+
+class ConfigResult:
+    """Outcome of DriveConfigurator.apply(); truthy when every parameter verified."""
+
+    def __init__(self, changed, failed, mismatched):
+        self.changed = changed          # parameters that were written
+        self.failed = failed            # writes the drive rejected
+        self.mismatched = mismatched    # {param: (wanted, read back)} after verification
+
+    def __bool__(self):
+        return not self.failed and not self.mismatched
+
+    def __repr__(self):
+        return (f"ConfigResult(changed={self.changed}, failed={self.failed}, "
+                f"mismatched={self.mismatched})")
+
+
+class DriveConfigurator:
+
+    def __init__(self, pf):
+        self.pf = pf
+
+    def raw(self, param, value):
+        """
+        Normalize a value to what the drive stores: rounded to an integer, or for REAL
+        parameters rounded to float32, so 0.1 compares equal to the 0.1 read back.
+        """
+        desc = self.pf.descriptors.get(param)
+        if desc is not None and desc.format == "f":
+            return struct.unpack("<f", struct.pack("<f", float(value)))[0]
+        return int(round(value))
+
+    def read(self, params):
+        """Current raw values of params as a dict; parameters that could not be read are left out."""
+        params = list(params)
+        values = self.pf.read_params(params, 1, None)
+        return {param: self.raw(param, value) for param, value in zip(params, values) if value is not None}
+
+    def diff(self, desired, current=None):
+        """{param: (current, desired)} for every parameter whose drive value differs (or is unreadable)."""
+        if current is None:
+            current = self.read(desired)
+        changes = {}
+        for param, value in desired.items():
+            value = self.raw(param, value)
+            if current.get(param) != value:
+                changes[param] = (current.get(param), value)
+        return changes
+
+    def verify(self, desired):
+        """{param: (wanted, read back)} for every parameter that does not hold its desired value."""
+        return {param: (wanted, actual) for param, (actual, wanted) in self.diff(desired).items()}
+
+    def apply(self, desired):
+        """Write the parameters of desired that differ from the drive, then verify all of them."""
+        desired = {param: self.raw(param, value) for param, value in desired.items()}
+        changes = self.diff(desired)
+        if not changes:
+            return ConfigResult([], [], {})
+
+        # Caller's order: some writes depend on earlier ones (P044 Maximum Freq goes first)
+        writes = [(param, wanted) for param, (_, wanted) in changes.items()]
+        flags = self.pf.write_params(writes)
+        failed = [param for (param, _), ok in zip(writes, flags) if not ok]
+        mismatched = {param: v for param, v in self.verify(desired).items() if param not in failed}
+        return ConfigResult([param for param, _ in writes], failed, mismatched)
+
+    # -------------------------------------------------------------
+    # Drive images
+    # -------------------------------------------------------------
+
+    def upload(self, params=CONFIG_PARAMS):
+        """
+        Read every parameter in params from the drive into a DriveImage. Parameters the
+        drive has no descriptor for are left out: without one INT, UINT and REAL values
+        cannot be told apart, and a guessed decoding would be written back on download.
+        """
+        params = list(params)
+        self.pf.fetch_descriptors(params)
+        known = [param for param in params if param in self.pf.descriptors]
+        if len(known) < len(params):
+            print(f"WARNING {len(params) - len(known)} parameter(s) without a descriptor left out of the drive image")
+        return DriveImage(self.read(known), self.pf.revisionKey)
+
+    def download(self, image):
+        """Apply a DriveImage to the drive; only parameters that differ are written."""
+        if image.revisionKey and self.pf.revisionKey and image.revisionKey != self.pf.revisionKey:
+            print(f"WARNING drive image is from {image.revisionKey}, drive is {self.pf.revisionKey}")
+        return self.apply(image.values)
+
+
+def motor_config(motor):
+    """{parameter: raw value} for the start sequence from a dict of nameplate values keyed as in MOTOR_PARAMS."""
+    config = dict([MAXIMUM_FREQ])
+    for param, key, scale in MOTOR_PARAMS:
+        config[param] = float(motor[key]) * scale
+    return config
+
+
+def start_drive(pf, config):
+    """
+    Configure the drive (writing only what differs, verified with one batched read), then
+    send the start command sequence. Call from the thread that owns the session.
+    """
+    result = DriveConfigurator(pf).apply(config)
+    if not result:
+        print(f"ERROR configuring drive: {result}")
+
+    pf.prepControls()
+    pf.write_PCCC_param(True)
+    pf.write_PCCC_param(False)
+    pf.write_PCCC_param(True)
+    return result
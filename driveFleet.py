@@ -0,0 +1,219 @@
+"""
+Fleet manager for polling many PowerFlex525 drives from one process.
+
+A single scheduler thread keeps a heap of per-drive deadlines and hands due polls to a
+bounded thread pool, so dozens of drives share a handful of worker threads instead of
+one thread each. Each drive has at most one request in flight (a CIP session is not
+shared between threads); a drive that is still busy when its next poll is due counts an
+overrun and is rescheduled on its original phase.
+
+All samples land in one merged deque of (drive name, Sample) tuples.
+"""
+
+import collections
+import heapq
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from AB525 import PowerFlex525
+from acquisitionEngine import read_sample
+import metrics
+
+
+DEFAULT_WORKERS = 8
+DEFAULT_BUFFER_SIZE = 65536
+
+
+class FleetDrive:
+    """Per-drive state owned by the fleet."""
+
+    def __init__(self, name, pf, period):
+        self.name = name
+        self.pf = pf
+        self.period = period
+        self.commands = queue.SimpleQueue()
+        self.busy = False
+        self.closing = False
+        self.connected = False
+        self.prevTimestamp = None
+        self.pollCount = 0
+        self.overruns = 0
+        self.invalidCount = 0
+
+
+class DriveFleet:
+
+    def __init__(self, workers=DEFAULT_WORKERS, bufferSize=DEFAULT_BUFFER_SIZE):
+        self.drives = {}
+        self.samples = collections.deque(maxlen=bufferSize)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet")
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def add_drive(self, name, ip, period=0.05, pf=None):
+        """Register a drive; it is connected and polled once the fleet is started."""
+        drive = FleetDrive(name, pf or PowerFlex525(ip), period)
+        with self._lock:
+            self.drives[name] = drive
+            heapq.heappush(self._heap, (time.monotonic(), name))
+        self._wake.set()
+        return drive
+
+    def remove_drive(self, name):
+        """
+        Stop polling a drive. While the scheduler runs, a worker runs its queued commands
+        and disconnects it once no poll is in flight; only then is it dropped.
+        """
+        with self._lock:
+            drive = self.drives.get(name)
+            if drive is None:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                del self.drives[name]
+                running = False
+            else:
+                drive.closing = True
+                heapq.heappush(self._heap, (time.monotonic(), name))
+                running = True
+        if running:
+            self._wake.set()
+        elif drive.connected:
+            drive.pf.disconnect()
+
+    def submit(self, name, func, *args):
+        """Queue a call (e.g. pf.write_PCCC_param) to run on the drive's session before its next poll."""
+        self.drives[name].commands.put((func, args))
+
+    def set_speed(self, name, speed):
+        """Update a drive's speed setpoint; it is sent with the drive's next poll if it changed."""
+        self.drives[name].pf.setSpeed(speed)
+
+    def drain(self):
+        """Return every (drive name, Sample) published since the last drain, oldest first."""
+        out = []
+        try:
+            while True:
+                out.append(self.samples.popleft())
+        except IndexError:
+            pass
+        return out
+
+    def start(self):
+        self._thread = threading.Thread(target=self._schedule, name="fleet-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopEvent.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=True)
+        for drive in self.drives.values():
+            if drive.connected:
+                drive.pf.disconnect()
+
+    def stats(self):
+        return {name: {"polls": d.pollCount, "overruns": d.overruns, "invalid": d.invalidCount,
+                       "linkUp": d.pf.linkUp, "period": d.period}
+                for name, d in self.drives.items()}
+
+    # -------------------------------------------------------------
+    # Scheduler thread
+    # -------------------------------------------------------------
+
+    def _schedule(self):
+        while not self._stopEvent.is_set():
+            with self._lock:
+                if not self._heap:
+                    delay = None
+                else:
+                    deadline, name = self._heap[0]
+                    delay = deadline - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        self._dispatch(deadline, name)
+                        continue
+
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _dispatch(self, deadline, name):
+        # Called with the lock held
+        drive = self.drives.get(name)
+        if drive is None:
+            return
+        if drive.closing and not drive.busy:
+            del self.drives[name]
+            drive.busy = True
+            self._pool.submit(self._close, drive)
+            return
+
+        nextDeadline = deadline + drive.period
+        now = time.monotonic()
+        if nextDeadline < now:
+            missed = int((now - nextDeadline) // drive.period) + 1
+            drive.overruns += missed
+            metrics.inc("poll_overruns_total", missed, drive=name)
+            nextDeadline += missed * drive.period
+        heapq.heappush(self._heap, (nextDeadline, name))
+
+        if drive.busy:
+            if not drive.closing:
+                drive.overruns += 1
+                metrics.inc("poll_overruns_total", drive=name)
+            return
+        drive.busy = True
+        self._pool.submit(self._poll, drive)
+
+    # -------------------------------------------------------------
+    # Worker threads
+    # -------------------------------------------------------------
+
+    def _run_commands(self, drive):
+        while True:
+            try:
+                func, args = drive.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"ERROR running command on {drive.name}: {e}")
+
+    def _close(self, drive):
+        try:
+            if drive.connected:
+                self._run_commands(drive)
+                drive.pf.disconnect()
+                drive.connected = False
+        except Exception as e:
+            print(f"ERROR disconnecting {drive.name}: {e}")
+
+    def _poll(self, drive):
+        try:
+            if not drive.connected:
+                # After a failed first connect the managed session keeps retrying with backoff
+                drive.connected = True
+                drive.pf.connect()
+
+            self._run_commands(drive)
+            drive.pf.flush_speed()
+
+            sample = read_sample(drive.pf, drive.prevTimestamp)
+            if sample.valid:
+                drive.prevTimestamp = sample.timestamp
+            else:
+                drive.invalidCount += 1
+                metrics.inc("poll_invalid_total", drive=drive.name)
+            drive.pollCount += 1
+            metrics.observe("poll_seconds", sample.latency, drive=drive.name)
+            self.samples.append((drive.name, sample))
+        except Exception as e:
+            print(f"ERROR polling {drive.name}: {e}")
+        finally:
+            drive.busy = False
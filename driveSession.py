@@ -0,0 +1,161 @@
+"""
+Managed CIP session for a PowerFlex525.
+
+ManagedSession is a drop-in replacement for the pycomm3 CIPDriver used as
+PowerFlex525.session (it exposes the same generic_message call) that survives link
+drops:
+  - a request that fails with a communication error tears the connection down,
+    reconnects immediately and replays that in-flight request once
+  - further failures back off exponentially between reconnect attempts; while
+    waiting, requests fail fast with SessionUnavailable instead of blocking
+  - keepalive() sends a cheap Identity read when the session has been idle
+"""
+
+import time
+
+from pycomm3 import CIPDriver, CommError, Services
+
+import metrics
+
+
+IDENTITY_CLASS = 0x01
+PARAMETER_CLASS = 0x93
+
+DEFAULT_KEEPALIVE_INTERVAL = 5.0   # seconds idle before keepalive() sends a request
+DEFAULT_BACKOFF_INITIAL = 0.5      # seconds before the second reconnect attempt
+DEFAULT_BACKOFF_MAX = 30.0
+
+
+def request_labels(kwargs):
+    """Metric labels for a generic_message call: service, class and the parameter number."""
+    service = kwargs.get("service")
+    if isinstance(service, (bytes, bytearray)):
+        service = service[0]
+    classCode = kwargs.get("class_code")
+    labels = {"service": f"0x{service:02X}", "class": f"0x{classCode:02X}"}
+    if classCode == PARAMETER_CLASS:
+        labels["param"] = kwargs.get("instance")
+    return labels
+
+
+class SessionUnavailable(Exception):
+    """The link is down and the next reconnect attempt is not due yet."""
+
+
+class ManagedSession:
+
+    def __init__(self, path, keepaliveInterval=DEFAULT_KEEPALIVE_INTERVAL,
+                 backoffInitial=DEFAULT_BACKOFF_INITIAL, backoffMax=DEFAULT_BACKOFF_MAX,
+                 driverFactory=CIPDriver):
+        self.path = path
+        self.keepaliveInterval = keepaliveInterval
+        self.backoffInitial = backoffInitial
+        self.backoffMax = backoffMax
+        self.driverFactory = driverFactory
+
+        self.driver = None
+        self.connected = False
+        self.failures = 0
+        self.reconnects = 0
+        self.nextAttempt = 0.0
+        self.lastActivity = 0.0
+
+    def open(self):
+        """Initial connection; raises if the drive cannot be reached (later requests keep retrying)."""
+        try:
+            self._connect()
+        except Exception as e:
+            self._drop(e)
+            raise
+        return True
+
+    def close(self):
+        self.nextAttempt = float("inf")   # no reconnects after an explicit close
+        self._closeDriver()
+
+    def _closeDriver(self):
+        driver, self.driver = self.driver, None
+        self.connected = False
+        if driver is not None:
+            try:
+                driver.close()
+            except Exception:
+                pass
+
+    def _connect(self):
+        driver = self.driverFactory(self.path)
+        driver.open()
+        self.driver = driver
+        self.connected = True
+        self.failures = 0
+        self.lastActivity = time.monotonic()
+
+    def _drop(self, reason):
+        self._closeDriver()
+        metrics.inc("session_drops_total", drive=self.path)
+        # First failure retries straight away, then 0.5 s, 1 s, 2 s ... up to backoffMax
+        delay = 0.0 if self.failures == 0 else min(self.backoffInitial * 2 ** (self.failures - 1), self.backoffMax)
+        self.failures += 1
+        self.nextAttempt = time.monotonic() + delay
+        print(f"Link to {self.path} lost ({reason}); next reconnect in {delay:.1f}s")
+
+    def _ensure(self):
+        if self.connected:
+            return
+        now = time.monotonic()
+        if now < self.nextAttempt:
+            raise SessionUnavailable(f"{self.path} offline, reconnect in {self.nextAttempt - now:.1f}s")
+        try:
+            self._connect()
+        except Exception as e:
+            self._drop(e)
+            raise SessionUnavailable(f"reconnect to {self.path} failed: {e}") from e
+        self.reconnects += 1
+        metrics.inc("session_reconnects_total", drive=self.path)
+        print(f"Reconnected to {self.path}")
+
+    def generic_message(self, **kwargs):
+        if not metrics.REGISTRY.enabled:
+            return self._generic_message(**kwargs)
+
+        labels = request_labels(kwargs)
+        try:
+            with metrics.timer("cip_request_seconds", **labels):
+                response = self._generic_message(**kwargs)
+        except SessionUnavailable:
+            metrics.inc("cip_unavailable_total", **labels)
+            raise
+        if getattr(response, 'error', None):
+            metrics.inc("cip_request_errors_total", **labels)
+        return response
+
+    def _generic_message(self, **kwargs):
+        self._ensure()
+        try:
+            response = self.driver.generic_message(**kwargs)
+        except (CommError, OSError) as e:
+            self._drop(e)
+            # Replay the request that was in flight when the link dropped
+            self._ensure()
+            try:
+                response = self.driver.generic_message(**kwargs)
+            except (CommError, OSError) as e2:
+                self._drop(e2)
+                raise SessionUnavailable(f"{self.path} offline: {e2}") from e2
+
+        self.lastActivity = time.monotonic()
+        return response
+
+    def keepalive(self):
+        """Read the Identity vendor ID if nothing has been sent for keepaliveInterval seconds."""
+        if self.connected and time.monotonic() - self.lastActivity < self.keepaliveInterval:
+            return
+        try:
+            self.generic_message(
+                service=Services.get_attribute_single,
+                class_code=IDENTITY_CLASS,
+                instance=1,
+                attribute=1,
+            )
+        except SessionUnavailable:
+            pass
@@ -0,0 +1,809 @@
+"""
+Local PowerFlex525 stand-in for hardware-free testing and benchmarking.
+
+DriveSimulator is an EtherNet/IP adapter that answers the same traffic the real drive
+gets from this project, so PowerFlex525 (pycomm3 CIPDriver underneath), the
+acquisition engine, the fleet and the implicit I/O mode all run against it unchanged:
+  - RegisterSession / ListIdentity (TCP and UDP) / SendRRData / SendUnitData
+  - Forward Open / Large Forward Open / Forward Close, class 3 (explicit) and
+    class 1 (cyclic UDP I/O on the assemblies, layout from implicitIO)
+  - Identity object (0x01), Multiple Service Packet (0x0A), DPI parameter object
+    (0x93, attribute 9 get/set), Execute PCCC (0x4B to 0x67: typed read/write of N
+    files) and assembly data (0x04, attribute 3)
+
+Behind the parameters sits a small drive/motor model: accel/decel ramp to the speed
+reference, V/Hz output voltage, load dependent current and slip, DC bus sag and a
+first-order winding temperature.
+
+The network can be made worse on purpose: every reply is delayed by latency +/- jitter;
+with probability `loss` a TCP reply is held back an extra retransmission timeout (TCP
+itself never loses data) and a UDP I/O packet is dropped.
+
+Usage:
+    python driveSimulator.py --count 20 --latency 0.002 --jitter 0.001 --loss 0.01
+then point PowerFlex525 at "127.0.0.1:44818", "127.0.0.1:44819", ...
+"""
+
+import argparse
+import math
+import random
+import select
+import socket
+import struct
+import threading
+import time
+
+import enipFrames
+from enipFrames import (ENIP_TCP_PORT, CMD_LIST_IDENTITY, CMD_REGISTER_SESSION, CMD_UNREGISTER_SESSION,
+                        CMD_SEND_RR_DATA, CMD_SEND_UNIT_DATA, ITEM_LIST_IDENTITY, ITEM_NULL,
+                        ITEM_UNCONNECTED_DATA, ITEM_CONNECTED_ADDRESS, ITEM_CONNECTED_DATA,
+                        ITEM_SEQUENCED_ADDRESS, ITEM_SOCKADDR_O_T, ITEM_SOCKADDR_T_O)
+from implicitIO import (INPUT_ASSEMBLY, OUTPUT_ASSEMBLY, INPUT_FORMAT, OUTPUT_FORMAT,
+                        SERVICE_FORWARD_OPEN, SERVICE_FORWARD_CLOSE, ASSEMBLY_CLASS)
+from pcccFrames import CMD_PROTECTED, FNC_TYPED_WRITE, FNC_TYPED_READ
+
+
+RETRANSMIT_DELAY = 0.2      # seconds a "lost" TCP reply is held back (typical minimum RTO)
+
+SERVICE_GET_ATTRIBUTES_ALL = 0x01
+SERVICE_MULTIPLE_SERVICE_PACKET = 0x0A
+SERVICE_GET_ATTRIBUTE_SINGLE = 0x0E
+SERVICE_SET_ATTRIBUTE_SINGLE = 0x10
+SERVICE_EXECUTE_PCCC = 0x4B
+SERVICE_LARGE_FORWARD_OPEN = 0x5B
+
+IDENTITY_CLASS = 0x01
+MESSAGE_ROUTER_CLASS = 0x02
+CONNECTION_MANAGER_CLASS = 0x06
+PCCC_CLASS = 0x67
+PARAMETER_CLASS = 0x93
+PARAMETER_ATTRIBUTE_DESCRIPTOR = 8
+PARAMETER_ATTRIBUTE_VALUE = 9
+PARAMETER_ATTRIBUTE_READ_BASIC = 13
+PARAMETER_ATTRIBUTE_NAME = 14
+
+STATUS_SUCCESS = 0x00
+STATUS_CONNECTION_FAILURE = 0x01
+STATUS_PATH_UNKNOWN = 0x05
+STATUS_SERVICE_NOT_SUPPORTED = 0x08
+STATUS_INVALID_VALUE = 0x09
+STATUS_NOT_ENOUGH_DATA = 0x13
+STATUS_ATTRIBUTE_NOT_SUPPORTED = 0x14
+STATUS_TOO_MUCH_DATA = 0x15
+STATUS_EMBEDDED_SERVICE_ERROR = 0x1E
+
+PCCC_STS_ILLEGAL_COMMAND = 0x10
+
+VENDOR_ID = 0x0001
+DEVICE_TYPE = 0x007B
+PRODUCT_CODE = 0x0096
+REVISION = (7, 1)
+PRODUCT_NAME = b"PowerFlex 525 (simulated)"
+
+PARAMETER_COUNT = 700
+
+# DPI descriptor: INT (UINT type 3 + signed bit 3) with decimal places in bits 8-11
+DESCRIPTOR_INT = 0x000B
+
+# Parameter number -> (name, units, decimal places, minimum, maximum); others are plain INTs
+PARAMETER_INFO = {
+    1: ("Output Freq", "Hz", 2, 0, 32767),
+    2: ("Commanded Freq", "Hz", 2, 0, 32767),
+    3: ("Output Current", "A", 2, 0, 32767),
+    4: ("Output Voltage", "V", 1, 0, 32767),
+    5: ("DC Bus Voltage", "VDC", 0, 0, 1200),
+    15: ("Output RPM", "RPM", 0, 0, 24000),
+    24: ("Drive Temp", "degC", 0, -40, 150),
+    31: ("Motor NP Volts", "V", 0, 20, 600),
+    32: ("Motor NP Hertz", "Hz", 0, 15, 500),
+    33: ("Mtr OL Current", "A", 2, 0, 32767),
+    34: ("Motor NP FLA", "A", 2, 0, 32767),
+    35: ("Motor NP Poles", "", 0, 2, 40),
+    36: ("Motor NP RPM", "RPM", 0, 0, 24000),
+    37: ("Motor NP Power", "kW", 2, 0, 32767),
+    40: ("Autotune", "", 0, 0, 2),
+    41: ("Accel Time 1", "Secs", 2, 0, 32767),
+    42: ("Decel Time 1", "Secs", 2, 1, 32767),
+    44: ("Maximum Freq", "Hz", 2, 0, 32767),
+    46: ("Start Source 1", "", 0, 1, 5),
+    47: ("Speed Reference1", "", 0, 1, 16),
+    501: ("IR Voltage Drop", "V", 2, 0, 32767),
+    502: ("Flux Current Ref", "A", 2, 0, 32767),
+    503: ("Ixq Voltage Drop", "V", 2, 0, 32767),
+    504: ("BEMF Voltage", "V", 1, 0, 32767),
+}
+
+# Logic command / status bits (N41:0 and the output assembly share the command word)
+LOGIC_STOP = 0x0001
+LOGIC_START = 0x0002
+STATUS_READY = 0x0001
+STATUS_ACTIVE = 0x0002
+STATUS_AT_REFERENCE = 0x0100
+
+FORWARD_OPEN = struct.Struct("<BBIIHHIB3xIHIHB")
+LARGE_FORWARD_OPEN = struct.Struct("<BBIIHHIB3xIIIIB")
+FORWARD_CLOSE = struct.Struct("<BBHHIBx")
+
+
+def parse_path(path):
+    """Decode logical segments into a dict with class / instance / attribute / points."""
+    out = {"points": []}
+    pos = 0
+    while pos < len(path):
+        segment = path[pos]
+        kind = {0x20: "class", 0x24: "instance", 0x2C: "point", 0x30: "attribute"}.get(segment & 0xFC)
+        if kind is None:
+            break
+        if segment & 0x03 == 0:
+            value = path[pos + 1]
+            pos += 2
+        else:
+            value = struct.unpack_from("<H", path, pos + 2)[0]
+            pos += 4
+        if kind == "point":
+            out["points"].append(value)
+        else:
+            out[kind] = value
+    return out
+
+
+def cip_reply(service, status=STATUS_SUCCESS, data=b""):
+    return bytes([service | 0x80, 0, status, 0]) + data
+
+
+# -------------------------------------------------------------
+# Drive / motor model
+# -------------------------------------------------------------
+
+class DriveModel:
+    """
+    Parameters hold raw INT values exactly like the drive (e.g. P41 accel time is
+    seconds * 100). advance() integrates the motor up to `now` before every access.
+    """
+
+    NAMEPLATE_VOLTS = 31
+    NAMEPLATE_HZ = 32
+    NAMEPLATE_FLA = 34
+    NAMEPLATE_POLES = 35
+    NAMEPLATE_RPM = 36
+    ACCEL_TIME = 41
+    DECEL_TIME = 42
+
+    STATOR_RESISTANCE = 0.6         # ohm per phase
+    MAGNETIZING_CURRENT = 0.35      # fraction of FLA at no load
+    THERMAL_CAPACITY = 4.0          # kJ / K
+    THERMAL_DISSIPATION = 0.02      # kW / K
+    BUS_STIFFNESS = 1.5             # DC bus volts lost per output amp
+
+    def __init__(self, load=0.6, ambient=25.0, seed=None):
+        self.params = {n: 0 for n in range(1, PARAMETER_COUNT + 1)}
+        self.params.update({
+            self.NAMEPLATE_VOLTS: 230, self.NAMEPLATE_HZ: 60, 33: 360, self.NAMEPLATE_FLA: 360,
+            self.NAMEPLATE_POLES: 4, self.NAMEPLATE_RPM: 1750, 37: 75,
+            self.ACCEL_TIME: 1000, self.DECEL_TIME: 1000, 46: 5, 47: 15,
+        })
+        self.defaults = dict(self.params)
+        self.files = {}                     # PCCC N file words: (file, element) -> word
+        self.load = load                    # torque at base speed, fraction of rated
+        self.ambient = ambient
+        self.running = False
+        self.reference = 0.0                # Hz
+        self.frequency = 0.0                # Hz
+        self.tempRise = 0.0                 # K above ambient
+        self.lastUpdate = time.monotonic()
+        self.lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.advance(self.lastUpdate)
+
+    def command(self, word, reference=None):
+        """Apply a logic command word (stop wins over start, 0 keeps the state)."""
+        if word & LOGIC_STOP:
+            self.running = False
+        elif word & LOGIC_START:
+            self.running = True
+        if reference is not None:
+            self.reference = max(reference, 0.0)
+
+    def advance(self, now):
+        dt = now - self.lastUpdate
+        self.lastUpdate = now
+        p = self.params
+        baseHz = p[self.NAMEPLATE_HZ] or 60
+
+        # Accel/decel ramp: P41/P42 are seconds (x100) from 0 to base frequency
+        target = self.reference if self.running else 0.0
+        rampTime = (p[self.ACCEL_TIME] if target > self.frequency else p[self.DECEL_TIME]) / 100.0
+        step = baseHz * dt / rampTime if rampTime > 0 else abs(target - self.frequency)
+        if abs(target - self.frequency) <= step:
+            self.frequency = target
+        else:
+            self.frequency += math.copysign(step, target - self.frequency)
+
+        speed = self.frequency / baseHz
+        loadFraction = self.load * speed * speed            # fan-like load
+        fla = p[self.NAMEPLATE_FLA] / 100.0
+        current = fla * math.hypot(self.MAGNETIZING_CURRENT, loadFraction) if self.frequency > 0 else 0.0
+        current *= 1 + self._rng.gauss(0, 0.01)
+        voltage = p[self.NAMEPLATE_VOLTS] * min(speed, 1.0)
+
+        poles = p[self.NAMEPLATE_POLES] or 4
+        syncRpm = 120.0 * self.frequency / poles
+        ratedSlip = 120.0 * baseHz / poles - p[self.NAMEPLATE_RPM]
+        rpm = max(syncRpm - ratedSlip * loadFraction, 0.0)
+
+        bus = p[self.NAMEPLATE_VOLTS] * math.sqrt(2) - self.BUS_STIFFNESS * current + self._rng.gauss(0, 0.5)
+
+        # Winding temperature: copper loss in, dissipation to ambient out (exact step)
+        loss = 3 * current * current * self.STATOR_RESISTANCE / 1000.0
+        tau = self.THERMAL_CAPACITY / self.THERMAL_DISSIPATION
+        steady = loss / self.THERMAL_DISSIPATION
+        self.tempRise = steady + (self.tempRise - steady) * math.exp(-dt / tau)
+
+        self.current = current
+        p[1] = int(round(self.frequency * 100))
+        p[2] = int(round(self.reference * 100))
+        p[3] = int(round(current * 100))
+        p[4] = int(round(voltage * 10))
+        p[5] = int(round(bus))
+        p[15] = int(round(rpm))
+        p[24] = int(round(self.ambient + self.tempRise))   # reported temperature
+
+    def status_word(self):
+        word = STATUS_READY
+        if self.running:
+            word |= STATUS_ACTIVE
+        if abs(self.frequency - (self.reference if self.running else 0.0)) < 0.01:
+            word |= STATUS_AT_REFERENCE
+        return word
+
+    def input_image(self):
+        p = self.params
+        return INPUT_FORMAT.pack(self.status_word(), p[1] & 0xFFFF, p[3], p[4], p[5], p[15])
+
+    def write_file(self, fileNumber, element, words):
+        for i, word in enumerate(words):
+            self.files[(fileNumber, element + i)] = word
+        if fileNumber == 41 and element == 0:
+            # N41 control file: [command word, unused, speed reference (Hz * 100)]
+            reference = self.files.get((41, 2), 0) / 100.0
+            self.command(self.files.get((41, 0), 0), reference)
+
+    def read_file(self, fileNumber, element, count):
+        return [self.files.get((fileNumber, element + i), 0) for i in range(count)]
+
+
+# -------------------------------------------------------------
+# Connections
+# -------------------------------------------------------------
+
+class ExplicitConnection:
+    __slots__ = ("otConnId", "toConnId", "serial")
+
+    def __init__(self, otConnId, toConnId, serial):
+        self.otConnId = otConnId
+        self.toConnId = toConnId
+        self.serial = serial
+
+
+class IOConnection:
+    """Class 1 connection as seen by the adapter."""
+
+    __slots__ = ("otConnId", "toConnId", "serial", "rpi", "timeout", "address", "nextProduce",
+                 "sequence", "count", "lastConsumed")
+
+    def __init__(self, otConnId, toConnId, serial, rpi, timeout, address):
+        self.otConnId = otConnId
+        self.toConnId = toConnId
+        self.serial = serial
+        self.rpi = rpi
+        self.timeout = timeout
+        self.address = address
+        self.nextProduce = time.monotonic()
+        self.sequence = 0
+        self.count = 0
+        self.lastConsumed = time.monotonic()
+
+
+# -------------------------------------------------------------
+# Adapter
+# -------------------------------------------------------------
+
+class DriveSimulator:
+
+    def __init__(self, host="127.0.0.1", port=ENIP_TCP_PORT, latency=0.0, jitter=0.0, loss=0.0,
+                 load=0.6, serial=None, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.serial = serial if serial is not None else random.randint(1, 0xFFFFFFFF)
+        self.model = DriveModel(load=load, seed=seed)
+        self._rng = random.Random(seed)
+
+        self._tcp = None
+        self._udp = None            # ListIdentity on the encapsulation port
+        self._io = None             # class 1 I/O, ephemeral port advertised in the Forward Open reply
+        self._threads = []
+        self._stopEvent = threading.Event()
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._explicit = {}
+        self._ioConnections = {}
+        self._nextConnId = random.randint(1, 0x7FFFFFFF)
+
+        self.requests = 0
+        self.ioPacketsIn = 0
+        self.ioPacketsOut = 0
+        self.ioDropped = 0
+
+    @property
+    def path(self):
+        """CIPDriver / PowerFlex525 path for this simulator."""
+        return f"{self.host}:{self.port}"
+
+    def start(self):
+        self._tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._tcp.bind((self.host, self.port))
+        self.port = self._tcp.getsockname()[1]
+        self._tcp.listen(16)
+        self._tcp.settimeout(0.2)
+
+        self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._udp.bind((self.host, self.port))
+
+        self._io = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._io.bind((self.host, 0))
+
+        for target, name in ((self._accept, "accept"), (self._udpLoop, "udp"), (self._ioLoop, "io")):
+            thread = threading.Thread(target=target, name=f"sim-{self.port}-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopEvent.set()
+        for sock in (self._tcp, self._udp, self._io):
+            if sock is not None:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+        for thread in self._threads:
+            thread.join(1.0)
+        self._threads = []
+
+    def stats(self):
+        return {"requests": self.requests, "ioIn": self.ioPacketsIn, "ioOut": self.ioPacketsOut,
+                "ioDropped": self.ioDropped, "ioConnections": len(self._ioConnections),
+                "frequency": self.model.frequency, "running": self.model.running}
+
+    def _delay(self):
+        delay = self.latency
+        if self.jitter:
+            delay += self._rng.uniform(-self.jitter, self.jitter)
+        if self.loss and self._rng.random() < self.loss:
+            delay += RETRANSMIT_DELAY
+        if delay > 0:
+            time.sleep(delay)
+
+    def _newConnId(self):
+        with self._lock:
+            self._nextConnId = self._nextConnId % 0xFFFFFFFF + 1
+            return self._nextConnId
+
+    # ---------------------------------------------------------
+    # TCP encapsulation
+    # ---------------------------------------------------------
+
+    def _accept(self):
+        while not self._stopEvent.is_set():
+            try:
+                conn, addr = self._tcp.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(conn, addr), name=f"sim-{self.port}-client",
+                             daemon=True).start()
+
+    def _serve(self, conn, addr):
+        with conn:
+            while not self._stopEvent.is_set():
+                try:
+                    command, session, status, context, data = enipFrames.recv_encap(conn)
+                except (ConnectionError, OSError):
+                    return
+                reply = self._encapsulation(command, session, context, data, addr)
+                if reply is None:
+                    if command == CMD_UNREGISTER_SESSION:
+                        return
+                    continue
+                self.requests += 1
+                self._delay()
+                try:
+                    conn.sendall(reply)
+                except OSError:
+                    return
+
+    def _encapsulation(self, command, session, context, data, addr):
+        if command == CMD_REGISTER_SESSION:
+            with self._lock:
+                self._sessions += 1
+                session = self._sessions
+            return enipFrames.encap(command, data, session, context=context)
+        if command == CMD_LIST_IDENTITY:
+            return enipFrames.encap(command, self.identity_items(), context=context)
+        if command == CMD_UNREGISTER_SESSION:
+            return None
+
+        if command == CMD_SEND_RR_DATA:
+            items = dict(enipFrames.parse_cpf(data, 6))
+            message = items.get(ITEM_UNCONNECTED_DATA, b"")
+            reply, extra = self._unconnected(message, items, addr)
+            body = struct.pack("<IH", 0, 0) + enipFrames.cpf([(ITEM_NULL, b""), (ITEM_UNCONNECTED_DATA, reply)] + extra)
+            return enipFrames.encap(command, body, session, context=context)
+
+        if command == CMD_SEND_UNIT_DATA:
+            items = dict(enipFrames.parse_cpf(data, 6))
+            connId = struct.unpack("<I", items[ITEM_CONNECTED_ADDRESS])[0]
+            payload = items[ITEM_CONNECTED_DATA]
+            sequence, message = payload[:2], payload[2:]
+            connection = self._explicit.get(connId)
+            if connection is None:
+                return enipFrames.encap(command, b"", session, status=0x03, context=context)
+            reply = self.handle_request(message)
+            body = struct.pack("<IH", 0, 0) + enipFrames.cpf([
+                (ITEM_CONNECTED_ADDRESS, struct.pack("<I", connection.toConnId)),
+                (ITEM_CONNECTED_DATA, sequence + reply)])
+            return enipFrames.encap(command, body, session, context=context)
+
+        return enipFrames.encap(command, b"", session, status=0x01, context=context)
+
+    def identity_items(self):
+        """ListIdentity reply data (one CIP Identity item)."""
+        item = (struct.pack("<H", 1) + enipFrames.sockaddr(self.port, self.host)
+                + struct.pack("<HHHBBHI", VENDOR_ID, DEVICE_TYPE, PRODUCT_CODE, REVISION[0], REVISION[1],
+                              0x0030, self.serial)
+                + bytes([len(PRODUCT_NAME)]) + PRODUCT_NAME + b"\x03")
+        return enipFrames.cpf([(ITEM_LIST_IDENTITY, item)])
+
+    def _udpLoop(self):
+        while not self._stopEvent.is_set():
+            try:
+                readable, _, _ = select.select([self._udp], [], [], 0.2)
+                if not readable:
+                    continue
+                packet, addr = self._udp.recvfrom(1500)
+            except (OSError, ValueError):
+                return
+            try:
+                command, _, _, context, _ = enipFrames.parse_encap(packet)
+            except struct.error:
+                continue
+            if command == CMD_LIST_IDENTITY:
+                self._delay()
+                try:
+                    self._udp.sendto(enipFrames.encap(command, self.identity_items(), context=context), addr)
+                except OSError:
+                    pass
+
+    # ---------------------------------------------------------
+    # Connection manager
+    # ---------------------------------------------------------
+
+    def _unconnected(self, message, items, addr):
+        service, pathWords = message[0], message[1]
+        path = parse_path(message[2:2 + 2 * pathWords])
+        data = message[2 + 2 * pathWords:]
+
+        if path.get("class") == CONNECTION_MANAGER_CLASS:
+            if service in (SERVICE_FORWARD_OPEN, SERVICE_LARGE_FORWARD_OPEN):
+                return self._forwardOpen(service, data, items, addr)
+            if service == SERVICE_FORWARD_CLOSE:
+                return self._forwardClose(data), []
+        return self.handle_request(message), []
+
+    def _forwardOpen(self, service, data, items, addr):
+        layout = FORWARD_OPEN if service == SERVICE_FORWARD_OPEN else LARGE_FORWARD_OPEN
+        try:
+            (_, _, _, toConnId, serial, vendor, origSerial, multiplier,
+             otRpi, _, toRpi, _, transport) = layout.unpack_from(data, 0)
+        except struct.error:
+            return cip_reply(service, STATUS_NOT_ENOUGH_DATA), []
+        pathWords = data[layout.size]
+        path = parse_path(data[layout.size + 1:layout.size + 1 + 2 * pathWords])
+        otConnId = self._newConnId()
+
+        extra = []
+        if transport & 0x0F == 0x01:
+            # Class 1 I/O: connection points are [O->T (output), T->O (input)]
+            if path.get("class") != ASSEMBLY_CLASS or path["points"][-2:] != [OUTPUT_ASSEMBLY, INPUT_ASSEMBLY]:
+                return cip_reply(service, STATUS_CONNECTION_FAILURE, b"\x01\x00\x15\x01"), []
+            port = enipFrames.ENIP_IO_PORT
+            if ITEM_SOCKADDR_T_O in items:
+                port = enipFrames.parse_sockaddr(items[ITEM_SOCKADDR_T_O])[1]
+            rpi = max(toRpi, 1000) / 1e6
+            connection = IOConnection(otConnId, toConnId, serial, rpi, rpi * (4 << multiplier), (addr[0], port))
+            with self._lock:
+                self._ioConnections[otConnId] = connection
+            extra.append((ITEM_SOCKADDR_O_T, enipFrames.sockaddr(self._io.getsockname()[1], self.host)))
+        else:
+            self._explicit[otConnId] = ExplicitConnection(otConnId, toConnId, serial)
+
+        reply = struct.pack("<IIHHIIIBx", otConnId, toConnId, serial, vendor, origSerial, otRpi, toRpi, 0)
+        return cip_reply(service, data=reply), extra
+
+    def _forwardClose(self, data):
+        try:
+            _, _, serial, vendor, origSerial, _ = FORWARD_CLOSE.unpack_from(data, 0)
+        except struct.error:
+            return cip_reply(SERVICE_FORWARD_CLOSE, STATUS_NOT_ENOUGH_DATA)
+        with self._lock:
+            for table in (self._explicit, self._ioConnections):
+                for connId in [c for c, conn in table.items() if conn.serial == serial]:
+                    del table[connId]
+        return cip_reply(SERVICE_FORWARD_CLOSE, data=struct.pack("<HHIBx", serial, vendor, origSerial, 0))
+
+    # ---------------------------------------------------------
+    # Message router
+    # ---------------------------------------------------------
+
+    def handle_request(self, message):
+        """Execute one Message Router request and return the reply bytes."""
+        if len(message) < 2:
+            return cip_reply(0, STATUS_NOT_ENOUGH_DATA)
+        service, pathWords = message[0], message[1]
+        path = parse_path(message[2:2 + 2 * pathWords])
+        data = message[2 + 2 * pathWords:]
+        classCode = path.get("class")
+        instance = path.get("instance", 0)
+
+        with self.model.lock:
+            self.model.advance(time.monotonic())
+
+            if classCode == MESSAGE_ROUTER_CLASS and service == SERVICE_MULTIPLE_SERVICE_PACKET:
+                return self._multipleService(data)
+            if classCode == PARAMETER_CLASS:
+                return self._parameter(service, instance, path.get("attribute"), data)
+            if classCode == PCCC_CLASS and service == SERVICE_EXECUTE_PCCC:
+                return cip_reply(service, data=self._pccc(data))
+            if classCode == IDENTITY_CLASS:
+                return self._identity(service, path.get("attribute"))
+            if classCode == ASSEMBLY_CLASS:
+                return self._assembly(service, instance, path.get("attribute"), data)
+        return cip_reply(service, STATUS_PATH_UNKNOWN if classCode is None else STATUS_SERVICE_NOT_SUPPORTED)
+
+    def _multipleService(self, data):
+        # Called with the model lock held
+        count = struct.unpack_from("<H", data, 0)[0]
+        offsets = struct.unpack_from(f"<{count}H", data, 2)
+        replies = []
+        for i, start in enumerate(offsets):
+            end = offsets[i + 1] if i + 1 < count else len(data)
+            message = data[start:end]
+            service, pathWords = message[0], message[1]
+            path = parse_path(message[2:2 + 2 * pathWords])
+            body = message[2 + 2 * pathWords:]
+            if path.get("class") == PARAMETER_CLASS:
+                replies.append(self._parameter(service, path.get("instance", 0), path.get("attribute"), body))
+            elif path.get("class") == IDENTITY_CLASS:
+                replies.append(self._identity(service, path.get("attribute")))
+            else:
+                replies.append(cip_reply(service, STATUS_PATH_UNKNOWN))
+
+        out = struct.pack("<H", count)
+        offset = 2 + 2 * count
+        for reply in replies:
+            out += struct.pack("<H", offset)
+            offset += len(reply)
+        status = STATUS_SUCCESS if all(r[2] == 0 for r in replies) else STATUS_EMBEDDED_SERVICE_ERROR
+        return cip_reply(SERVICE_MULTIPLE_SERVICE_PACKET, status, out + b"".join(replies))
+
+    def _parameter(self, service, instance, attribute, data):
+        params = self.model.params
+        if instance not in params:
+            return cip_reply(service, STATUS_PATH_UNKNOWN)
+        name, units, decimals, minimum, maximum = PARAMETER_INFO.get(
+            instance, (f"Parameter {instance}", "", 0, -0x8000, 0x7FFF))
+
+        if service == SERVICE_GET_ATTRIBUTE_SINGLE and attribute in (
+                PARAMETER_ATTRIBUTE_DESCRIPTOR, PARAMETER_ATTRIBUTE_READ_BASIC, PARAMETER_ATTRIBUTE_NAME):
+            descriptor = DESCRIPTOR_INT | (decimals << 8)
+            nameBytes = name.encode("ascii")[:16].ljust(16, b"\x00")
+            if attribute == PARAMETER_ATTRIBUTE_DESCRIPTOR:
+                return cip_reply(service, data=struct.pack("<I", descriptor))
+            if attribute == PARAMETER_ATTRIBUTE_NAME:
+                return cip_reply(service, data=nameBytes)
+            default = self.model.defaults.get(instance, 0)
+            return cip_reply(service, data=struct.pack("<Iiiii", descriptor, params[instance],
+                                                       minimum, maximum, default)
+                             + nameBytes + units.encode("ascii")[:4].ljust(4, b"\x00"))
+
+        if attribute != PARAMETER_ATTRIBUTE_VALUE:
+            return cip_reply(service, STATUS_ATTRIBUTE_NOT_SUPPORTED)
+        if service == SERVICE_GET_ATTRIBUTE_SINGLE:
+            return cip_reply(service, data=struct.pack("<h", max(-0x8000, min(params[instance], 0x7FFF))))
+        if service == SERVICE_SET_ATTRIBUTE_SINGLE:
+            if len(data) < 2:
+                return cip_reply(service, STATUS_NOT_ENOUGH_DATA)
+            if len(data) > 2:
+                return cip_reply(service, STATUS_TOO_MUCH_DATA)
+            value = struct.unpack("<h", data)[0]
+            if not minimum <= value <= maximum:
+                return cip_reply(service, STATUS_INVALID_VALUE)
+            params[instance] = value
+            return cip_reply(service)
+        return cip_reply(service, STATUS_SERVICE_NOT_SUPPORTED)
+
+    def _identity(self, service, attribute):
+        if service == SERVICE_GET_ATTRIBUTES_ALL:
+            data = (struct.pack("<HHHBBHI", VENDOR_ID, DEVICE_TYPE, PRODUCT_CODE, REVISION[0], REVISION[1],
+                                0x0030, self.serial) + bytes([len(PRODUCT_NAME)]) + PRODUCT_NAME)
+            return cip_reply(service, data=data)
+        if service == SERVICE_GET_ATTRIBUTE_SINGLE:
+            values = {1: struct.pack("<H", VENDOR_ID), 2: struct.pack("<H", DEVICE_TYPE),
+                      3: struct.pack("<H", PRODUCT_CODE), 4: bytes(REVISION),
+                      6: struct.pack("<I", self.serial), 7: bytes([len(PRODUCT_NAME)]) + PRODUCT_NAME}
+            if attribute in values:
+                return cip_reply(service, data=values[attribute])
+            return cip_reply(service, STATUS_ATTRIBUTE_NOT_SUPPORTED)
+        return cip_reply(service, STATUS_SERVICE_NOT_SUPPORTED)
+
+    def _assembly(self, service, instance, attribute, data):
+        if attribute != 3:
+            return cip_reply(service, STATUS_ATTRIBUTE_NOT_SUPPORTED)
+        if service == SERVICE_GET_ATTRIBUTE_SINGLE and instance == INPUT_ASSEMBLY:
+            return cip_reply(service, data=self.model.input_image())
+        if service == SERVICE_SET_ATTRIBUTE_SINGLE and instance == OUTPUT_ASSEMBLY:
+            if len(data) != OUTPUT_FORMAT.size:
+                return cip_reply(service, STATUS_NOT_ENOUGH_DATA if len(data) < OUTPUT_FORMAT.size else STATUS_TOO_MUCH_DATA)
+            command, reference = OUTPUT_FORMAT.unpack(data)
+            self.model.command(command, reference / 100.0)
+            return cip_reply(service)
+        return cip_reply(service, STATUS_PATH_UNKNOWN)
+
+    def _pccc(self, data):
+        """Execute a PCCC typed read/write on N files; returns the PCCC reply."""
+        # Called with the model lock held
+        requestor = data[:7]
+        cmd, tns, fnc = data[7], data[9:11], data[11]
+
+        def reply(sts, body=b""):
+            return requestor + bytes([cmd | 0x40, sts]) + tns + body
+
+        if cmd != CMD_PROTECTED or fnc not in (FNC_TYPED_WRITE, FNC_TYPED_READ):
+            return reply(PCCC_STS_ILLEGAL_COMMAND)
+        try:
+            end = data.index(b"\x00", 18)
+            address = data[18:end].decode("ascii")          # e.g. "N41:0"
+            fileNumber, element = address[1:].split(":")
+            fileNumber, element = int(fileNumber), int(element)
+        except (ValueError, UnicodeDecodeError):
+            return reply(PCCC_STS_ILLEGAL_COMMAND)
+
+        if fnc == FNC_TYPED_READ:
+            count = struct.unpack_from("<H", data, end + 1)[0]
+            words = self.model.read_file(fileNumber, element, count)
+            return reply(0, struct.pack(f"<{count}h", *words))
+
+        size = data[end + 3] - 1
+        words = struct.unpack_from(f"<{size // 2}h", data, end + 5)
+        self.model.write_file(fileNumber, element, words)
+        return reply(0)
+
+    # ---------------------------------------------------------
+    # Class 1 I/O
+    # ---------------------------------------------------------
+
+    def _ioLoop(self):
+        while not self._stopEvent.is_set():
+            now = time.monotonic()
+            with self._lock:
+                connections = list(self._ioConnections.values())
+
+            nextDue = now + 0.05
+            for connection in connections:
+                if now - connection.lastConsumed > connection.timeout:
+                    # Lost the originator: drop the connection and stop the motor like a comm-loss fault
+                    with self._lock:
+                        self._ioConnections.pop(connection.otConnId, None)
+                    with self.model.lock:
+                        self.model.command(LOGIC_STOP)
+                    print(f"Simulator {self.path}: I/O connection 0x{connection.otConnId:08X} timed out")
+                    continue
+                if now >= connection.nextProduce:
+                    self._produce(connection)
+                    connection.nextProduce += connection.rpi
+                    if connection.nextProduce < now:
+                        connection.nextProduce = now + connection.rpi
+                nextDue = min(nextDue, connection.nextProduce)
+
+            try:
+                readable, _, _ = select.select([self._io], [], [], max(nextDue - time.monotonic(), 0))
+            except (OSError, ValueError):
+                return
+            if readable:
+                self._consume()
+
+    def _produce(self, connection):
+        connection.sequence = (connection.sequence + 1) & 0xFFFFFFFF
+        connection.count = (connection.count + 1) & 0xFFFF
+        with self.model.lock:
+            self.model.advance(time.monotonic())
+            image = self.model.input_image()
+        if self.loss and self._rng.random() < self.loss:
+            self.ioDropped += 1
+            return
+        packet = enipFrames.cpf([
+            (ITEM_SEQUENCED_ADDRESS, struct.pack("<II", connection.toConnId, connection.sequence)),
+            (ITEM_CONNECTED_DATA, struct.pack("<H", connection.count) + image)])
+        try:
+            self._io.sendto(packet, connection.address)
+            self.ioPacketsOut += 1
+        except OSError:
+            pass
+
+    def _consume(self):
+        while True:
+            try:
+                packet = self._io.recv(1500, socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError, OSError):
+                return
+            if self.loss and self._rng.random() < self.loss:
+                self.ioDropped += 1
+                continue
+            try:
+                items = dict(enipFrames.parse_cpf(packet))
+                connId = struct.unpack_from("<I", items[ITEM_SEQUENCED_ADDRESS])[0]
+                data = items[ITEM_CONNECTED_DATA]
+                runIdle = struct.unpack_from("<I", data, 2)[0]
+                command, reference = OUTPUT_FORMAT.unpack_from(data, 6)
+            except (KeyError, struct.error):
+                continue
+            connection = self._ioConnections.get(connId)
+            if connection is None:
+                continue
+            connection.lastConsumed = time.monotonic()
+            self.ioPacketsIn += 1
+            if runIdle & 1:
+                with self.model.lock:
+                    self.model.advance(connection.lastConsumed)
+                    self.model.command(command, reference / 100.0)
+
+
+def start_simulators(count, host="127.0.0.1", basePort=ENIP_TCP_PORT, **kwargs):
+    """Start count simulators on consecutive ports; returns the running DriveSimulators."""
+    return [DriveSimulator(host, basePort + i, **kwargs).start() for i in range(count)]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Simulated PowerFlex525 drives for testing without hardware")
+    parser.add_argument("--count", type=int, default=1, help="number of simulated drives")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=ENIP_TCP_PORT, help="port of the first drive")
+    parser.add_argument("--latency", type=float, default=0.0, help="reply delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- random reply delay in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability a reply/packet is lost")
+    parser.add_argument("--load", type=float, default=0.6, help="motor load at base speed (fraction of rated)")
+    args = parser.parse_args()
+
+    sims = start_simulators(args.count, args.host, args.port, latency=args.latency, jitter=args.jitter,
+                            loss=args.loss, load=args.load)
+    for sim in sims:
+        print(f"Simulated drive at {sim.path}")
+
+    try:
+        while True:
+            time.sleep(5)
+            total = sum(s.requests for s in sims)
+            print(f"{total} requests served, {sum(s.model.running for s in sims)} drives running")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sim in sims:
+            sim.stop()
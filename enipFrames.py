@@ -0,0 +1,117 @@
+"""
+EtherNet/IP encapsulation and Common Packet Format (CPF) helpers.
+
+Shared by the implicit I/O connection (originator side) and anything else that has to
+speak raw EtherNet/IP instead of going through pycomm3.
+
+Encapsulation header (24 bytes, little endian):
+    UINT command, UINT length, UDINT session handle, UDINT status,
+    8 byte sender context, UDINT options
+followed by `length` bytes of command data.
+
+SendRRData / SendUnitData data: UDINT interface handle (0), UINT timeout, then a CPF:
+    UINT item count, then per item: UINT type, UINT length, data
+"""
+
+import socket
+import struct
+
+
+ENIP_TCP_PORT = 44818
+ENIP_IO_PORT = 2222
+
+CMD_LIST_IDENTITY = 0x0063
+CMD_REGISTER_SESSION = 0x0065
+CMD_UNREGISTER_SESSION = 0x0066
+CMD_SEND_RR_DATA = 0x006F
+CMD_SEND_UNIT_DATA = 0x0070
+
+ITEM_NULL = 0x0000
+ITEM_LIST_IDENTITY = 0x000C
+ITEM_CONNECTED_ADDRESS = 0x00A1
+ITEM_CONNECTED_DATA = 0x00B1
+ITEM_UNCONNECTED_DATA = 0x00B2
+ITEM_SOCKADDR_O_T = 0x8000
+ITEM_SOCKADDR_T_O = 0x8001
+ITEM_SEQUENCED_ADDRESS = 0x8002
+
+HEADER = struct.Struct("<HHII8sI")
+NO_CONTEXT = bytes(8)
+
+# Message Router request path to the Connection Manager (class 0x06, instance 1)
+CONNECTION_MANAGER_PATH = bytes([0x20, 0x06, 0x24, 0x01])
+
+
+def encap(command, data=b"", session=0, status=0, context=NO_CONTEXT):
+    return HEADER.pack(command, len(data), session, status, context, 0) + data
+
+
+def parse_encap(buf):
+    """Returns (command, session, status, context, data) for one complete encapsulated message."""
+    command, length, session, status, context, _ = HEADER.unpack_from(buf, 0)
+    return command, session, status, context, bytes(buf[HEADER.size:HEADER.size + length])
+
+
+def recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_encap(sock):
+    """Read one encapsulated message from a TCP socket."""
+    header = recv_exact(sock, HEADER.size)
+    length = struct.unpack_from("<H", header, 2)[0]
+    return parse_encap(header + recv_exact(sock, length))
+
+
+def cpf(items):
+    """Pack a list of (type, data) items."""
+    return struct.pack("<H", len(items)) + b"".join(
+        struct.pack("<HH", itemType, len(data)) + data for itemType, data in items)
+
+
+def parse_cpf(data, offset=0):
+    """Unpack a CPF starting at offset into a list of (type, data) items."""
+    count = struct.unpack_from("<H", data, offset)[0]
+    pos = offset + 2
+    items = []
+    for _ in range(count):
+        itemType, length = struct.unpack_from("<HH", data, pos)
+        pos += 4
+        items.append((itemType, bytes(data[pos:pos + length])))
+        pos += length
+    return items
+
+
+def rr_data(cipMessage, timeout=10, extraItems=()):
+    """SendRRData command data carrying one unconnected CIP message (plus e.g. Sockaddr Info items)."""
+    items = [(ITEM_NULL, b""), (ITEM_UNCONNECTED_DATA, cipMessage)] + list(extraItems)
+    return struct.pack("<IH", 0, timeout) + cpf(items)
+
+
+def cip_request(service, path, data=b""):
+    """Message Router request: service, path size in words, padded path, request data."""
+    return bytes([service, len(path) // 2]) + path + data
+
+
+def parse_cip_reply(message):
+    """Returns (reply service, general status, extended status words, reply data)."""
+    service, _, status, extWords = message[0], message[1], message[2], message[3]
+    ext = list(struct.unpack_from(f"<{extWords}H", message, 4))
+    return service, status, ext, bytes(message[4 + 2 * extWords:])
+
+
+def sockaddr(port, ip="0.0.0.0"):
+    """Sockaddr Info item data (big endian, like struct sockaddr_in)."""
+    return struct.pack(">hH4s8s", socket.AF_INET, port, socket.inet_aton(ip), bytes(8))
+
+
+def parse_sockaddr(data):
+    """Returns (ip, port) from a Sockaddr Info item."""
+    _, port, addr = struct.unpack_from(">hH4s", data, 0)
+    return socket.inet_ntoa(addr), port
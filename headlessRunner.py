@@ -0,0 +1,297 @@
+"""
+Headless test-bench runner: one unattended soak test per process, no Tk or matplotlib.
+
+Loads a run profile (JSON), configures and starts the drive with the same start sequence
+as the GUI, plays a scripted speed profile (speedProfile.ProfileRunner) and streams every sample's telemetry,
+derived quantities and thermal estimate to a recording (.csv or .bin). The run ends when
+the speed profile completes, the estimated temperature reaches the limit, or on
+SIGINT / SIGTERM; the drive is always stopped on the way out.
+
+Run profile:
+    {
+        "drive": "192.168.1.10",
+        "motor": {"npVolts": 230, "npHz": 60, "olCurrent": 4.6, "npFla": 4.6, "numPoles": 4,
+                  "npRpm": 1750, "npPower": 0.75, "irVolt": 5.2, "ixdVolt": 1.1,
+                  "ixqVolt": 2.3, "bemf": 210},
+        "thermalProfile": "10340",              (optional, from motor_profiles.json)
+        "model": {"integrator": "exact"},       (optional TemperatureCalculation overrides)
+        "speed": [[60, 30], [3600, 60]],        ([duration s, Hz] steps, a speedProfile segment
+                                                 list / {"segments": ...}, or a profile file path)
+        "temperatureLimit": 130,                (optional, degC)
+        "pollPeriod": 0.05,                     (optional)
+        "transducer": {"port": "/dev/ttyUSB0", "baudrate": 19200,    (optional)
+                       "temperature": {"unit": 2, "address": 0, "format": "h", "scale": 10}}
+    }
+
+The thermal model's integrator (euler, exact or network, see temperatureCalculation.py)
+comes from the thermal profile, then "model", then --integrator. Every integrator keeps
+the deltaTime * timeScale (1/30) scaling the motor constants were tuned with.
+
+The optional "temperature" entry polls a thermocouple input on the transducer's RS485 bus
+and records it as measured_temp_C, the column thermalFit.py fits the motor constants to.
+
+Usage:
+    python headlessRunner.py soak.json --output soak_drive1.csv
+    python headlessRunner.py soak.json --drive 192.168.1.11 --output soak_drive2.bin
+    python headlessRunner.py soak.json --integrator exact --output soak_exact.csv
+
+Exit status: 0 profile completed, 2 over-temperature, 3 interrupted, 1 error.
+"""
+
+import argparse
+import json
+import math
+import signal
+import sys
+import threading
+import time
+
+import metrics
+import temperatureCalculation
+import thermalFit
+from AB525 import PowerFlex525
+from acquisitionEngine import AcquisitionEngine, DEFAULT_POLL_PERIOD
+from derivedQuantities import Pipeline, RECORD_COLUMNS, record_row
+from driveConfig import motor_config, start_drive
+from sampleRecorder import SampleRecorder
+from speedProfile import SpeedProfile, ProfileRunner
+
+
+EXIT_COMPLETED = 0
+EXIT_ERROR = 1
+EXIT_OVER_TEMPERATURE = 2
+EXIT_INTERRUPTED = 3
+
+LOOP_PERIOD = 0.1           # seconds between drains of the acquisition engine
+STATUS_INTERVAL = 10.0      # seconds between progress lines
+
+
+def load_run_profile(path):
+    with open(path, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    for key in ("drive", "motor", "speed"):
+        if key not in profile:
+            raise ValueError(f"{path}: run profile has no '{key}'")
+    return profile
+
+
+def build_model(profile, profilesPath=thermalFit.PROFILE_FILE):
+    """TemperatureCalculation with the run profile's thermal profile and overrides applied."""
+    model = temperatureCalculation.TemperatureCalculation()
+    name = profile.get("thermalProfile")
+    if name is not None:
+        profiles = thermalFit.load_profiles(profilesPath)
+        if name not in profiles:
+            raise ValueError(f"thermal profile '{name}' not found in {profilesPath}")
+        model.ApplyProfile(profiles[name])
+    model.ApplyProfile(profile.get("model", {}))
+    model.isMotorOn = True
+    return model
+
+
+class HeadlessRun:
+
+    def __init__(self, profile, output, drive=None, profilesPath=thermalFit.PROFILE_FILE):
+        self.profile = profile
+        self.output = output
+        self.driveIp = drive or profile["drive"]
+        speed = profile["speed"]
+        self.speedProfile = SpeedProfile.load(speed) if isinstance(speed, str) else SpeedProfile.from_json(speed)
+        self.temperatureLimit = profile.get("temperatureLimit")
+        self.pollPeriod = profile.get("pollPeriod", DEFAULT_POLL_PERIOD)
+        self.config = motor_config(profile["motor"])
+        self.model = build_model(profile, profilesPath)
+        self.pipeline = Pipeline(self.model)
+
+        self.pf = None
+        self.engine = None
+        self.runner = None
+        self.recorder = None
+        self.transducer = None
+        self.fusion = None
+        self.measuredTemp = None        # latest thermocouple reading (degC)
+        self.samples = 0
+        self.invalid = 0
+        self.record = None
+        self.startError = None
+        self._driveStarted = threading.Event()
+        self._stopEvent = threading.Event()
+
+    def request_stop(self, *_):
+        self._stopEvent.set()
+
+    def open_transducer(self):
+        settings = self.profile.get("transducer")
+        if not settings:
+            return
+        # Only needs pyserial when a transducer is configured
+        from modbusPoller import ModbusPoller
+        from sensorFusion import SensorFusion, TRANSDUCER_POINTS, temperature_point
+        points = list(TRANSDUCER_POINTS)
+        if settings.get("temperature"):
+            points.append(temperature_point(**settings["temperature"]))
+        transducer = ModbusPoller(settings["port"], points, baudrate=settings.get("baudrate", 19200))
+        transducer.bus.open()           # a wrong or busy port fails the run here instead of in the poller thread
+        self.transducer = transducer
+        self.fusion = SensorFusion()
+        self.transducer.start()
+
+    def start_drive(self):
+        """Engine-thread command: run the start sequence, then let the speed profile begin."""
+        try:
+            start_drive(self.pf, self.config)
+        except Exception as e:
+            self.startError = e
+            raise
+        finally:
+            self._driveStarted.set()
+
+    def process(self, sample, torque=None, shaftSpeed=None):
+        if not sample.valid:
+            self.invalid += 1
+            return
+        self.record = self.pipeline.process(sample, torque, shaftSpeed, float(self.pf.speed), self.measuredTemp)
+        self.recorder.append(record_row(self.record))
+        self.samples += 1
+
+    def drain(self, final=False):
+        """Process every new sample; final also releases drive samples still waiting for the transducer."""
+        if self.fusion is None:
+            for sample in self.engine.drain():
+                self.process(sample)
+            return
+        for sample in self.engine.drain():
+            self.fusion.add_drive(sample)
+        for timestamp, _, values in self.transducer.drain():
+            self.fusion.add_transducer(timestamp, values)
+            # Winding temperature changes over minutes; the latest reading is close enough
+            self.measuredTemp = values.get("temperature", self.measuredTemp)
+        for fused in self.fusion.pop_ready(math.inf if final else time.monotonic()):
+            self.process(fused.sample, fused.torque, fused.speed)
+
+    def run(self):
+        """Execute the run; returns the exit status."""
+        status = EXIT_INTERRUPTED
+        try:
+            self.recorder = SampleRecorder(self.output, RECORD_COLUMNS)
+            self.pf = PowerFlex525(self.driveIp)
+            self.pf.connect()
+            self.open_transducer()
+
+            self.pf.setSpeed(self.speedProfile.setpoint(0) or 0)
+            self.engine = AcquisitionEngine(self.pf, self.pollPeriod)
+            # Queued before the thread starts, so the start sequence runs ahead of the first poll
+            self.engine.submit(self.start_drive)
+            self.engine.start()
+            # The profile timeline begins once the drive is configured and started, so no
+            # segment is cut short by the time the start sequence takes
+            while not self._driveStarted.is_set():
+                if self._stopEvent.wait(LOOP_PERIOD):
+                    return status
+                self.drain()
+            if self.startError is not None:
+                raise self.startError
+            # Setpoints are coalesced: the engine only sends them when they change
+            self.runner = ProfileRunner(self.pf, self.speedProfile)
+            self.runner.start()
+
+            start = time.monotonic()
+            nextStatus = start + STATUS_INTERVAL
+            while not self._stopEvent.wait(LOOP_PERIOD):
+                now = time.monotonic()
+                self.drain()
+                if self.runner.finished.is_set():
+                    status = EXIT_COMPLETED
+                    break
+                if self.temperatureLimit is not None and self.record is not None \
+                        and self.record.temperature >= self.temperatureLimit:
+                    print(f"Temperature limit reached: {self.record.temperature:.1f} C >= {self.temperatureLimit} C")
+                    status = EXIT_OVER_TEMPERATURE
+                    break
+
+                if now >= nextStatus:
+                    nextStatus += STATUS_INTERVAL
+                    self.print_status(now - start, self.pf.speed)
+        finally:
+            self.shutdown()
+        return status
+
+    def print_status(self, elapsed, hz):
+        record = self.record
+        temperature = f"{record.temperature:.1f} C" if record is not None else "-"
+        print(f"[{elapsed:8.1f}s] {hz:6.2f} Hz  {self.samples} samples ({self.invalid} invalid)  "
+              f"temperature {temperature}", flush=True)
+
+    def shutdown(self):
+        """
+        Stop polling, stop the drive and close every file; safe to call more than once.
+        Every step runs even if an earlier one fails (the drive is always stopped); the
+        first error is raised once everything is closed.
+        """
+        errors = []
+
+        def attempt(what, func, *args):
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"ERROR {what}: {e}")
+                errors.append(e)
+
+        if self.runner is not None:
+            runner, self.runner = self.runner, None
+            attempt("stopping the speed profile", runner.stop)
+            print(f"Speed profile timing: {runner.stats()}")
+        if self.engine is not None:
+            attempt("stopping acquisition", self.engine.stop)
+            attempt("draining the last samples", self.drain, True)
+            self.engine = None
+        if self.pf is not None:
+            # The engine thread is gone, so this thread owns the session again
+            pf, self.pf = self.pf, None
+            attempt("stopping the drive", pf.write_PCCC_param, False)
+            attempt("disconnecting", pf.disconnect)
+        if self.transducer is not None:
+            transducer, self.transducer = self.transducer, None
+            attempt("stopping the transducer", transducer.stop)
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            attempt("closing the recording", recorder.close)
+            print(f"{recorder.rowsWritten} samples written to {', '.join(recorder.paths)}")
+        if errors:
+            raise errors[0]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run an unattended test-bench session without the GUI")
+    parser.add_argument("profile", help="run profile (JSON)")
+    parser.add_argument("--output", default="run.csv", help="recording file (.csv or .bin)")
+    parser.add_argument("--drive", help="drive address, overrides the profile (ip or ip:port)")
+    parser.add_argument("--profiles", default=thermalFit.PROFILE_FILE, help="motor thermal profile file")
+    parser.add_argument("--metrics", help="write Prometheus metrics to this file at the end of the run")
+    parser.add_argument("--integrator", choices=temperatureCalculation.INTEGRATORS,
+                        help="thermal model integrator, overrides the profile")
+    args = parser.parse_args()
+
+    try:
+        profile = load_run_profile(args.profile)
+        if args.integrator:
+            profile.setdefault("model", {})["integrator"] = args.integrator
+        run = HeadlessRun(profile, args.output, args.drive, args.profiles)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR loading run profile: {e}")
+        sys.exit(EXIT_ERROR)
+
+    if args.metrics:
+        metrics.enable()
+    signal.signal(signal.SIGINT, run.request_stop)
+    signal.signal(signal.SIGTERM, run.request_stop)
+
+    try:
+        status = run.run()
+    except Exception as e:
+        print(f"ERROR during run: {e}")
+        status = EXIT_ERROR
+    if args.metrics:
+        metrics.write_prometheus(args.metrics)
+    sys.exit(status)
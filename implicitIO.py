@@ -0,0 +1,324 @@
+"""
+Implicit (Class 1) EtherNet/IP I/O connection to a PowerFlex525.
+
+Instead of polling parameters with explicit requests, a Forward Open over TCP sets up a
+pair of cyclic UDP streams at a fixed RPI (requested packet interval):
+  O->T (output assembly): logic command word + speed reference, sent by us every RPI
+  T->O (input assembly):  logic status, output frequency and the Data Out datalinks,
+                          produced by the drive every RPI
+There is no request/reply round trip per update, so telemetry arrives at the RPI
+regardless of how long an explicit read would take.
+
+The assembly instances and the layout of the I/O image below must match the drive's
+configuration: Data Out datalinks 1-4 set to P3 (current), P4 (voltage), P5 (DC bus)
+and P15 (RPM).
+"""
+
+import random
+import select
+import socket
+import struct
+import threading
+import time
+
+import enipFrames
+import metrics
+from enipFrames import (ENIP_TCP_PORT, ENIP_IO_PORT, CMD_REGISTER_SESSION, CMD_UNREGISTER_SESSION,
+                        CMD_SEND_RR_DATA, ITEM_UNCONNECTED_DATA, ITEM_CONNECTED_DATA,
+                        ITEM_SEQUENCED_ADDRESS, ITEM_SOCKADDR_O_T, ITEM_SOCKADDR_T_O,
+                        CONNECTION_MANAGER_PATH)
+
+
+SERVICE_FORWARD_OPEN = 0x54
+SERVICE_FORWARD_CLOSE = 0x4E
+ASSEMBLY_CLASS = 0x04
+
+INPUT_ASSEMBLY = 1          # T->O, produced by the drive
+OUTPUT_ASSEMBLY = 2         # O->T, consumed by the drive
+CONFIG_ASSEMBLY = 6
+
+# Output image: logic command (same bits as the N41 command word), speed reference (Hz * 100)
+OUTPUT_FORMAT = struct.Struct("<HH")
+# Input image: logic status, output frequency, then Data Out datalinks 1-4
+INPUT_FORMAT = struct.Struct("<HHhhhh")
+INPUT_FIELDS = ("status", "frequency", "current", "voltage", "busVoltage", "rpm")
+INPUT_DIVISORS = (1, 100, 100, 10, 1, 1)
+
+DEFAULT_RPI = 0.010               # seconds
+DEFAULT_TIMEOUT_MULTIPLIER = 0    # connection times out after 4 << multiplier RPIs without data
+PULSE_PACKETS = 4                 # O->T packets a start/stop command is held for
+
+ORIGINATOR_VENDOR = 0x004D
+ORIGINATOR_SERIAL = 0x098B5531
+
+# Network connection parameters: point-to-point, scheduled priority, fixed size
+POINT_TO_POINT = 0x4000
+PRIORITY_SCHEDULED = 0x0800
+TRANSPORT_CLASS1_CYCLIC = 0x01
+RUN_IDLE_RUN = 0x00000001
+
+FORWARD_OPEN = struct.Struct("<BBIIHHIB3xIHIHB")
+FORWARD_OPEN_REPLY = struct.Struct("<IIHHIII")
+FORWARD_CLOSE = struct.Struct("<BBHHIBx")
+
+
+class IOConnectionError(Exception):
+    """The Forward Open (or the session it runs on) was refused or failed."""
+
+
+def connection_path(configAssembly, outputAssembly, inputAssembly):
+    """Assembly class, config instance, then the O->T and T->O connection points."""
+    return bytes([0x20, ASSEMBLY_CLASS, 0x24, configAssembly, 0x2C, outputAssembly, 0x2C, inputAssembly])
+
+
+class IOConnection:
+
+    def __init__(self, ip, rpi=DEFAULT_RPI, inputAssembly=INPUT_ASSEMBLY, outputAssembly=OUTPUT_ASSEMBLY,
+                 configAssembly=CONFIG_ASSEMBLY, tcpPort=ENIP_TCP_PORT, localPort=ENIP_IO_PORT,
+                 timeoutMultiplier=DEFAULT_TIMEOUT_MULTIPLIER):
+        self.ip = ip
+        self.rpi = rpi
+        self.path = connection_path(configAssembly, outputAssembly, inputAssembly)
+        self.tcpPort = tcpPort
+        self.localPort = localPort
+        self.timeoutMultiplier = timeoutMultiplier
+        self.timeout = rpi * (4 << timeoutMultiplier)
+
+        self._tcp = None
+        self._udp = None
+        self._session = 0
+        self._thread = None
+        self._stopEvent = threading.Event()
+
+        self.serial = random.randint(1, 0xFFFF)
+        self.otConnId = 0
+        self.toConnId = 0
+        self.targetAddress = (ip, ENIP_IO_PORT)
+        self.otApi = rpi
+        self.toApi = rpi
+
+        # Output image is swapped as one tuple so the I/O thread never sees half an update
+        self._output = (0, 0)
+        self._pulse = None
+        self._otSequence = 0
+        self._otCount = 0
+
+        # Latest input: (arrival time, decoded values) or None before the first packet
+        self.latest = None
+        self._toSequence = None
+        self.packetsIn = 0
+        self.packetsOut = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.timeouts = 0
+        self.connected = False
+
+    # -------------------------------------------------------------
+    # Connection setup
+    # -------------------------------------------------------------
+
+    def _request(self, command, data):
+        self._tcp.sendall(enipFrames.encap(command, data, self._session))
+        _, session, status, _, replyData = enipFrames.recv_encap(self._tcp)
+        if status != 0:
+            raise IOConnectionError(f"encapsulation command 0x{command:02X} failed, status 0x{status:X}")
+        return session, replyData
+
+    def _cip(self, service, data, extraItems=()):
+        message = enipFrames.cip_request(service, CONNECTION_MANAGER_PATH, data)
+        _, replyData = self._request(CMD_SEND_RR_DATA, enipFrames.rr_data(message, extraItems=extraItems))
+        items = enipFrames.parse_cpf(replyData, 6)
+        cip = next((d for t, d in items if t == ITEM_UNCONNECTED_DATA), None)
+        if cip is None:
+            raise IOConnectionError("reply carried no CIP data")
+        _, status, ext, payload = enipFrames.parse_cip_reply(cip)
+        if status != 0:
+            extText = " ".join(f"0x{e:04X}" for e in ext)
+            raise IOConnectionError(f"service 0x{service:02X} failed, status 0x{status:02X} {extText}".rstrip())
+        return payload, items
+
+    def open(self):
+        """Register a session, bind the UDP socket, Forward Open and start the I/O thread."""
+        try:
+            self._tcp = socket.create_connection((self.ip, self.tcpPort), timeout=5.0)
+            self._session, _ = self._request(CMD_REGISTER_SESSION, struct.pack("<HH", 1, 0))
+
+            self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._udp.bind(("", self.localPort))
+            self.localPort = self._udp.getsockname()[1]      # localPort=0 picks a free port
+            self._udp.setblocking(False)
+
+            self._forwardOpen()
+        except (OSError, IOConnectionError):
+            self._closeSockets()
+            raise
+
+        self.connected = True
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self._run, name=f"io-{self.ip}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _forwardOpen(self):
+        rpiUs = int(self.rpi * 1e6)
+        otSize = 2 + 4 + OUTPUT_FORMAT.size      # sequence count + run/idle header + image
+        toSize = 2 + INPUT_FORMAT.size
+        request = FORWARD_OPEN.pack(
+            0x0A, 0x0E,                                # priority/time tick, timeout ticks
+            0, random.randint(1, 0xFFFFFFFF),          # O->T id chosen by the target, T->O by us
+            self.serial, ORIGINATOR_VENDOR, ORIGINATOR_SERIAL,
+            self.timeoutMultiplier,
+            rpiUs, POINT_TO_POINT | PRIORITY_SCHEDULED | otSize,
+            rpiUs, POINT_TO_POINT | PRIORITY_SCHEDULED | toSize,
+            TRANSPORT_CLASS1_CYCLIC,
+        ) + bytes([len(self.path) // 2]) + self.path
+
+        # Ask for T->O data on our port when it is not the standard one (e.g. a local simulator)
+        extra = [] if self.localPort == ENIP_IO_PORT else [(ITEM_SOCKADDR_T_O, enipFrames.sockaddr(self.localPort))]
+        payload, items = self._cip(SERVICE_FORWARD_OPEN, request, extra)
+
+        self.otConnId, self.toConnId, _, _, _, otApi, toApi = FORWARD_OPEN_REPLY.unpack_from(payload, 0)
+        self.otApi = otApi / 1e6
+        self.toApi = toApi / 1e6
+        self.timeout = self.toApi * (4 << self.timeoutMultiplier)
+        port = next((enipFrames.parse_sockaddr(d)[1] for t, d in items if t == ITEM_SOCKADDR_O_T), ENIP_IO_PORT)
+        self.targetAddress = (self.ip, port)
+
+    def close(self):
+        self._stopEvent.set()
+        if self._thread is not None and threading.current_thread() is not self._thread:
+            self._thread.join(2.0)
+        self._thread = None
+
+        if self._tcp is not None and self.connected:
+            try:
+                request = FORWARD_CLOSE.pack(0x0A, 0x0E, self.serial, ORIGINATOR_VENDOR, ORIGINATOR_SERIAL,
+                                             len(self.path) // 2) + self.path
+                self._cip(SERVICE_FORWARD_CLOSE, request)
+                self._tcp.sendall(enipFrames.encap(CMD_UNREGISTER_SESSION, session=self._session))
+            except (OSError, IOConnectionError) as e:
+                print(f"ERROR closing I/O connection to {self.ip}: {e}")
+        self.connected = False
+        self._closeSockets()
+
+    def _closeSockets(self):
+        for sock in (self._tcp, self._udp):
+            if sock is not None:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+        self._tcp = self._udp = None
+
+    # -------------------------------------------------------------
+    # Output image
+    # -------------------------------------------------------------
+
+    def set_output(self, command, speed):
+        """Hold the logic command word and speed reference (Hz) in the output image."""
+        self._output = (command & 0xFFFF, int(speed * 100) & 0xFFFF)
+
+    def pulse(self, command, speed, release=0):
+        """Send command for PULSE_PACKETS packets, then fall back to the release command."""
+        self._pulse = (command & 0xFFFF, int(speed * 100) & 0xFFFF, PULSE_PACKETS)
+        self._output = (release & 0xFFFF, int(speed * 100) & 0xFFFF)
+
+    @property
+    def alive(self):
+        latest = self.latest
+        return self.connected and latest is not None and time.monotonic() - latest[0] < self.timeout
+
+    # -------------------------------------------------------------
+    # I/O thread
+    # -------------------------------------------------------------
+
+    def _send(self):
+        pulse = self._pulse
+        if pulse is not None:
+            command, speed, remaining = pulse
+            self._pulse = (command, speed, remaining - 1) if remaining > 1 else None
+        else:
+            command, speed = self._output
+
+        self._otSequence = (self._otSequence + 1) & 0xFFFFFFFF
+        self._otCount = (self._otCount + 1) & 0xFFFF
+        data = struct.pack("<HI", self._otCount, RUN_IDLE_RUN) + OUTPUT_FORMAT.pack(command, speed)
+        packet = enipFrames.cpf([(ITEM_SEQUENCED_ADDRESS, struct.pack("<II", self.otConnId, self._otSequence)),
+                                 (ITEM_CONNECTED_DATA, data)])
+        try:
+            self._udp.sendto(packet, self.targetAddress)
+            self.packetsOut += 1
+        except OSError as e:
+            print(f"ERROR sending I/O data to {self.ip}: {e}")
+
+    def _receive(self):
+        while True:
+            try:
+                packet = self._udp.recv(1500)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            now = time.monotonic()
+            try:
+                items = dict(enipFrames.parse_cpf(packet))
+                connId, sequence = struct.unpack_from("<II", items[ITEM_SEQUENCED_ADDRESS])
+                data = items[ITEM_CONNECTED_DATA]
+                values = INPUT_FORMAT.unpack_from(data, 2)
+            except (KeyError, struct.error):
+                continue
+            if connId != self.toConnId:
+                continue
+
+            if self._toSequence is not None:
+                gap = (sequence - self._toSequence) & 0xFFFFFFFF
+                if gap == 0 or gap >= 0x80000000:
+                    # Duplicate or reordered behind a newer packet
+                    self.duplicates += 1
+                    metrics.inc("io_duplicates_total", drive=self.ip)
+                    continue
+                self.lost += gap - 1
+                if gap > 1:
+                    metrics.inc("io_lost_total", gap - 1, drive=self.ip)
+            self._toSequence = sequence
+            self.packetsIn += 1
+            self.latest = (now, tuple(v / d for v, d in zip(values, INPUT_DIVISORS)))
+
+    def _run(self):
+        nextSend = time.monotonic()
+        wasAlive = True
+        while not self._stopEvent.is_set():
+            now = time.monotonic()
+            if now >= nextSend:
+                self._send()
+                nextSend += self.otApi
+                if nextSend < now:
+                    # Fell behind (e.g. a GC pause): skip the missed packets, keep the phase
+                    nextSend += ((now - nextSend) // self.otApi + 1) * self.otApi
+
+            try:
+                readable, _, _ = select.select([self._udp], [], [], max(nextSend - time.monotonic(), 0))
+            except (OSError, ValueError):
+                return
+            if readable:
+                self._receive()
+
+            alive = self.latest is not None and time.monotonic() - self.latest[0] < self.timeout
+            if wasAlive and not alive and self.latest is not None:
+                self.timeouts += 1
+                metrics.inc("io_timeouts_total", drive=self.ip)
+                print(f"I/O connection to {self.ip} timed out")
+            wasAlive = alive
+
+    def values(self):
+        """Latest input image as a dict (None before the first packet)."""
+        latest = self.latest
+        if latest is None:
+            return None
+        return dict(zip(INPUT_FIELDS, latest[1]))
+
+    def stats(self):
+        return {"in": self.packetsIn, "out": self.packetsOut, "lost": self.lost,
+                "duplicates": self.duplicates, "timeouts": self.timeouts,
+                "rpi": self.toApi, "alive": self.alive}
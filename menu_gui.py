@@ -6,18 +6,27 @@ This is a lightweight Tkinter-based GUI so it should run without extra requireme
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, DoubleVar
+from tkinter import ttk, messagebox, filedialog, simpledialog, DoubleVar
 
 import csv
-import subprocess
 import sys
-import re
 from AB525 import PowerFlex525
+from driveConfig import DriveConfigurator, DriveImage, motor_config, start_drive
+from discovery import Discovery
+from enipFrames import ENIP_TCP_PORT
+from modbusPoller import ModbusPoller
+from sensorFusion import SensorFusion, TRANSDUCER_POINTS
+from derivedQuantities import Pipeline, RECORD_COLUMNS, record_row
+from speedProfile import SpeedProfile, ProfileRunner
 from pylogix import PLC
 import threading
 import time
 import math
 import temperatureCalculation
+from acquisitionEngine import AcquisitionEngine
+from sampleStore import SampleStore
+from sampleRecorder import SampleRecorder
+import metrics
 
 # Matplotlib for plotting
 import matplotlib
@@ -28,12 +37,23 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 #pf.connect()
 
+GUI_REFRESH_MS = 250     # How often the Tk loop drains samples from the acquisition engine
+POLL_PERIOD = 0.05       # Drive polling period used by the acquisition engine (s)
+TRANSDUCER_BAUDRATE = 19200   # Torque / speed transducer on RS485 (Modbus RTU)
+
+# GraphWindow history: full-resolution ring buffer plus averaged tiers for older data
+GRAPH_HISTORY_SAMPLES = 36000                     # 5 h at the 2 Hz graph rate
+GRAPH_HISTORY_TIERS = [(10, 36000), (100, 36000)] # (samples per row, rows kept)
+
+DIAGNOSTICS_REFRESH_MS = 1000   # Diagnostics window refresh period
+SCAN_POLL_MS = 100              # How often the Tk loop checks whether a drive scan finished
 
 
 class CalibrationGUI:
 
     totalHeatLoss = 0
     calculator = temperatureCalculation.TemperatureCalculation()
+    pipeline = Pipeline(calculator)
 
     """
     SurfaceArea = .02841 #0.005615 # Cooling surface m^2 .044884
@@ -53,6 +73,15 @@ class CalibrationGUI:
     curr_t = 0
     start_time_update  = None
     prevTime = 0
+    engine = None
+    update_after_id = None
+    recorder = None
+    transducer = None               # ModbusPoller for the torque / speed transducer
+    fusion = None                   # SensorFusion while the transducer is connected
+    profileRunner = None            # ProfileRunner while a scripted speed profile is playing
+    keepaliveThread = None          # idle-session keepalive / reconnect, off the Tk thread
+    scanThread = None               # ListIdentity scan / sweep, off the Tk thread
+    discovery = Discovery()         # shared ListIdentity cache, so reopening the picker is instant
 
     def __init__(self, master: tk.Tk):
         
@@ -66,8 +95,23 @@ class CalibrationGUI:
         # Menubar
         menubar = tk.Menu(master)
         file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu.add_command(label="Start Recording...", command=self.startRecording)
+        file_menu.add_command(label="Stop Recording", command=self.stopRecording)
+        file_menu.add_separator()
+        file_menu.add_command(label="Save Drive Image...", command=self.saveDriveImage)
+        file_menu.add_command(label="Load Drive Image...", command=self.loadDriveImage)
+        file_menu.add_separator()
         file_menu.add_command(label="Exit", command=master.quit)
         menubar.add_cascade(label="File", menu=file_menu)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Diagnostics...", command=self.open_diagnostics_window)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Connect Torque Transducer...", command=self.connectTransducer)
+        tools_menu.add_command(label="Disconnect Torque Transducer", command=self.disconnectTransducer)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Run Speed Profile...", command=self.runSpeedProfile)
+        tools_menu.add_command(label="Stop Speed Profile", command=self.stopSpeedProfile)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
         master.config(menu=menubar)
 
         # Frame for controls (add external padding so widgets don't stick to window edges)
@@ -94,6 +138,13 @@ class CalibrationGUI:
         self.profile_cb = ttk.Combobox(frm, values=["Default", "High Power", "Eco"], state="readonly")
         self.profile_cb.current(0)
         self.profile_cb.grid(row=firstRow, column=1, sticky=tk.EW, padx=6, pady=4)
+
+        firstRow += 1
+        ttk.Label(frm, text="Thermal model:").grid(row=firstRow, column=0, sticky=tk.W, pady=4, padx=4)
+        self.integrator_cb = ttk.Combobox(frm, values=list(temperatureCalculation.INTEGRATORS), state="readonly")
+        self.integrator_cb.set(self.calculator.integrator)
+        self.integrator_cb.grid(row=firstRow, column=1, sticky=tk.EW, padx=6, pady=4)
+        self.integrator_cb.bind("<<ComboboxSelected>>", self.on_integrator)
         
         firstRow += 1
         # Main numeric fields (second column: col 2 / 3)
@@ -320,58 +371,55 @@ class CalibrationGUI:
         status.pack(side=tk.BOTTOM, fill=tk.X)
 
     def get_ethernet_ips(self):
-        # Use pylogix discovery on Windows; on Linux fall back to parsing `ip`/`ifconfig` output
-        if sys.platform.startswith("win"):
-            with PLC() as comm:
-                devices = comm.Discover()
-            return devices
-
-        # Linux / other POSIX: parse `ip -4 -o addr` for IPv4 addresses
+        # Use pylogix discovery on Windows; elsewhere ListIdentity broadcast + unicast sweep (cached)
         try:
-            out = subprocess.check_output(["ip", "-4", "-o", "addr"], stderr=subprocess.DEVNULL, text=True)
-            results = []
-            for line in out.splitlines():
-                parts = line.split()
-                # expected format: "<idx>: <ifname>    inet <ip>/<prefix> ..."
-                if len(parts) < 4:
-                    continue
-                ifname = parts[1]
-                if 'inet' in parts:
-                    idx = parts.index('inet')
-                    ip_cidr = parts[idx + 1]
-                    ip = ip_cidr.split('/')[0]
-                    # filter common ethernet-like interface names
-                    if ifname.startswith(("eth", "en", "enp")):
-                        results.append((ifname, ip))
-
-            # fallback to parsing ifconfig output if nothing found
-            if not results:
-                out2 = subprocess.check_output(["ifconfig"], stderr=subprocess.DEVNULL, text=True)
-                for m in re.finditer(r"^([\w-]+).*?\n(?:.*?inet (?:addr:)?([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+))", out2, re.M | re.S):
-                    ifname, ip = m.group(1), m.group(2)
-                    if ifname.startswith(("eth", "en", "enp")):
-                        results.append((ifname, ip))
-
-            return results
-        except Exception:
+            if sys.platform.startswith("win"):
+                with PLC() as comm:
+                    devices = comm.Discover()
+                return devices
+            return self.discovery.scan(sweep=True)
+        except Exception as e:
+            print(f"ERROR discovering drives: {e}")
             return []
-        
+
     def on_scan(self):
-        """Scan for Ethernet IPs and show them in a separate window for selection."""
-        results = self.get_ethernet_ips()
+        """Scan for Ethernet IPs on a worker thread; the results open a selection window."""
+        if self.scanThread is not None and self.scanThread.is_alive():
+            return
+        # The sweep waits for the reply timeout, so it must not block the Tk loop
+        found = []
+        self.scanThread = threading.Thread(target=lambda: found.append(self.get_ethernet_ips()),
+                                           name="drive-scan", daemon=True)
+        self.scanThread.start()
+        self.if_btn.state(["disabled"])
+        self.status_var.set("Scanning for drives...")
+        self.master.after(SCAN_POLL_MS, self.finishScan, found)
+
+    def finishScan(self, found):
+        # Runs on the Tk thread: wait for the scan worker, then show what it found
+        if self.scanThread.is_alive():
+            self.master.after(SCAN_POLL_MS, self.finishScan, found)
+            return
+        self.scanThread = None
+        self.if_btn.state(["!disabled"])
+        self.status_var.set("Ready")
+        self.showScanResults(found[0] if found else [])
+
+    def showScanResults(self, results):
+        """Show the discovered drives in a separate window for selection."""
         print(results)
         if not results:
-            messagebox.showinfo("Scan result", "No Ethernet IPv4 addresses found.")
+            messagebox.showinfo("Scan result", "No EtherNet/IP devices found.")
             return
 
         top = tk.Toplevel(self.master)
-        top.title("Discovered Ethernet IPs")
+        top.title("Discovered Drives")
         top.geometry("480x240")
 
         lb = tk.Listbox(top, selectmode=tk.SINGLE)
         lb.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
         # Support both pylogix discovery results (with .Value) and
-        # a simple list of (iface, ip) tuples returned on Linux.
+        # the DiscoveredDevice list returned by discovery.Discovery elsewhere.
         if hasattr(results, "Value"):
             items = []
             for d in results.Value:
@@ -379,7 +427,8 @@ class CalibrationGUI:
                 ip = getattr(d, 'IPAddress', getattr(d, 'IpAddress', ''))
                 items.append((name, ip))
         else:
-            items = [(iface, ip) for (iface, ip) in results]
+            items = [(f"{d.productName} rev {d.revision}",
+                      d.ip if d.port == ENIP_TCP_PORT else f"{d.ip}:{d.port}") for d in results]
 
         for name, ip in items:
             lb.insert(tk.END, f"{name} — {ip}")
@@ -396,6 +445,7 @@ class CalibrationGUI:
             ip = text.split("—")[-1].strip()
             self.interface_var.set(ip)
 
+            self.stopAcquisition()
             self.pf = PowerFlex525(ip)
             self.pf.connect()
 
@@ -417,20 +467,29 @@ class CalibrationGUI:
         self.extra_c_var.set(self.calculator.SurfaceArea)
         self.extra_d_var.set(self.calculator.TorqueConstant)
         
-        self.NPVolts_var.set(self.pf.read_param(31))
-        self.NPHz_var.set(self.pf.read_param(32))
-        self.ol_current_var.set(self.pf.read_param(33) / 10)
-        self.nameplate_fla_var.set(self.pf.read_param(34) / 10)
-        self.num_poles_var.set(self.pf.read_param(35))
-        self.nameplate_rpm_var.set(self.pf.read_param(36))
-        self.nameplate_power_var.set(self.pf.read_param(37) / 100)
+        (npVolts, npHz, olCurrent, npFla, numPoles, npRpm, npPower,
+         irVolt, ixdVolt, ixqVolt, bemf) = self.pf.read_params(
+            [31, 32, 33, 34, 35, 36, 37, 501, 502, 503, 504],
+            [1, 1, 10, 10, 1, 1, 100, 100, 100, 100, 10])
+
+        self.NPVolts_var.set(npVolts)
+        self.NPHz_var.set(npHz)
+        self.ol_current_var.set(olCurrent)
+        self.nameplate_fla_var.set(npFla)
+        self.num_poles_var.set(numPoles)
+        self.nameplate_rpm_var.set(npRpm)
+        self.nameplate_power_var.set(npPower)
 
-        self.irVolt_var.set(self.pf.read_param(501) / 100)
-        self.ixdVolt_var.set(self.pf.read_param(502) / 100)
-        self.ixqVolt_var.set(self.pf.read_param(503) / 100)
-        self.bemf_var.set(self.pf.read_param(504) / 10)
+        self.irVolt_var.set(irVolt)
+        self.ixdVolt_var.set(ixdVolt)
+        self.ixqVolt_var.set(ixqVolt)
+        self.bemf_var.set(bemf)
 
 
+    def on_integrator(self, event=None):
+        # Takes effect from the next sample; the timeScale (1/30) scaling applies in every mode
+        self.calculator.ApplyProfile({"integrator": self.integrator_cb.get()})
+
     def on_export(self):
         """Export current drive/calibration fields to a CSV file chosen by the user."""
         fname = filedialog.asksaveasfilename(
@@ -548,96 +607,252 @@ class CalibrationGUI:
             messagebox.showerror("Import failed", f"Could not read file:\n{e}")
 
 
-    def updateVariables(self):
-
-        try:
-            
-
-            self.master.after(250, self.updateVariables)
-            self.voltage_var.set(float(self.pf.read_param(4))/10)
-            self.current_var.set(float(self.pf.read_param(3))/100)
-            self.rpm_var.set(float(self.pf.read_param(15))/1)
-            self.inputPower_var.set((float(self.voltage_var.get()) * float(self.voltage_var.get())/1000))
-            self.busVoltage_var.set(float(self.pf.read_param(5))/1)
-
-            self.outTorque_var.set(float(self.calculator.TorqueConstant * float(self.current_var.get())))
-            #self.outTorque_var.set(float(self.TorqueRequiredForMotor))
-            self.pf.setSpeed(int(self.v1.get()))
-
-            #self.outPower_var.set(float(5 * float(self.rpm_var.get()) / 9550))
-            
-
-            self.freq_var.set(int(self.v1.get()))
-            self.outPower_var.set(float(float(self.outTorque_var.get()) * float(self.rpm_var.get()) / 9550))
-
-            try:
-                self.effi_var.set( (float(float(self.outPower_var.get()))/ (float(float(self.inputPower_var.get())))) * 100 )
-            except ZeroDivisionError:
-                self.effi_var.set(float(0))
-
-            self.loss_var.set(float(float(self.inputPower_var.get()) - float(self.outPower_var.get())))
-
-            self.i2r_var.set(float( (float(self.current_var.get()) ** 2) * self.calculator.StatorResistance ) / 1000)
-            
-            #self.calculator.SpecificHeatDisipation = float( self.extra_a_var.get())
-            #self.calculator.SpecificHeat = float( self.extra_b_var.get())
-
-            #self.totalHeatLoss = float(self.i2r_var.get()) + float(self.speedLoss_var.get())
-            self.totalHeatLoss = float(self.loss_var.get())  #convert to watts
-            
-
-            
-
-            now = time.time()
-            if self.start_time_update is None:
-                self.start_time_update = now
-
-            self.curr_t = now - self.start_time_update
-            #print(self.curr_t)
-            seconds = self.curr_t
-            diffTime = now - self.prevTime
-
-            self.prevTime = now
-
-            
-            self.calculator.UpdateParameters(self.totalHeatLoss, diffTime)
-            #timeConstant = self.WeightActiveParts * self.SpecificHeat / self.SurfaceArea * self.SpecificHeatDisipation  
-            #maximumTemp = self.totalHeatLoss * 1000 / self.SurfaceArea / self.SpecificHeatDisipation
-
-            #try:
-            #    term1 = math.log((self.totalHeatLoss * 1000) - (self.SurfaceArea*self.SpecificHeatDisipation*(maximumTemp - 1)))
-            #    term2= ( -1 * math.log(self.totalHeatLoss * 1000))
-
-            #except ValueError:
-            #    term1 = 0
-            #    term2 = 0
+    def startAcquisition(self, *commands):
+        """
+        Hand the drive session to a background acquisition thread (idempotent). commands
+        are (func, args) drive calls queued before the thread starts, so they run ahead of its first poll.
+        """
+        if self.engine is not None and self.engine.is_alive():
+            for func, args in commands:
+                self.engine.submit(func, *args)
+            return
+        self.engine = AcquisitionEngine(self.pf, POLL_PERIOD)
+        if self.keepaliveBusy():
+            # The session has one user at a time: let the keepalive finish before the first poll
+            self.engine.submit(self.keepaliveThread.join)
+        for func, args in commands:
+            self.engine.submit(func, *args)
+        self.engine.start()
+
+    def stopAcquisition(self):
+        if self.engine is not None:
+            self.engine.stop()
+            self.engine = None
+
+    def runOnDrive(self, func, *args):
+        """Run a drive call on the acquisition thread if it owns the session, otherwise directly."""
+        if self.engine is not None and self.engine.is_alive():
+            self.engine.submit(func, *args)
+        else:
+            if self.keepaliveBusy():
+                self.keepaliveThread.join()
+            func(*args)
 
-            self.speedLoss_var.set(float(self.calculator.currDeltaTemp)) # Time to max temp -- dt method
+    def keepaliveBusy(self):
+        return self.keepaliveThread is not None and self.keepaliveThread.is_alive()
 
-            self.timeConst_var.set(float(self.calculator.timeConstant))
-            self.maxTempRise_var.set(float(self.calculator.maximumTemp))
+    def startRecording(self):
+        """Stream every acquisition sample to a CSV or fixed-record binary (.bin) file."""
+        fname = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("Binary recording", "*.bin"), ("All files", "*.*")],
+        )
+        if not fname:
+            return
+        self.stopRecording()
+        try:
+            self.recorder = SampleRecorder(fname, RECORD_COLUMNS)
+        except Exception as e:
+            messagebox.showerror("Recording failed", f"Could not open file:\n{e}")
+            return
+        self.status_var.set(f"Recording to {fname}")
+
+    def stopRecording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            self.status_var.set("Recording stopped")
+
+    def connectTransducer(self):
+        """Poll the torque / speed transducer and use its readings instead of the torque model."""
+        port = simpledialog.askstring("Torque transducer", "Serial port (e.g. COM5 or /dev/ttyUSB0):",
+                                      parent=self.master)
+        if not port:
+            return
+        self.disconnectTransducer()
+        transducer = ModbusPoller(port.strip(), TRANSDUCER_POINTS, baudrate=TRANSDUCER_BAUDRATE)
+        try:
+            # Open here so a wrong or busy port is reported; the poller keeps it open
+            transducer.bus.open()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Torque transducer", f"Could not open {port.strip()}:\n{e}")
+            return
+        self.transducer = transducer
+        self.fusion = SensorFusion()
+        self.transducer.start()
+        self.status_var.set(f"Torque transducer on {port.strip()}")
+
+    def disconnectTransducer(self):
+        if self.transducer is not None:
+            self.transducer.stop()
+            # Drive samples still waiting for alignment go through with what was measured so far
+            for timestamp, _, values in self.transducer.drain():
+                self.fusion.add_transducer(timestamp, values)
+            for fused in self.fusion.pop_ready(math.inf):
+                self.processSample(fused.sample, fused.torque, fused.speed)
+            self.transducer = None
+            self.fusion = None
+            self.status_var.set("Torque transducer disconnected")
+
+    def runSpeedProfile(self):
+        """Play a scripted speed profile (JSON) on the running drive instead of the slider."""
+        if self.engine is None or not self.engine.is_alive():
+            messagebox.showerror("Drive not running", "Start the drive before running a speed profile.")
+            return
+        fname = filedialog.askopenfilename(filetypes=[("Speed profiles", "*.json"), ("All files", "*.*")])
+        if not fname:
+            return
+        try:
+            profile = SpeedProfile.load(fname)
+        except Exception as e:
+            messagebox.showerror("Invalid profile", f"Could not load speed profile:\n{e}")
+            return
+        self.stopSpeedProfile()
+        self.profileRunner = ProfileRunner(self.pf, profile)
+        self.profileRunner.start()
+        self.status_var.set(f"Speed profile running ({profile.duration:.0f} s)")
+
+    def stopSpeedProfile(self):
+        if self.profileRunner is not None:
+            finished = not self.profileRunner.is_alive()
+            self.profileRunner.stop()
+            print(f"Speed profile timing: {self.profileRunner.stats()}")
+            self.profileRunner = None
+            # The slider takes over from where the profile left the setpoint
+            self.v1.set(self.pf.speed)
+            self.status_var.set("Speed profile finished" if finished else "Speed profile stopped")
+
+    def driveIdle(self):
+        """True when the GUI thread may use the drive session (connected, not polling)."""
+        if getattr(self, 'pf', None) is None or self.pf.session is None:
+            messagebox.showerror("No drive", "Connect to a drive first.")
+            return False
+        if self.engine is not None and self.engine.is_alive():
+            messagebox.showerror("Drive busy", "Stop the drive before transferring its configuration.")
+            return False
+        if self.keepaliveBusy():
+            messagebox.showerror("Drive busy", "The drive link is reconnecting; try again in a moment.")
+            return False
+        return True
+
+    def saveDriveImage(self):
+        """Upload every programmable parameter into a drive image file."""
+        if not self.driveIdle():
+            return
+        fname = filedialog.asksaveasfilename(
+            defaultextension=".drv",
+            filetypes=[("Drive images", "*.drv"), ("All files", "*.*")],
+        )
+        if not fname:
+            return
+        try:
+            image = DriveConfigurator(self.pf).upload()
+            image.save(fname)
+        except Exception as e:
+            messagebox.showerror("Save failed", f"Could not save drive image:\n{e}")
+            return
+        self.status_var.set(f"Saved {len(image.values)} parameters to {fname}")
 
-            
+    def loadDriveImage(self):
+        """Download a drive image file, writing only the parameters that differ."""
+        if not self.driveIdle():
+            return
+        fname = filedialog.askopenfilename(
+            defaultextension=".drv",
+            filetypes=[("Drive images", "*.drv"), ("All files", "*.*")],
+        )
+        if not fname:
+            return
+        try:
+            result = DriveConfigurator(self.pf).download(DriveImage.load(fname))
+        except Exception as e:
+            messagebox.showerror("Load failed", f"Could not load drive image:\n{e}")
+            return
+        if result:
+            messagebox.showinfo("Loaded", f"{len(result.changed)} parameter(s) changed and verified.")
+        else:
+            messagebox.showwarning("Loaded with errors",
+                                   f"Rejected: {result.failed}\nNot verified: {sorted(result.mismatched)}")
 
-            
-            
+    def updateVariables(self):
+        # Only one refresh loop may be scheduled at a time
+        if self.update_after_id is not None:
+            self.master.after_cancel(self.update_after_id)
+        self.update_after_id = self.master.after(GUI_REFRESH_MS, self.updateVariables)
+
+        if self.engine is None:
+            # Session is idle until polling starts; keep it alive / reconnect on a worker thread,
+            # since a reconnect waits for the connect timeout
+            if getattr(self, 'pf', None) is not None and self.pf.session is not None \
+                    and not self.keepaliveBusy():
+                self.keepaliveThread = threading.Thread(target=self.pf.keepalive, name="drive-keepalive",
+                                                        daemon=True)
+                self.keepaliveThread.start()
+            return
 
-            #firstTerm = maximumTemp * (1 - math.exp(-1 * hours/ timeConstant))
-            #secondTerm = (self.currentTemperature * math.exp(-1 * hours/ timeConstant))
-            #self.currentTemperature = self.curr_t * (self.totalHeatLoss - self.SurfaceArea * self.SpecificHeatDisipation * (self.currentTemperature)) / self.WeightActiveParts
-            #print(hours, " " , firstTerm, " " , secondTerm, " " , self.currentTemperature, " ", math.exp(-1 * hours/timeConstant))
-            #self.currentTemperature =  firstTerm + secondTerm 
-            self.temp_var.set(self.calculator.currentTemperature)
+        try:
+            with metrics.timer("gui_update_seconds"):
+                if self.profileRunner is not None and self.profileRunner.is_alive():
+                    # The profile owns the setpoint; show what it is asking for
+                    self.freq_var.set(f"{self.pf.speed:.1f}")
+                else:
+                    if self.profileRunner is not None:
+                        self.stopSpeedProfile()
+                    # Only records the setpoint; the engine sends it when it changes (rate limited)
+                    self.pf.setSpeed(int(self.v1.get()))
+                    self.freq_var.set(int(self.v1.get()))
+
+                if self.fusion is None:
+                    for sample in self.engine.drain():
+                        self.processSample(sample)
+                else:
+                    # Align drive samples with the transducer readings around them
+                    for sample in self.engine.drain():
+                        self.fusion.add_drive(sample)
+                    for timestamp, _, values in self.transducer.drain():
+                        self.fusion.add_transducer(timestamp, values)
+                    for fused in self.fusion.pop_ready(time.monotonic()):
+                        self.processSample(fused.sample, fused.torque, fused.speed)
+        except AttributeError as e:
+            metrics.inc("gui_errors_total", where="updateVariables")
+            print(f"ERROR updating variables: {e}")
 
-            
+    def processSample(self, sample, torque=None, shaftSpeed=None):
+        """torque (Nm) / shaftSpeed (RPM) are transducer measurements when connected, else the model is used."""
 
-            
+        # Never feed failed reads into the derived and thermal calculations; the next valid
+        # sample's dt covers the gap
+        if not sample.valid:
+            self.status_var.set("Drive link down - samples stale" if sample.stale else "Drive read failed - sample skipped")
+            return
+        if self.status_var.get().startswith("Drive"):
+            self.status_var.set("Running...")
 
-            
-            
-            
-            #self.effi_var.set(float(self))
-        except AttributeError as e:
+        try:
+            # Every derived value is computed once, as floats, outside Tk; the vars only display it
+            record = self.pipeline.process(sample, torque, shaftSpeed, float(self.freq_var.get()))
+            self.curr_t = record.time
+            self.prevTime = sample.timestamp
+            self.totalHeatLoss = record.loss
+
+            self.voltage_var.set(record.voltage)
+            self.current_var.set(record.current)
+            self.rpm_var.set(record.rpm)
+            self.inputPower_var.set(record.inputPower)
+            self.busVoltage_var.set(record.busVoltage)
+            self.outTorque_var.set(record.torque)
+            self.outPower_var.set(record.shaftPower)
+            self.effi_var.set(record.efficiency)
+            self.loss_var.set(record.loss)
+            self.i2r_var.set(record.i2r)
+            self.speedLoss_var.set(record.deltaTemp) # Time to max temp -- dt method
+            self.timeConst_var.set(record.timeConstant)
+            self.maxTempRise_var.set(record.maxTempRise)
+            self.temp_var.set(record.temperature)
+
+            if self.recorder is not None:
+                self.recorder.append(record_row(record))
+        except (AttributeError, ValueError) as e:
             print(f"Error: \n{e}")
         
 
@@ -646,33 +861,26 @@ class CalibrationGUI:
     def on_start(self):
         # Parse the main numeric fields (Voltage, Current, Duration). If parsing fails, show error but don't crash.
         try:
+            config = motor_config({
+                "npVolts": int(float(self.NPVolts_var.get())),
+                "npHz": int(float(self.NPHz_var.get())),
+                "olCurrent": self.ol_current_var.get(),
+                "npFla": self.nameplate_fla_var.get(),
+                "numPoles": int(float(self.num_poles_var.get())),
+                "npRpm": int(float(self.nameplate_rpm_var.get())),
+                "npPower": self.nameplate_power_var.get(),
+                "irVolt": self.irVolt_var.get(),
+                "ixdVolt": self.ixdVolt_var.get(),
+                "ixqVolt": self.ixqVolt_var.get(),
+                "bemf": self.bemf_var.get(),
+            })
 
-            self.pf.write_param_diagnostic(self.pf.session, 44, 15000)
-            
-            self.pf.write_param_diagnostic(self.pf.session,31, int(float(self.NPVolts_var.get())))
-            self.pf.write_param_diagnostic(self.pf.session,32, int(float(self.NPHz_var.get())) )
-            self.pf.write_param_diagnostic(self.pf.session,33, float(self.ol_current_var.get()) * 10 )
-            self.pf.write_param_diagnostic(self.pf.session,34, float(self.nameplate_fla_var.get()) * 10  )
-            self.pf.write_param_diagnostic(self.pf.session,35, int(float(self.num_poles_var.get())) )
-            self.pf.write_param_diagnostic(self.pf.session,36, int(float(self.nameplate_rpm_var.get())) )
-            self.pf.write_param_diagnostic(self.pf.session,37, float(self.nameplate_power_var.get()) * 100)
-
-            self.pf.write_param_diagnostic(self.pf.session,501, float(self.irVolt_var.get()) * 100)
-            self.pf.write_param_diagnostic(self.pf.session,502, float(self.ixdVolt_var.get()) * 100)
-            self.pf.write_param_diagnostic(self.pf.session,503, float(self.ixqVolt_var.get()) * 100)
-            self.pf.write_param_diagnostic(self.pf.session,504, float(self.bemf_var.get()) * 10)
-
-            self.pf.prepControls()
-            self.pf.write_PCCC_param(True)
-            self.pf.write_PCCC_param(False)
-            self.pf.write_PCCC_param(True)
-            
+            self.pf.setSpeed(int(self.v1.get()))
+            # The engine thread runs the start sequence before its first poll, so the GUI never blocks on it
+            self.startAcquisition((start_drive, (self.pf, config)))
 
             self.updateVariables()
 
-        
-        
-
         except Exception as e:
             messagebox.showerror("Invalid input", f"Please enter valid numeric values.\n{e}")
             return
@@ -691,7 +899,8 @@ class CalibrationGUI:
 
   
     def on_stop(self):
-        self.pf.write_PCCC_param(False)
+        self.stopSpeedProfile()
+        self.runOnDrive(self.pf.write_PCCC_param, False)
         self.calculator.isMotorOn = False
         # Simulate stopping: enable Start, disable Stop
         self.start_btn.config(state=tk.NORMAL)
@@ -704,6 +913,85 @@ class CalibrationGUI:
         # Open a separate Toplevel window with two graphs and controls
         GraphWindow(self.master, self)
 
+    def open_diagnostics_window(self):
+        DiagnosticsWindow(self.master, self)
+
+
+class MinMaxDecimator:
+    """
+    Incremental min/max decimation of one plotted series.
+    Samples are folded into time bins keeping each bin's min and max point. When there
+    are more bins than the axes is wide in pixels, neighbouring bins are merged and the
+    bin width doubles, so the number of points drawn stays bounded for any run length.
+    """
+
+    def __init__(self, maxBins=1000, binWidth=0.25):
+        self.maxBins = maxBins
+        self.initialBinWidth = binWidth
+        self.reset()
+
+    def reset(self):
+        self.binWidth = self.initialBinWidth
+        self.bins = []   # [key, tMin, yMin, tMax, yMax]
+
+    def setMaxBins(self, maxBins):
+        self.maxBins = max(int(maxBins), 2)
+        while len(self.bins) > self.maxBins:
+            self._merge()
+
+    def add(self, t, y):
+        if math.isnan(y):
+            return
+        key = int(t // self.binWidth)
+        if self.bins and self.bins[-1][0] == key:
+            b = self.bins[-1]
+            if y < b[2]:
+                b[1], b[2] = t, y
+            if y > b[4]:
+                b[3], b[4] = t, y
+        else:
+            self.bins.append([key, t, y, t, y])
+            if len(self.bins) > self.maxBins:
+                self._merge()
+
+    def _merge(self):
+        merged = []
+        for key, tMin, yMin, tMax, yMax in self.bins:
+            key //= 2
+            if merged and merged[-1][0] == key:
+                m = merged[-1]
+                if yMin < m[2]:
+                    m[1], m[2] = tMin, yMin
+                if yMax > m[4]:
+                    m[3], m[4] = tMax, yMax
+            else:
+                merged.append([key, tMin, yMin, tMax, yMax])
+        self.bins = merged
+        self.binWidth *= 2
+
+    def xy(self):
+        """Return (times, values) with each bin's extremes in time order."""
+        xs, ys = [], []
+        for _, tMin, yMin, tMax, yMax in self.bins:
+            if tMin == tMax:
+                xs.append(tMin)
+                ys.append(yMin)
+            elif tMin < tMax:
+                xs += (tMin, tMax)
+                ys += (yMin, yMax)
+            else:
+                xs += (tMax, tMin)
+                ys += (yMax, yMin)
+        return xs, ys
+
+
+def write_samples_csv(fname, header, store):
+    """Write a SampleStore's full-resolution window, oldest first, below a header row."""
+    with open(fname, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(store.rows())
+
 
 class GraphWindow:
     def __init__(self, root, parent_gui: CalibrationGUI):
@@ -761,19 +1049,35 @@ class GraphWindow:
         self.ax5.set_ylabel('Temperature (C)')
         self.ax5.set_xlabel("Time (s)")
 
+        # Persistent line artists; each tick only changes their data. They are animated so
+        # the static axes/ticks/labels can be cached as a background and blitted.
+        self.line1, = self.ax1.plot([], [], '-b', animated=True)
+        self.line2, = self.ax2.plot([], [], '-r', animated=True)
+        self.line3, = self.ax3.plot([], [], '-g', animated=True)
+        # combined I2R (blue) and SpeedLoss (orange)
+        self.line_i2r, = self.ax4.plot([], [], '-b', label='I2R', animated=True)
+        self.line_speedLoss, = self.ax4.plot([], [], '-C1', label='SpeedLoss', animated=True)
+        # temperature
+        self.line_temp, = self.ax5.plot([], [], '-m', animated=True)
+        self.ax4.legend(loc='upper right')
+
+        self.lines = [self.line1, self.line2, self.line3, self.line_i2r, self.line_speedLoss, self.line_temp]
+        self.decimators = [MinMaxDecimator() for _ in self.lines]
+        self.axes = [self.ax1, self.ax2, self.ax3, self.ax4, self.ax5]
+        self.reset_limits()
+
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+        for cb in (self.cb1, self.cb2, self.cb3):
+            cb.bind('<<ComboboxSelected>>', self.on_param_change)
 
-        # Data storage
-        self.times = []
-        self.data1 = []
-        self.data2 = []
-        self.data3 = []
-        # combined graph series
-        self.data_i2r = []
-        self.data_speedLoss = []
-        # temperature series
-        self.data_temp = []
+        # Data storage: fixed-size columnar ring buffer (time, 3 selectable params, I2R, SpeedLoss, temperature)
+        self.store = SampleStore(
+            ['time_s', 'param1', 'param2', 'param3', 'i2r', 'speedLoss', 'temp'],
+            GRAPH_HISTORY_SAMPLES, GRAPH_HISTORY_TIERS)
 
         self.start_time = None
         self.running = False
@@ -803,6 +1107,51 @@ class GraphWindow:
         except Exception:
             return float('nan')
 
+    def reset_limits(self):
+        self.xmax = 60.0
+        self.ylimits = {}
+        for ax in self.axes:
+            ax.set_xlim(0, self.xmax)
+            ax.set_ylim(0, 1)
+
+    def expand_ylim(self, ax, value) -> bool:
+        """Grow ax's y range (with 10% margin) if value falls outside it. Returns True if it changed."""
+        if math.isnan(value):
+            return False
+        lo, hi = self.ylimits.get(ax, (value, value))
+        if ax in self.ylimits and lo <= value <= hi:
+            return False
+        lo, hi = min(lo, value), max(hi, value)
+        margin = 0.1 * ((hi - lo) or abs(hi) or 1.0)
+        self.ylimits[ax] = (lo - margin, hi + margin)
+        ax.set_ylim(lo - margin, hi + margin)
+        return True
+
+    def draw_lines(self):
+        for line in self.lines:
+            self.fig.draw_artist(line)
+
+    def on_draw(self, event):
+        # Every full draw (rescale, resize) refreshes the cached static background
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_lines()
+
+    def redraw_full(self):
+        for line, decimator in zip(self.lines, self.decimators):
+            decimator.setMaxBins(line.axes.bbox.width)
+            line.set_data(*decimator.xy())
+        try:
+            self.fig.tight_layout()
+        except Exception:
+            pass
+        self.canvas.draw()
+
+    def on_param_change(self, event=None):
+        self.ax1.set_ylabel(self.cb1.get())
+        self.ax2.set_ylabel(self.cb2.get())
+        self.ax3.set_ylabel(self.cb3.get())
+        self.redraw_full()
+
     def sample(self):
         if not self.running:
             return
@@ -831,47 +1180,29 @@ class GraphWindow:
             p_temp = float('nan')
 
         # append data
-        self.times.append(t)
-        self.data1.append(p1)
-        self.data2.append(p2)
-        self.data3.append(p3)
-        self.data_i2r.append(p_i2r)
-        self.data_speedLoss.append(p_speed)
-        self.data_temp.append(p_temp)
-
-        # Update plots
-        self.ax1.clear()
-        self.ax2.clear()
-        self.ax3.clear()
-        self.ax4.clear()
-        self.ax5.clear()
-
-        self.ax1.plot(self.times, self.data1, '-b')
-        self.ax2.plot(self.times, self.data2, '-r')
-        self.ax3.plot(self.times, self.data3, '-g')
-
-        # combined I2R (blue) and SpeedLoss (orange)
-        self.ax4.plot(self.times, self.data_i2r, '-b', label='I2R')
-        self.ax4.plot(self.times, self.data_speedLoss, '-C1', label='SpeedLoss')
-        self.ax4.legend(loc='upper right')
-
-        # temperature
-        self.ax5.plot(self.times, self.data_temp, '-m')
-
-        # set labels
-        self.ax1.set_ylabel(self.cb1.get())
-        self.ax2.set_ylabel(self.cb2.get())
-        self.ax3.set_ylabel(self.cb3.get())
-        self.ax4.set_ylabel('I2R / SpeedLoss')
-        self.ax5.set_ylabel('Temperature (C)')
-        self.ax5.set_xlabel('Time (s)')
-
-        # tighten layout and redraw
-        try:
-            self.fig.tight_layout()
-        except Exception:
-            pass
-        self.canvas.draw_idle()
+        self.store.append((t, p1, p2, p3, p_i2r, p_speed, p_temp))
+
+        # Update the persistent lines; only rescale when a value leaves the current bounds
+        rescale = False
+        if t > self.xmax:
+            self.xmax = t * 1.5
+            for ax in self.axes:
+                ax.set_xlim(0, self.xmax)
+            rescale = True
+
+        for line, decimator, value in zip(self.lines, self.decimators, (p1, p2, p3, p_i2r, p_speed, p_temp)):
+            decimator.add(t, value)
+            line.set_data(*decimator.xy())
+            rescale |= self.expand_ylim(line.axes, value)
+
+        if rescale or self.background is None:
+            with metrics.timer("gui_redraw_seconds", kind="full"):
+                self.redraw_full()
+        else:
+            with metrics.timer("gui_redraw_seconds", kind="blit"):
+                self.canvas.restore_region(self.background)
+                self.draw_lines()
+                self.canvas.blit(self.fig.bbox)
 
         # schedule next sample
         self.after_id = self.root.after(500, self.sample)
@@ -883,14 +1214,13 @@ class GraphWindow:
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         # reset data
-        self.times = []
-        self.data1 = []
-        self.data2 = []
-        self.data3 = []
-        self.data_i2r = []
-        self.data_speedLoss = []
-        self.data_temp = []
+        self.store.clear()
         self.start_time = None
+        for line, decimator in zip(self.lines, self.decimators):
+            decimator.reset()
+            line.set_data([], [])
+        self.reset_limits()
+        self.background = None
         # ensure parent variables get updated at least once
         try:
             self.parent.updateVariables()
@@ -912,35 +1242,109 @@ class GraphWindow:
             self.after_id = None
 
     def export_samples(self):
-        if not self.times:
+        if not len(self.store):
             messagebox.showwarning("No data", "No samples to export.")
             return
         fname = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[('CSV','*.csv'),('All','*.*')])
         if not fname:
             return
         try:
-            with open(fname, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                # header includes user-selectable labels and the fixed series
-                writer.writerow(['time_s', self.cb1.get(), self.cb2.get(), self.cb3.get(), 'I2R Losses', 'Speed Losses', 'Temperature'])
-                for i in range(len(self.times)):
-                    t = self.times[i]
-                    v1 = self.data1[i] if i < len(self.data1) else ''
-                    v2 = self.data2[i] if i < len(self.data2) else ''
-                    v3 = self.data3[i] if i < len(self.data3) else ''
-                    v_i2r = self.data_i2r[i] if i < len(self.data_i2r) else ''
-                    v_speed = self.data_speedLoss[i] if i < len(self.data_speedLoss) else ''
-                    v_temp = self.data_temp[i] if i < len(self.data_temp) else ''
-                    writer.writerow([t, v1, v2, v3, v_i2r, v_speed, v_temp])
+            # header includes user-selectable labels and the fixed series
+            header = ['time_s', self.cb1.get(), self.cb2.get(), self.cb3.get(), 'I2R Losses', 'Speed Losses', 'Temperature']
+            write_samples_csv(fname, header, self.store)
             messagebox.showinfo('Exported', f'Samples saved to:\n{fname}')
         except Exception as e:
             messagebox.showerror('Export failed', f'Could not save file:\n{e}')
 
 
+class DiagnosticsWindow:
+    """Live view of the metrics registry: counters plus latency percentiles per histogram."""
+
+    COLUMNS = ("labels", "count", "mean_ms", "p50_ms", "p99_ms", "max_ms")
+
+    def __init__(self, root, parent_gui: CalibrationGUI):
+        self.parent = parent_gui
+        self.root = tk.Toplevel(root)
+        self.root.title("Diagnostics")
+        self.root.geometry("900x500")
+
+        topfrm = ttk.Frame(self.root, padding=8)
+        topfrm.pack(side=tk.TOP, fill=tk.X)
+
+        self.enabled_var = tk.BooleanVar(value=metrics.REGISTRY.enabled)
+        ttk.Checkbutton(topfrm, text="Collect metrics", variable=self.enabled_var,
+                        command=self.on_toggle).pack(side=tk.LEFT, padx=6)
+        ttk.Button(topfrm, text="Reset", command=self.on_reset).pack(side=tk.LEFT, padx=6)
+        ttk.Button(topfrm, text="Export Prometheus...", command=self.export).pack(side=tk.LEFT, padx=6)
+
+        self.engine_var = tk.StringVar(value="")
+        ttk.Label(topfrm, textvariable=self.engine_var).pack(side=tk.LEFT, padx=12)
+
+        self.tree = ttk.Treeview(self.root, columns=self.COLUMNS)
+        self.tree.heading("#0", text="metric")
+        self.tree.column("#0", width=220)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=260 if col == "labels" else 80, anchor=tk.W if col == "labels" else tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=(0, 8))
+
+        self.after_id = None
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def on_toggle(self):
+        if self.enabled_var.get():
+            metrics.enable()
+        else:
+            metrics.disable()
+
+    def on_reset(self):
+        metrics.REGISTRY.reset()
+        self.refresh()
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        for name, labels, metric in metrics.REGISTRY.snapshot():
+            labelText = ", ".join(f"{k}={v}" for k, v in labels.items())
+            if isinstance(metric, metrics.Histogram):
+                values = (labelText, metric.count, f"{metric.mean * 1000:.2f}",
+                          f"{metric.quantile(0.5) * 1000:.2f}", f"{metric.quantile(0.99) * 1000:.2f}",
+                          f"{metric.max * 1000:.2f}")
+            else:
+                values = (labelText, f"{metric.value:g}", "", "", "", "")
+            self.tree.insert("", tk.END, text=name, values=values)
+
+        engine = self.parent.engine
+        if engine is not None:
+            self.engine_var.set(f"Polls: {engine.pollCount}   Overruns: {engine.overruns}   "
+                                f"Invalid: {engine.invalidCount}")
+        else:
+            self.engine_var.set("Acquisition stopped")
+
+        self.after_id = self.root.after(DIAGNOSTICS_REFRESH_MS, self.refresh)
+
+    def export(self):
+        fname = filedialog.asksaveasfilename(defaultextension='.prom',
+                                             filetypes=[('Prometheus text', '*.prom'), ('All', '*.*')])
+        if not fname:
+            return
+        try:
+            metrics.write_prometheus(fname)
+        except Exception as e:
+            messagebox.showerror('Export failed', f'Could not save file:\n{e}')
+
+    def close(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        self.root.destroy()
+
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = CalibrationGUI(root)
 
     root.mainloop()
+    app.stopRecording()
 
 
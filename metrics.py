@@ -0,0 +1,228 @@
+"""
+Lightweight in-process metrics: counters, gauges and latency histograms.
+
+Everything goes through the module-level REGISTRY. While it is disabled (the default)
+inc() / set_gauge() return immediately and timer() hands back a shared no-op context
+manager, so instrumented hot paths cost one attribute check.
+
+Histograms use fixed Prometheus-style buckets, so recording is O(buckets) with no
+allocation and percentiles are estimated from the bucket counts.
+
+    metrics.enable()
+    with metrics.timer("cip_request_seconds", service="0x0E"):
+        ...
+    metrics.inc("poll_overruns_total")
+    metrics.write_prometheus("cortex.prom")
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+
+
+# Upper bounds (seconds) of the latency buckets; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        # += is a read-modify-write; the acquisition, keepalive and fleet threads share counters
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count", "max", "_lock")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Estimate quantile q by linear interpolation inside the bucket it falls in."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else math.nan
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Registry:
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.time()
+        self._metrics = {}          # (name, labels) -> Counter / Gauge / Histogram
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, labels):
+        # Label values are text in the exposition format; str() also keeps mixed int / str values sortable
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, kind())
+        return metric
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        self._get(Counter, name, labels).inc(amount)
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        self._get(Gauge, name, labels).value = value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        self._get(Histogram, name, labels).observe(value)
+
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self._get(Histogram, name, labels))
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+        self.started = time.time()
+
+    def snapshot(self):
+        """List of (name, labels dict, metric) sorted by name then labels."""
+        with self._lock:
+            items = list(self._metrics.items())
+        return [(name, dict(labels), metric) for (name, labels), metric in sorted(items, key=lambda kv: kv[0])]
+
+    # -------------------------------------------------------------
+    # Prometheus text exposition format
+    # -------------------------------------------------------------
+
+    def export_text(self):
+        lines = []
+        typed = set()
+        for name, labels, metric in self.snapshot():
+            kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, n in zip(list(metric.bounds) + [math.inf], metric.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {metric.sum!r}")
+                lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{_labels(labels)} {metric.value!r}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the text format atomically (safe for a node_exporter textfile collector)."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(self.export_text())
+        os.replace(tmp, path)
+
+
+def _labels(labels, **extra):
+    merged = dict(labels, **extra)
+    if not merged:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in merged.items())
+    return "{" + body + "}"
+
+
+REGISTRY = Registry()
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+# Module-level shortcuts onto the shared registry
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set_gauge
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+write_prometheus = REGISTRY.write_prometheus
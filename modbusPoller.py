@@ -0,0 +1,295 @@
+"""
+Modbus RTU acquisition engine for RS485 instruments (torque / speed transducer).
+
+Unlike minimalmodbus with CLOSE_PORT_AFTER_EACH_CALL, the serial port stays open for
+the life of the poller and every request is framed here directly:
+  - inter-frame silence (t3.5) and the response timeout are derived from the baud rate
+    and character format, so the bus is never idle longer than the spec requires
+  - the points to acquire are merged into the fewest function 3/4 requests: adjacent or
+    nearly adjacent registers of one unit share a request of up to 125 registers
+  - units are polled round-robin, one full read of a unit per turn
+
+With period=0 the poller runs back to back, i.e. at the rate the bus physically allows.
+
+    points = [ModbusPoint("torque", 1, 0, "i", 100), ModbusPoint("speed", 1, 2, "i")]
+    poller = ModbusPoller("/dev/ttyUSB0", points, baudrate=19200)
+    poller.start()
+    ... poller.drain() -> [(timestamp, unit, {"torque": ..., "speed": ...}), ...]
+"""
+
+import collections
+import struct
+import threading
+import time
+
+import serial
+
+import metrics
+
+
+FUNC_READ_HOLDING = 3
+FUNC_READ_INPUT = 4
+EXCEPTION_FLAG = 0x80
+
+MAX_REGISTERS = 125         # per function 3/4 request
+DEFAULT_MAX_GAP = 8         # unread registers worth bridging instead of sending another request
+DEFAULT_BUFFER_SIZE = 4096
+DEFAULT_TURNAROUND = 0.02   # seconds a slave may take before it starts replying
+
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc16(data):
+    """Modbus CRC-16 (poly 0xA001, init 0xFFFF), table driven."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ CRC_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def frame_timing(baudrate, bytesize=8, parity=serial.PARITY_NONE, stopbits=1):
+    """
+    (character time, t1.5, t3.5) in seconds. Above 19200 baud the spec fixes t1.5 at
+    750 us and t3.5 at 1.75 ms.
+    """
+    bits = 1 + bytesize + (0 if parity == serial.PARITY_NONE else 1) + stopbits
+    charTime = bits / baudrate
+    if baudrate > 19200:
+        return charTime, 0.00075, 0.00175
+    return charTime, 1.5 * charTime, 3.5 * charTime
+
+
+class ModbusError(Exception):
+    """Exception response, CRC error or timeout on one request."""
+
+
+class ModbusPoint(collections.namedtuple("ModbusPoint", "name unit address format scale function",
+                                         defaults=("H", 1, FUNC_READ_HOLDING))):
+    """
+    A value to acquire: registers starting at address on unit, decoded big endian with the
+    struct format ("H", "h" one register; "I", "i", "f" two registers) and divided by scale.
+    """
+
+    __slots__ = ()
+
+
+def point_registers(point):
+    return struct.calcsize(">" + point.format) // 2
+
+
+class ReadBlock:
+    """One function 3/4 request and the points decoded from its reply."""
+
+    __slots__ = ("unit", "function", "address", "count", "points")
+
+    def __init__(self, unit, function, address, count, points):
+        self.unit = unit
+        self.function = function
+        self.address = address
+        self.count = count
+        self.points = points
+
+    def decode(self, registers):
+        raw = struct.pack(f">{len(registers)}H", *registers)
+        return {p.name: struct.unpack_from(">" + p.format, raw, 2 * (p.address - self.address))[0] / p.scale
+                for p in self.points}
+
+    def __repr__(self):
+        return f"ReadBlock(unit={self.unit}, function={self.function}, address={self.address}, count={self.count})"
+
+
+def merge_ranges(points, maxGap=DEFAULT_MAX_GAP, maxRegisters=MAX_REGISTERS):
+    """
+    Group points into the fewest ReadBlocks: per (unit, function), sorted by address,
+    a point joins the current block when it starts at most maxGap registers after the
+    block ends and the block stays within maxRegisters.
+    """
+    groups = collections.defaultdict(list)
+    for point in points:
+        groups[(point.unit, point.function)].append(point)
+
+    blocks = []
+    for (unit, function), group in sorted(groups.items()):
+        group.sort(key=lambda p: p.address)
+        block = None
+        for point in group:
+            end = point.address + point_registers(point)
+            if block is not None and point.address <= block.address + block.count + maxGap \
+                    and end - block.address <= maxRegisters:
+                block.count = max(block.count, end - block.address)
+                block.points.append(point)
+            else:
+                block = ReadBlock(unit, function, point.address, end - point.address, [point])
+                blocks.append(block)
+    return blocks
+
+
+class ModbusRTU:
+    """Modbus RTU master on a persistent serial port."""
+
+    def __init__(self, port, baudrate=19200, bytesize=8, parity=serial.PARITY_NONE, stopbits=1,
+                 turnaround=DEFAULT_TURNAROUND):
+        self.port = port
+        self.charTime, self.t15, self.t35 = frame_timing(baudrate, bytesize, parity, stopbits)
+        self.turnaround = turnaround
+        self.serial = serial.serial_for_url(port, baudrate=baudrate, bytesize=bytesize, parity=parity,
+                                            stopbits=stopbits, timeout=0, do_not_open=True)
+        self._lastFrame = 0.0           # time.perf_counter() when the bus last went idle
+
+    def open(self):
+        if not self.serial.is_open:
+            self.serial.open()
+            self.serial.reset_input_buffer()
+            self._lastFrame = time.perf_counter()
+
+    def close(self):
+        if self.serial.is_open:
+            self.serial.close()
+
+    def _read(self, size, deadline):
+        data = bytearray()
+        while len(data) < size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self.serial.timeout = remaining
+            chunk = self.serial.read(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return bytes(data)
+
+    def read_registers(self, unit, address, count, function=FUNC_READ_HOLDING):
+        """One function 3/4 transaction. Returns the register values; raises ModbusError."""
+        request = struct.pack(">BBHH", unit, function, address, count)
+        request += struct.pack("<H", crc16(request))
+
+        # Bus must be silent for t3.5 between frames
+        idle = self._lastFrame + self.t35 - time.perf_counter()
+        if idle > 0:
+            time.sleep(idle)
+        self.serial.reset_input_buffer()
+        self.serial.write(request)
+
+        # Our frame, the slave's turnaround and its full reply
+        replySize = 5 + 2 * count
+        deadline = (time.perf_counter() + (len(request) + replySize) * self.charTime
+                    + self.turnaround + self.t35)
+        try:
+            head = self._read(3, deadline)
+            if len(head) < 3:
+                raise ModbusError(f"unit {unit}: no reply")
+            if head[1] == function | EXCEPTION_FLAG:
+                self._read(2, deadline)       # exception code's CRC
+                raise ModbusError(f"unit {unit}: exception code {head[2]}")
+            reply = head + self._read(head[2] + 2, deadline)
+        finally:
+            self._lastFrame = time.perf_counter()
+
+        if len(reply) < 5 + head[2]:
+            raise ModbusError(f"unit {unit}: short reply ({len(reply)} bytes)")
+        if crc16(reply[:-2]) != struct.unpack_from("<H", reply, len(reply) - 2)[0]:
+            raise ModbusError(f"unit {unit}: CRC error")
+        if head[0] != unit or head[1] != function or head[2] != 2 * count:
+            raise ModbusError(f"unit {unit}: unexpected reply {reply.hex()}")
+        return list(struct.unpack_from(f">{count}H", reply, 3))
+
+
+class ModbusPoller(threading.Thread):
+
+    def __init__(self, port, points, period=0.0, bufferSize=DEFAULT_BUFFER_SIZE, maxGap=DEFAULT_MAX_GAP,
+                 **serialArgs):
+        super().__init__(name=f"modbus-{port}", daemon=True)
+        self.bus = ModbusRTU(port, **serialArgs)
+        self.period = period
+        self.blocks = merge_ranges(points, maxGap)
+
+        # Round-robin order: one turn reads every block of one unit
+        self.units = collections.OrderedDict()
+        for block in self.blocks:
+            self.units.setdefault(block.unit, []).append(block)
+
+        self.samples = collections.deque(maxlen=bufferSize)
+        self.latest = {}                # unit -> (timestamp, values)
+        self.requestCount = 0
+        self.errorCount = 0
+        self.pollCount = 0
+        self._startTime = time.monotonic()
+        self._stopEvent = threading.Event()
+
+    def drain(self):
+        """Return every (timestamp, unit, values) published since the last drain, oldest first."""
+        out = []
+        try:
+            while True:
+                out.append(self.samples.popleft())
+        except IndexError:
+            pass
+        return out
+
+    def stop(self, timeout=2.0):
+        self._stopEvent.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def poll_unit(self, unit):
+        """Read every block of one unit. Returns (timestamp, values) or None if any request failed."""
+        timestamp = time.monotonic()
+        values = {}
+        for block in self.units[unit]:
+            self.requestCount += 1
+            try:
+                with metrics.timer("modbus_request_seconds", unit=unit):
+                    registers = self.bus.read_registers(unit, block.address, block.count, block.function)
+            except (ModbusError, serial.SerialException) as e:
+                self.errorCount += 1
+                metrics.inc("modbus_errors_total", unit=unit)
+                print(f"ERROR polling Modbus {block}: {e}")
+                return None
+            values.update(block.decode(registers))
+        return timestamp, values
+
+    def stats(self):
+        elapsed = time.monotonic() - self._startTime
+        return {"requests": self.requestCount, "errors": self.errorCount, "polls": self.pollCount,
+                "polls_per_s": self.pollCount / elapsed if elapsed else 0.0}
+
+    def run(self):
+        try:
+            self.bus.open()
+        except serial.SerialException as e:
+            print(f"ERROR opening {self.bus.port}: {e}")
+            return
+
+        self._startTime = time.monotonic()
+        nextDeadline = self._startTime
+        try:
+            while not self._stopEvent.is_set():
+                for unit in self.units:
+                    result = self.poll_unit(unit)
+                    if result is not None:
+                        self.latest[unit] = result
+                        self.samples.append((result[0], unit, result[1]))
+                self.pollCount += 1
+
+                if self.period > 0:
+                    # Same fixed-phase scheduling as AcquisitionEngine
+                    nextDeadline += self.period
+                    delay = nextDeadline - time.monotonic()
+                    if delay < 0:
+                        nextDeadline += (int(-delay // self.period) + 1) * self.period
+                        delay = nextDeadline - time.monotonic()
+                    self._stopEvent.wait(max(delay, 0))
+        finally:
+            self.bus.close()
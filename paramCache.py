@@ -0,0 +1,165 @@
+"""
+Parameter descriptor cache for the PowerFlex525 DPI parameter object (class 0x93).
+
+One "DPI Read Basic" (attribute 13) per parameter returns everything needed to encode
+and decode its value correctly on the first try:
+    BOOL[32]   descriptor   bits 0-2 data type, bit 3 signed, bits 8-11 decimal places
+    CONTAINER  value, minimum, maximum, default   (4 bytes each, value in the low bytes)
+    STRING[16] name
+    STRING[4]  units
+
+Descriptors only change with firmware, so they are read once per drive and persisted
+keyed by product code and firmware revision. The cache lives in the user's cache
+directory (see default_cache_path); set PF525_PARAM_CACHE to use another file.
+"""
+
+import collections
+import json
+import os
+import struct
+import sys
+import tempfile
+
+
+PARAM_CACHE_FILE = "param_descriptors.json"
+PARAM_CACHE_ENV = "PF525_PARAM_CACHE"
+CACHE_DIR_NAME = "TestBench"
+
+ATTRIBUTE_READ_BASIC = 13
+READ_BASIC_SIZE = 40
+
+# Descriptor data type (bits 0-2) -> (type name, struct format); bit 3 selects the signed variant
+DATA_TYPES = {
+    0: ("BYTE", "B"),
+    1: ("WORD", "H"),
+    2: ("USINT", "B"),
+    3: ("UINT", "H"),
+    4: ("UDINT", "I"),
+    5: ("TCHAR", "B"),
+    6: ("REAL", "f"),
+}
+SIGNED_TYPES = {"USINT": ("SINT", "b"), "UINT": ("INT", "h"), "UDINT": ("DINT", "i")}
+
+
+class ParamDescriptor(collections.namedtuple(
+        "ParamDescriptor", "number name units dataType format decimals minimum maximum default")):
+    """
+    Raw limits (minimum, maximum, default) are in drive units, i.e. before dividing by
+    divisor; format is the struct format of the value on the wire.
+    """
+
+    __slots__ = ()
+
+    @property
+    def size(self):
+        return struct.calcsize("<" + self.format)
+
+    @property
+    def divisor(self):
+        return 10 ** self.decimals
+
+    def decode(self, raw):
+        """Raw attribute bytes -> raw value (int, or float for REAL)."""
+        return struct.unpack_from("<" + self.format, raw)[0]
+
+    def encode(self, value):
+        """Raw value -> attribute bytes; integers are rounded."""
+        if self.format == "f":
+            return struct.pack("<f", float(value))
+        return struct.pack("<" + self.format, int(round(value)))
+
+    def in_range(self, value):
+        return self.minimum <= value <= self.maximum
+
+    def to_json(self):
+        return self._asdict()
+
+
+def decode_read_basic(number, data):
+    """Build a ParamDescriptor from the 40 byte DPI Read Basic reply."""
+    if len(data) < READ_BASIC_SIZE:
+        raise ValueError(f"parameter {number}: read basic reply is {len(data)} bytes")
+    descriptor = struct.unpack_from("<I", data, 0)[0]
+    dataType, fmt = DATA_TYPES.get(descriptor & 0x07, ("UINT", "H"))
+    if descriptor & 0x08 and dataType in SIGNED_TYPES:
+        dataType, fmt = SIGNED_TYPES[dataType]
+    decimals = (descriptor >> 8) & 0x0F
+
+    minimum, maximum, default = (struct.unpack_from("<" + fmt, data, offset)[0] for offset in (8, 12, 16))
+    name = data[20:36].split(b"\x00")[0].decode("ascii", "replace").strip()
+    units = data[36:40].split(b"\x00")[0].decode("ascii", "replace").strip()
+    return ParamDescriptor(number, name, units, dataType, fmt, decimals, minimum, maximum, default)
+
+
+def revision_key(productCode, major, minor):
+    return f"{productCode}-{major}.{minor}"
+
+
+def default_cache_path():
+    """$PF525_PARAM_CACHE, else param_descriptors.json in the per-user cache directory."""
+    path = os.environ.get(PARAM_CACHE_ENV)
+    if path:
+        return path
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, CACHE_DIR_NAME, PARAM_CACHE_FILE)
+
+
+class ParamCache:
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self._revisions = {}
+        self.load()
+
+    def _read(self):
+        """Revisions stored on disk, {key: {param number: ParamDescriptor}} ({} if none / unreadable)."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {key: {int(num): ParamDescriptor(**fields) for num, fields in params.items()}
+                    for key, params in data.items()}
+        except (OSError, ValueError, TypeError) as e:
+            print(f"ERROR loading parameter cache {self.path}: {e}")
+            return {}
+
+    def load(self):
+        self._revisions = self._read()
+
+    def save(self):
+        """
+        Merge in whatever other processes saved since we loaded, then replace the file
+        atomically through a temp file of our own, so parallel writers never collide.
+        """
+        for key, params in self._read().items():
+            known = self.descriptors(key)
+            for num, desc in params.items():
+                known.setdefault(num, desc)
+        data = {key: {str(num): d.to_json() for num, d in sorted(params.items())}
+                for key, params in self._revisions.items()}
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"ERROR saving parameter cache {self.path}: {e}")
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+        return True
+
+    def descriptors(self, key):
+        """Cached descriptors for one firmware revision, {param number: ParamDescriptor}."""
+        return self._revisions.setdefault(key, {})
+
+    def update(self, key, descriptors):
+        self.descriptors(key).update({d.number: d for d in descriptors})
@@ -0,0 +1,119 @@
+"""
+PCCC frame encoder for the PowerFlex525 (CIP service 0x4B, Execute PCCC, class 0x67).
+
+Frames are built once per (function, address, element count) as a bytearray template;
+every send only patches the transaction number (TNS) and data words in place with
+struct.pack_into, so no new bytes objects are built per command.
+
+Typed write frame layout (typed read is the same up to the address, then an element count):
+    0   requestor ID: length (7), vendor 0x004D, 4 byte serial
+    7   CMD 0x0F, STS 0x00
+    9   TNS (UINT, little endian)
+    11  FNC 0x67 typed write / 0x68 typed read
+    12  packet offset (UINT 0), total transactions = element count (UINT)
+    16  0x00 + "$N41:0" + 0x00   (logical ASCII address)
+    ..  0x99 0x09, data bytes + 1, 0x42 (INT, 2 bytes)   (type/data parameter)
+    ..  data words (INT, little endian)
+"""
+
+import struct
+
+
+REQUESTOR_ID = b"\x07\x4D\x00\x31\x55\x8b\x09"   # length, vendor ID 0x004D, serial number
+
+PCCC_SERVICE = 0x4B        # Execute PCCC
+PCCC_CLASS = 0x67          # PCCC object (103)
+
+CMD_PROTECTED = 0x0F
+FNC_TYPED_WRITE = 0x67
+FNC_TYPED_READ = 0x68
+
+TNS_OFFSET = 9
+REPLY_CMD_OFFSET = 7       # reply: requestor ID, CMD | 0x40, STS, TNS
+REPLY_STS_OFFSET = 8
+REPLY_TNS_OFFSET = 9
+
+# N41 control file of the drive: [command word, unused, speed reference (Hz * 100)]
+CONTROL_ADDRESS = "N41:0"
+CONTROL_WORDS = 3
+CMD_RELEASE = 0x0000
+CMD_START = 0x0002
+CMD_STOP = 0x0009
+
+
+class PCCCFrame:
+    """A reusable frame buffer plus the offset of its first data word."""
+
+    __slots__ = ("buffer", "dataOffset", "words")
+
+    def __init__(self, buffer, dataOffset, words):
+        self.buffer = buffer
+        self.dataOffset = dataOffset
+        self.words = words
+
+
+class PCCCEncoder:
+
+    def __init__(self, requestorId=REQUESTOR_ID):
+        self.requestorId = requestorId
+        self._tns = 0
+        self._frames = {}
+
+    def next_tns(self):
+        """Transaction numbers run 1..0xFFFF and wrap, skipping 0."""
+        self._tns = self._tns % 0xFFFF + 1
+        return self._tns
+
+    def _header(self, fnc, address, count):
+        return (self.requestorId
+                + bytes([CMD_PROTECTED, 0x00, 0x00, 0x00, fnc])
+                + struct.pack("<HH", 0, count)
+                + b"\x00$" + address.encode("ascii") + b"\x00")
+
+    def _frame(self, fnc, address, count):
+        key = (fnc, address, count)
+        frame = self._frames.get(key)
+        if frame is None:
+            header = self._header(fnc, address, count)
+            if fnc == FNC_TYPED_WRITE:
+                header += bytes([0x99, 0x09, 2 * count + 1, 0x42])
+                frame = PCCCFrame(bytearray(header + bytes(2 * count)), len(header), count)
+            else:
+                frame = PCCCFrame(bytearray(header + struct.pack("<H", count)), len(header), 0)
+            self._frames[key] = frame
+        return frame
+
+    def typed_write(self, address, words):
+        """
+        Return (buffer, tns) for a typed write of INT words starting at address.
+        The buffer is reused for the next frame of the same shape, so send it first.
+        """
+        frame = self._frame(FNC_TYPED_WRITE, address, len(words))
+        tns = self.next_tns()
+        struct.pack_into("<H", frame.buffer, TNS_OFFSET, tns)
+        struct.pack_into("<%dH" % frame.words, frame.buffer, frame.dataOffset, *(w & 0xFFFF for w in words))
+        return frame.buffer, tns
+
+    def typed_read(self, address, count):
+        """Return (buffer, tns) for a typed read of count INT elements starting at address."""
+        frame = self._frame(FNC_TYPED_READ, address, count)
+        tns = self.next_tns()
+        struct.pack_into("<H", frame.buffer, TNS_OFFSET, tns)
+        return frame.buffer, tns
+
+    def control(self, command, speed):
+        """N41 control frame: command word plus speed reference in Hz (sent as Hz * 100)."""
+        return self.typed_write(CONTROL_ADDRESS, (command, 0, int(speed * 100)))
+
+
+def check_reply(reply, tns):
+    """
+    Validate a PCCC reply against the request's transaction number.
+    Returns (ok, sts, data) where data is whatever follows the reply header.
+    """
+    if not isinstance(reply, (bytes, bytearray)) or len(reply) < REPLY_TNS_OFFSET + 2:
+        return False, None, b""
+    sts = reply[REPLY_STS_OFFSET]
+    replyTns = struct.unpack_from("<H", reply, REPLY_TNS_OFFSET)[0]
+    ok = reply[REPLY_CMD_OFFSET] == (CMD_PROTECTED | 0x40) and sts == 0 and replyTns == tns
+    return ok, sts, bytes(reply[REPLY_TNS_OFFSET + 2:])
@@ -0,0 +1,129 @@
+"""
+Streaming, append-only sample recorder.
+
+Rows are buffered in small chunks and appended to disk as they are acquired, with a
+periodic fsync so at most one chunk / fsync interval is lost if the app crashes.
+Files are rotated by size so multi-hour runs never need one huge file.
+
+Two formats are supported, picked from the file extension:
+  .csv  - header row followed by one text row per sample
+  .bin  - fixed-record binary: a header (magic, column count, column names)
+          followed by one little-endian float64 per column per sample
+"""
+
+import csv
+import io
+import os
+import struct
+import time
+
+
+BINARY_MAGIC = b"CXSAMP1\x00"
+
+DEFAULT_CHUNK_ROWS = 64              # rows buffered before a write
+DEFAULT_FSYNC_INTERVAL = 5.0         # seconds between fsyncs
+DEFAULT_ROTATE_BYTES = 64 * 1024 * 1024
+
+
+class SampleRecorder:
+
+    def __init__(self, path, columns, chunkRows=DEFAULT_CHUNK_ROWS,
+                 fsyncInterval=DEFAULT_FSYNC_INTERVAL, rotateBytes=DEFAULT_ROTATE_BYTES):
+        self.basePath, ext = os.path.splitext(path)
+        self.ext = ext.lower() or ".csv"
+        self.binary = self.ext == ".bin"
+        self.columns = list(columns)
+        self.chunkRows = chunkRows
+        self.fsyncInterval = fsyncInterval
+        self.rotateBytes = rotateBytes
+
+        self._record = struct.Struct("<%dd" % len(self.columns))
+        self._pending = []
+        self._file = None
+        self._fileIndex = 0
+        self._lastSync = time.monotonic()
+        self.rowsWritten = 0
+        self.paths = []
+
+        self._open()
+
+    def _open(self):
+        if self._fileIndex == 0:
+            path = self.basePath + self.ext
+        else:
+            path = f"{self.basePath}_{self._fileIndex:04d}{self.ext}"
+        self._fileIndex += 1
+
+        self._file = open(path, "wb")
+        self.paths.append(path)
+        if self.binary:
+            names = b"".join(struct.pack("<H", len(n)) + n for n in (c.encode("utf-8") for c in self.columns))
+            self._file.write(BINARY_MAGIC + struct.pack("<H", len(self.columns)) + names)
+        else:
+            self._file.write(self._encodeCsv([self.columns]))
+        self._file.flush()
+
+    def _encodeCsv(self, rows):
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerows(rows)
+        return buf.getvalue().encode("utf-8")
+
+    def append(self, row):
+        """Queue one sample (one float per column); written once a chunk has filled up."""
+        self._pending.append(row)
+        if len(self._pending) >= self.chunkRows:
+            self.flush()
+
+    def flush(self, sync=False):
+        if self._file is None:
+            return
+        if self._pending:
+            if self.binary:
+                pack = self._record.pack
+                data = b"".join(pack(*row) for row in self._pending)
+            else:
+                data = self._encodeCsv(self._pending)
+            self._file.write(data)
+            self.rowsWritten += len(self._pending)
+            self._pending = []
+            self._file.flush()
+
+        now = time.monotonic()
+        if sync or now - self._lastSync >= self.fsyncInterval:
+            os.fsync(self._file.fileno())
+            self._lastSync = now
+
+        if self.rotateBytes and self._file.tell() >= self.rotateBytes:
+            self._file.close()
+            self._open()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush(sync=True)
+        self._file.close()
+        self._file = None
+
+
+def read_binary(path):
+    """Load a .bin recording. Returns (columns, rows) with rows as tuples of floats."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError(f"{path} is not a sample recording")
+
+    pos = len(BINARY_MAGIC)
+    count = struct.unpack_from("<H", data, pos)[0]
+    pos += 2
+    columns = []
+    for _ in range(count):
+        length = struct.unpack_from("<H", data, pos)[0]
+        pos += 2
+        columns.append(data[pos:pos + length].decode("utf-8"))
+        pos += length
+
+    record = struct.Struct("<%dd" % count)
+    # Ignore a partially written trailing record (e.g. after a crash)
+    usable = (len(data) - pos) // record.size * record.size
+    rows = list(record.iter_unpack(data[pos:pos + usable]))
+    return columns, rows
@@ -0,0 +1,88 @@
+"""
+Bounded, columnar sample storage for long graph / logging sessions.
+
+Each column is a preallocated array('d') used as a ring buffer, so memory is fixed at
+capacity * columns * 8 bytes no matter how long a run lasts. Optional downsampled
+tiers keep averaged copies of the data (e.g. 1 row per 10 and per 100 samples) so
+older history is still available at reduced resolution after it has been overwritten
+in the full-resolution window.
+"""
+
+from array import array
+
+
+DEFAULT_CAPACITY = 36000                          # 5 h of full-resolution data at 2 Hz
+DEFAULT_TIERS = [(10, 36000), (100, 36000)]       # (samples averaged per row, capacity)
+
+
+class SampleStore:
+
+    def __init__(self, columns, capacity=DEFAULT_CAPACITY, tiers=None):
+        self.columns = list(columns)
+        self.capacity = int(capacity)
+        self._data = [array('d', bytes(8 * self.capacity)) for _ in self.columns]
+        self._head = 0     # next index written
+        self._count = 0
+
+        # Downsampled tiers: each one is its own SampleStore fed with block averages
+        self.tiers = []
+        self._tierAcc = []
+        for factor, tierCapacity in (tiers or []):
+            self.tiers.append((int(factor), SampleStore(self.columns, tierCapacity)))
+            self._tierAcc.append([0, [0.0] * len(self.columns)])
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return sum(col.itemsize * len(col) for col in self._data) + sum(store.nbytes for _, store in self.tiers)
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+        for _, store in self.tiers:
+            store.clear()
+        for acc in self._tierAcc:
+            acc[0] = 0
+            acc[1] = [0.0] * len(self.columns)
+
+    def append(self, row):
+        """Store one sample; row holds one float per column, in column order."""
+        head = self._head
+        for col, value in zip(self._data, row):
+            col[head] = value
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+        for (factor, store), acc in zip(self.tiers, self._tierAcc):
+            acc[0] += 1
+            sums = acc[1]
+            for i, value in enumerate(row):
+                sums[i] += value
+            if acc[0] == factor:
+                store.append([s / factor for s in sums])
+                acc[0] = 0
+                acc[1] = [0.0] * len(self.columns)
+
+    def column(self, name):
+        """Return one column, oldest sample first, as an array('d')."""
+        col = self._data[self.columns.index(name)]
+        if self._count < self.capacity:
+            return col[:self._count]
+        return col[self._head:] + col[:self._head]
+
+    def rows(self):
+        """Iterate over the stored samples, oldest first, as tuples in column order."""
+        return zip(*(self.column(name) for name in self.columns))
+
+    def last(self):
+        if not self._count:
+            return None
+        idx = (self._head - 1) % self.capacity
+        return tuple(col[idx] for col in self._data)
+
+    def tier(self, index):
+        """Return the downsampled SampleStore for tier index (0 = finest)."""
+        return self.tiers[index][1]
@@ -0,0 +1,148 @@
+"""
+Time alignment of the torque / speed transducer (Modbus RTU) with PowerFlex525 telemetry.
+
+Both sources stamp their samples with time.monotonic() when the request went out, so
+they share one clock. The fusion stage keeps a short history of transducer readings and
+puts every drive sample onto that timebase: torque and shaft speed are linearly
+interpolated at the drive sample's timestamp from the two transducer readings around it.
+
+A drive sample is held back until the transducer has a reading at or after its
+timestamp (normally one transducer period, a few ms). After maxWait it is released
+anyway, holding the last reading if it is no older than maxAge, otherwise with no
+measurement (torque None) so the caller falls back to the model. Nothing here blocks:
+both pollers keep running on their own threads and the GUI only moves samples along.
+"""
+
+import bisect
+import collections
+
+from modbusPoller import ModbusPoint
+
+
+# Transducer registers (see testBench.py): the value is the second register of each pair
+TRANSDUCER_UNIT = 1
+TRANSDUCER_POINTS = [
+    ModbusPoint("torque", TRANSDUCER_UNIT, 1),
+    ModbusPoint("speed", TRANSDUCER_UNIT, 3),
+]
+
+# Optional winding / frame thermocouple on the same RS485 bus (recorded as measured_temp_C)
+TEMPERATURE_KEY = "temperature"
+
+
+def temperature_point(unit, address, format="h", scale=10):
+    """ModbusPoint for a temperature input module register (degC * scale)."""
+    return ModbusPoint(TEMPERATURE_KEY, unit, address, format, scale)
+
+DEFAULT_MAX_WAIT = 0.2      # seconds a drive sample may wait for the transducer to catch up
+DEFAULT_MAX_AGE = 0.5       # seconds a held transducer reading stays usable
+DEFAULT_HISTORY = 4096      # transducer readings kept for interpolation
+
+
+class FusedSample:
+    """A drive Sample plus the measured torque (Nm) and shaft speed (RPM), or None when not measured."""
+
+    __slots__ = ("sample", "torque", "speed")
+
+    def __init__(self, sample, torque=None, speed=None):
+        self.sample = sample
+        self.torque = torque
+        self.speed = speed
+
+    @property
+    def measured(self):
+        return self.torque is not None
+
+
+class SensorFusion:
+
+    def __init__(self, torqueKey="torque", speedKey="speed", maxWait=DEFAULT_MAX_WAIT,
+                 maxAge=DEFAULT_MAX_AGE, history=DEFAULT_HISTORY):
+        self.torqueKey = torqueKey
+        self.speedKey = speedKey
+        self.maxWait = maxWait
+        self.maxAge = maxAge
+        self.history = history
+
+        # Parallel lists in timestamp order, trimmed in bulk so appends stay O(1)
+        self._times = []
+        self._torque = []
+        self._speed = []
+        self._pending = collections.deque()
+
+        self.interpolated = 0
+        self.held = 0
+        self.unmeasured = 0
+
+    def add_transducer(self, timestamp, values):
+        """
+        One transducer reading (timestamp from time.monotonic(), values by point name).
+        Readings without torque or speed (e.g. only the thermocouple on the same bus) are
+        ignored, so they never become interpolation points.
+        """
+        if self.torqueKey not in values and self.speedKey not in values:
+            return
+        if self._times and timestamp <= self._times[-1]:
+            return
+        self._times.append(timestamp)
+        self._torque.append(values.get(self.torqueKey))
+        self._speed.append(values.get(self.speedKey))
+        if len(self._times) > 2 * self.history:
+            del self._times[:-self.history], self._torque[:-self.history], self._speed[:-self.history]
+
+    def add_drive(self, sample):
+        """Queue one drive Sample; it comes out of pop_ready() once it can be aligned."""
+        self._pending.append(sample)
+
+    def _interpolate(self, t):
+        i = bisect.bisect_left(self._times, t)
+        if i < len(self._times) and self._times[i] == t:
+            return self._torque[i], self._speed[i]
+        if i == 0 or i == len(self._times):
+            return None
+        t0, t1 = self._times[i - 1], self._times[i]
+        w = (t - t0) / (t1 - t0)
+        return (_lerp(self._torque[i - 1], self._torque[i], w),
+                _lerp(self._speed[i - 1], self._speed[i], w))
+
+    def pop_ready(self, now):
+        """
+        FusedSamples for every queued drive sample that can be aligned now (or has waited
+        maxWait), in order. now is time.monotonic().
+        """
+        out = []
+        while self._pending:
+            sample = self._pending[0]
+            t = sample.timestamp
+            latest = self._times[-1] if self._times else None
+
+            if latest is not None and latest >= t:
+                values = self._interpolate(t)
+                if values is None:
+                    # Older than the whole history; only possible after a long stall
+                    self.unmeasured += 1
+                    out.append(FusedSample(sample))
+                else:
+                    self.interpolated += 1
+                    out.append(FusedSample(sample, *values))
+            elif now - t >= self.maxWait:
+                if latest is not None and t - latest <= self.maxAge:
+                    self.held += 1
+                    out.append(FusedSample(sample, self._torque[-1], self._speed[-1]))
+                else:
+                    self.unmeasured += 1
+                    out.append(FusedSample(sample))
+            else:
+                break
+            self._pending.popleft()
+        return out
+
+    def stats(self):
+        return {"interpolated": self.interpolated, "held": self.held, "unmeasured": self.unmeasured,
+                "pending": len(self._pending)}
+
+
+def _lerp(a, b, w):
+    if a is None or b is None:
+        return a if b is None else b
+    return a + (b - a) * w
@@ -0,0 +1,200 @@
+"""
+Scripted speed profiles: steps, ramps and repeating duty cycles on a precise timeline.
+
+A SpeedProfile is a list of segments compiled to a flat timeline of
+(start, duration, from Hz, to Hz) entries, so the setpoint at any time is one bisect and a
+linear interpolation. Profiles load from JSON:
+
+    {"segments": [
+        {"step": 30, "duration": 60},
+        {"ramp": [30, 60], "duration": 10},
+        {"repeat": 5, "segments": [{"step": 60, "duration": 120}, {"step": 0, "duration": 60}]}
+    ]}
+
+or as the shorthand [[duration, Hz], ...] (steps only). duty_cycle() builds the IEC
+60034-1 S1 / S2 / S3 / S6 patterns.
+
+ProfileRunner plays a profile on the perf_counter clock with deadline scheduling: it
+wakes every `period` and on every segment boundary. It sleeps until the deadline; with
+spinMargin it sleeps until that much before it and spins the rest, trading a core (and
+the GIL) for sub-millisecond wakeups. A late tick never shifts the timeline. The
+setpoint is always taken at the current time, so a stall simply catches up. Every
+setpoint goes through PowerFlex525.setSpeed, which coalesces it and rate-limits the
+writes, and the lateness of each tick is recorded.
+"""
+
+import bisect
+import collections
+import json
+import math
+import threading
+import time
+
+import metrics
+
+
+DEFAULT_PERIOD = 0.05       # seconds between setpoint updates inside a ramp / step
+SPIN_MARGIN = 0.002         # suggested spinMargin when sub-millisecond ticks are worth a busy core
+TIMING_LOG_SIZE = 100000    # (deadline, actual, Hz) entries kept for recording
+
+DUTY_CYCLES = ("S1", "S2", "S3", "S6")
+
+
+class SpeedProfile:
+
+    def __init__(self, segments):
+        self.timeline = []          # (start, duration, fromHz, toHz)
+        self._starts = []
+        self.duration = self._compile(segments, 0.0)
+
+    def _compile(self, segments, t):
+        for segment in segments:
+            if "repeat" in segment:
+                for _ in range(int(segment["repeat"])):
+                    t = self._compile(segment["segments"], t)
+                continue
+            duration = float(segment["duration"])
+            if duration <= 0:
+                raise ValueError(f"segment {segment} has no duration")
+            if "ramp" in segment:
+                fromHz, toHz = (float(v) for v in segment["ramp"])
+            elif "step" in segment:
+                fromHz = toHz = float(segment["step"])
+            else:
+                raise ValueError(f"segment {segment} is neither step, ramp nor repeat")
+            self.timeline.append((t, duration, fromHz, toHz))
+            self._starts.append(t)
+            t += duration
+        return t
+
+    @classmethod
+    def from_json(cls, data):
+        """Build from the parsed JSON: {"segments": [...]}, a segment list or [[duration, Hz], ...]."""
+        if isinstance(data, dict):
+            data = data["segments"]
+        segments = [{"step": pair[1], "duration": pair[0]} if isinstance(pair, (list, tuple)) else pair
+                    for pair in data]
+        return cls(segments)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_json(json.load(f))
+
+    @property
+    def finalHz(self):
+        return self.timeline[-1][3] if self.timeline else 0.0
+
+    def setpoint(self, t):
+        """Speed (Hz) at t seconds into the profile, or None once it has ended."""
+        if t < 0 or t >= self.duration:
+            return None
+        start, duration, fromHz, toHz = self.timeline[bisect.bisect_right(self._starts, t) - 1]
+        return fromHz + (toHz - fromHz) * (t - start) / duration
+
+    def next_boundary(self, t):
+        """Start of the first segment after t (or the profile end)."""
+        i = bisect.bisect_right(self._starts, t)
+        return self._starts[i] if i < len(self._starts) else self.duration
+
+
+def duty_cycle(kind, hz, period=600.0, dutyFactor=0.5, cycles=1, restHz=0.0):
+    """
+    Segments for an IEC 60034-1 duty type at hz:
+      S1 continuous running for period * cycles
+      S2 short-time: hz for period * dutyFactor, then rest until the end of the period
+      S3 intermittent periodic: cycles of hz for dutyFactor of the period, rest for the remainder
+      S6 continuous periodic: like S3, but the "rest" keeps running at restHz (no load)
+    S4 / S5 (starting and braking) are S3 with ramp segments; write them out explicitly.
+    """
+    if kind not in DUTY_CYCLES:
+        raise ValueError(f"duty type {kind} not one of {DUTY_CYCLES}")
+    if kind == "S1":
+        return [{"step": hz, "duration": period * cycles}]
+    on = period * dutyFactor
+    off = period - on
+    cycle = [{"step": hz, "duration": on}]
+    if off > 0:
+        cycle.append({"step": restHz if kind == "S6" else 0.0, "duration": off})
+    if kind == "S2":
+        return cycle
+    return [{"repeat": cycles, "segments": cycle}]
+
+
+class ProfileRunner(threading.Thread):
+
+    def __init__(self, pf, profile, period=DEFAULT_PERIOD, onSetpoint=None, spinMargin=0.0):
+        super().__init__(name="speed-profile", daemon=True)
+        self.pf = pf
+        self.profile = profile
+        self.period = period
+        self.spinMargin = spinMargin            # seconds of each wait spent spinning (0 = sleep only)
+        self.onSetpoint = onSetpoint            # optional callback(t, hz) on the runner thread
+
+        self.timing = collections.deque(maxlen=TIMING_LOG_SIZE)   # (deadline, actual, hz), profile time
+        self.ticks = 0
+        self.lateTicks = 0
+        self.maxLateness = 0.0
+        self.totalLateness = 0.0
+        self.startTime = None
+        self.finished = threading.Event()
+        self._stopEvent = threading.Event()
+
+    def stop(self, timeout=2.0):
+        self._stopEvent.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    @property
+    def elapsed(self):
+        return 0.0 if self.startTime is None else time.perf_counter() - self.startTime
+
+    def _wait_until(self, deadline):
+        """Sleep until spinMargin before deadline (perf_counter), then spin. False if stopped."""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spinMargin and self._stopEvent.wait(remaining - self.spinMargin):
+            return False
+        while time.perf_counter() < deadline:
+            pass
+        return not self._stopEvent.is_set()
+
+    def stats(self):
+        ticks = self.ticks or 1
+        return {"ticks": self.ticks, "late_ticks": self.lateTicks,
+                "mean_lateness_ms": 1000 * self.totalLateness / ticks,
+                "max_lateness_ms": 1000 * self.maxLateness}
+
+    def run(self):
+        self.startTime = time.perf_counter()
+        t = 0.0                     # profile time of the next deadline
+        try:
+            while True:
+                if not self._wait_until(self.startTime + t):
+                    return
+                actual = time.perf_counter() - self.startTime
+                hz = self.profile.setpoint(actual)
+                if hz is None:
+                    # End of the profile: settle on the last segment's final speed
+                    self.pf.setSpeed(self.profile.finalHz)
+                    return
+
+                self.pf.setSpeed(hz)
+                if self.onSetpoint is not None:
+                    self.onSetpoint(actual, hz)
+
+                lateness = actual - t
+                self.timing.append((t, actual, hz))
+                self.ticks += 1
+                self.totalLateness += lateness
+                self.maxLateness = max(self.maxLateness, lateness)
+                metrics.observe("profile_tick_lateness_seconds", lateness)
+
+                # Next deadline: the next period tick or segment boundary, whichever comes first.
+                # Ticks missed while late are skipped; the timeline itself never shifts.
+                if lateness > self.period:
+                    self.lateTicks += 1
+                    metrics.inc("profile_late_ticks_total")
+                nextTick = (math.floor(actual / self.period) + 1) * self.period
+                t = min(nextTick, self.profile.next_boundary(actual))
+        finally:
+            self.finished.set()
@@ -1,3 +1,42 @@
+import collections
+import math
+
+import numpy as np
+
+
+# Result of a batch replay; every field is an array with one entry per input sample
+ThermalTrajectory = collections.namedtuple(
+    "ThermalTrajectory", ["temperature", "deltaTemp", "timeConstant", "maximumTemp"])
+
+REPLAY_BLOCK = 256   # samples solved per vectorized block (keeps the cumulative products well scaled)
+
+# Integrator modes for UpdateParameters
+#   euler   - original forward Euler step with the small-rise snap to zero
+#   exact   - analytic first-order solution over the actual dt (exponential decay), any dt
+#   network - winding / frame / ambient two-node network, exact discretization per dt
+# Every mode scales deltaTime by timeScale (1/30), the scaling the motor constants were
+# tuned with. Select one with a motor profile's "integrator" key, headlessRunner.py
+# --integrator or the GUI's Thermal model box.
+INTEGRATORS = ("euler", "exact", "network")
+
+DISCRETIZATION_CACHE_SIZE = 256
+
+
+def _expm(M):
+    """Matrix exponential by scaling and squaring of a Taylor series (small matrices only)."""
+    norm = np.max(np.sum(np.abs(M), axis=1))
+    squarings = int(np.ceil(np.log2(norm))) + 1 if norm > 0.5 else 0
+    X = M / (2 ** squarings)
+    result = np.eye(len(M))
+    term = np.eye(len(M))
+    for k in range(1, 18):
+        term = term @ X / k
+        result = result + term
+    for _ in range(squarings):
+        result = result @ result
+    return result
+
+
 
 
 class TemperatureCalculation:
@@ -39,19 +78,38 @@ class TemperatureCalculation:
     timeConstant = 0
     maximumTemp = 0
 
+    integrator = "euler"      # see INTEGRATORS
+    timeScale = 1 / 30        # deltaTime scaling the motor constants were tuned with (all modes)
+
+    # Two-node network (integrator = "network"). None = derive from the single-node constants:
+    # the active-part heat capacity is split between winding and frame, and the winding is
+    # coupled to the frame WindingToFrameRatio times more strongly than the frame to ambient.
+    WindingHeatCapacity = None    # J/degree
+    FrameHeatCapacity = None      # J/degree
+    WindingToFrame = None         # W/degree
+    WindingCapacityShare = 0.3
+    WindingToFrameRatio = 5.0
+    frameDeltaTemp = 0
+
 
     def __init__(self):
         
-        pass
+        self._discretization = {}
 
 
 
     def UpdateParameters(self, loss_watts, deltaTime ):
 
+        if self.integrator == "exact":
+            self.UpdateExact(loss_watts, deltaTime)
+            return
+        if self.integrator == "network":
+            self.UpdateNetwork(loss_watts, deltaTime)
+            return
 
         if True:
 
-            deltaTime = deltaTime  / 30
+            deltaTime = deltaTime * self.timeScale
             self.currWattLoss = loss_watts * 1000
             self.timeConstant = self.WeightActiveParts * self.SpecificHeat / self.SurfaceArea * self.SpecificHeatDisipation  / 3600
             self.maximumTemp = loss_watts * 1000 / self.SurfaceArea / self.SpecificHeatDisipation
@@ -68,7 +126,172 @@ class TemperatureCalculation:
             #print(deltaTime, " ", deltaTempRise, " ", self.currentTemperature, " ", self.currWattLoss)
 
 
+    def UpdateExact(self, loss_watts, deltaTime):
+        """
+        First-order step using the analytic solution with the loss held over deltaTime:
+        rise(t + dt) = steady + (rise(t) - steady) * exp(-dt / tau). Exact for any dt.
+        """
+        deltaTime = deltaTime * self.timeScale
+        self.currWattLoss = loss_watts * 1000
+        self.timeConstant = self.WeightActiveParts * self.SpecificHeat / self.SurfaceArea * self.SpecificHeatDisipation  / 3600
+        self.maximumTemp = loss_watts * 1000 / self.SurfaceArea / self.SpecificHeatDisipation
+
+        dissipation = self.SurfaceArea * self.SpecificHeatDisipation
+        decay = math.exp(-dissipation * deltaTime / (self.WeightActiveParts * self.SpecificHeat))
+        self.currDeltaTemp = self.maximumTemp + (self.currDeltaTemp - self.maximumTemp) * decay
+
+        self.currentTemperature = self.ambientTemperature + self.currDeltaTemp
+
+
+    def NetworkMatrices(self):
+        """Return (A, B) for d/dt [winding rise, frame rise] = A @ x + B * loss (W)."""
+        total = self.WeightActiveParts * self.SpecificHeat
+        cw = self.WindingHeatCapacity or total * self.WindingCapacityShare
+        cf = self.FrameHeatCapacity or total * (1 - self.WindingCapacityShare)
+        toAmbient = self.SurfaceArea * self.SpecificHeatDisipation
+        toFrame = self.WindingToFrame or toAmbient * self.WindingToFrameRatio
+
+        A = np.array([[-toFrame / cw, toFrame / cw],
+                      [toFrame / cf, -(toFrame + toAmbient) / cf]])
+        B = np.array([1 / cw, 0.0])
+        return A, B
+
+
+    def UpdateNetwork(self, loss_watts, deltaTime):
+        """
+        Winding / frame / ambient network step. The losses heat the winding, the winding
+        conducts to the frame and the frame dissipates to ambient through the cooling surface.
+        The zero-order-hold discretization exp([[A, B], [0, 0]] * dt) is cached per dt, so a
+        fixed poll rate costs one 2x2 multiply per step.
+        """
+        deltaTime = deltaTime * self.timeScale
+        self.currWattLoss = loss_watts * 1000
+        self.timeConstant = self.WeightActiveParts * self.SpecificHeat / self.SurfaceArea * self.SpecificHeatDisipation  / 3600
+        self.maximumTemp = loss_watts * 1000 / self.SurfaceArea / self.SpecificHeatDisipation
+
+        key = round(deltaTime, 9)
+        step = self._discretization.get(key)
+        if step is None:
+            A, B = self.NetworkMatrices()
+            M = np.zeros((3, 3))
+            M[:2, :2] = A * deltaTime
+            M[:2, 2] = B * deltaTime
+            E = _expm(M)
+            step = (E[:2, :2], E[:2, 2])
+            if len(self._discretization) >= DISCRETIZATION_CACHE_SIZE:
+                self._discretization.clear()
+            self._discretization[key] = step
+
+        phi, gamma = step
+        state = phi @ np.array([self.currDeltaTemp, self.frameDeltaTemp]) + gamma * self.currWattLoss
+        self.currDeltaTemp, self.frameDeltaTemp = float(state[0]), float(state[1])
+
+        self.currentTemperature = self.ambientTemperature + self.currDeltaTemp
+
+
     def ifStateChanged(self):
 
 
-        pass
\ No newline at end of file
+        pass
+
+
+    def ApplyProfile(self, profile):
+        """Set the motor constants from a profile dict (see thermalFit.save_profile)."""
+        integrator = profile.get("integrator", self.integrator)
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"unknown integrator {integrator!r}, expected one of {', '.join(INTEGRATORS)}")
+        for name, value in profile.items():
+            setattr(self, name, value)
+        self._discretization.clear()
+
+
+    def ReplayRun(self, loss_watts, timestamps):
+        """
+        Replay a recorded run through this motor's constants without touching the live state.
+        See replay_trajectory for the arguments and result.
+        """
+        return replay_trajectory(loss_watts, timestamps,
+                                 self.SurfaceArea, self.SpecificHeatDisipation,
+                                 self.WeightActiveParts, self.SpecificHeat,
+                                 self.ambientTemperature, integrator=self.integrator,
+                                 timeScale=self.timeScale)
+
+
+def replay_trajectory(loss_watts, timestamps, SurfaceArea, SpecificHeatDisipation,
+                      WeightActiveParts, SpecificHeat, ambientTemperature, initialDeltaTemp=0.0,
+                      integrator="euler", timeScale=TemperatureCalculation.timeScale):
+    """
+    Integrate a whole recorded run in one pass, reproducing UpdateParameters step for step.
+    integrator "euler" keeps the deltaTime scaling and small-rise snap to zero of the
+    original step; "exact" uses the analytic first-order solution (no snap).
+
+    loss_watts: losses per sample in the same units UpdateParameters takes (kW)
+    timestamps: sample times in seconds; the first sample gets deltaTime = 0
+    Returns a ThermalTrajectory of NumPy arrays.
+
+    Each step is the linear recurrence d[k+1] = a[k] * d[k] + b[k], solved per block with
+    cumulative products; a block is cut short and restarted wherever the snap triggers.
+    """
+    if integrator not in ("euler", "exact"):
+        raise ValueError(f"replay supports the euler and exact integrators, not {integrator!r}")
+
+    loss = np.asarray(loss_watts, dtype=float)
+    t = np.asarray(timestamps, dtype=float)
+    n = len(loss)
+
+    dt = np.zeros(n)
+    dt[1:] = np.diff(t)
+    dt *= timeScale
+
+    heatCapacity = WeightActiveParts * SpecificHeat
+    dissipation = SurfaceArea * SpecificHeatDisipation
+    snap = integrator == "euler"
+    if snap:
+        decay = dissipation * dt / heatCapacity          # 1 - a[k]
+        drive = loss * 1000 * dt / heatCapacity          # b[k]
+    else:
+        decay = -np.expm1(-dissipation * dt / heatCapacity)
+        drive = loss * 1000 / dissipation * decay
+
+    delta = np.empty(n)
+    d = float(initialDeltaTemp)
+    k = 0
+    while k < n:
+        end = min(k + REPLAY_BLOCK, n)
+        a = 1.0 - decay[k:end]
+        b = drive[k:end]
+
+        with np.errstate(all="ignore"):
+            prod = np.cumprod(a)
+            out = prod * (d + np.cumsum(b / prod))
+        if not np.all(np.isfinite(out)):
+            # Degenerate step (a <= 0 or underflow, e.g. a long gap between samples): solve sequentially
+            out = np.empty(end - k)
+            x = d
+            for i in range(end - k):
+                x = a[i] * x + b[i]
+                out[i] = x
+
+        if snap:
+            prev = np.empty(end - k)
+            prev[0] = d
+            prev[1:] = out[:-1]
+            rise = b - decay[k:end] * prev
+            snapped = np.flatnonzero((np.abs(rise) < 1e-6) & (out != 0))
+        else:
+            snapped = ()
+
+        if len(snapped):
+            j = snapped[0]
+            delta[k:k + j] = out[:j]
+            delta[k + j] = 0.0
+            d = 0.0
+            k += j + 1
+        else:
+            delta[k:end] = out
+            d = out[-1]
+            k = end
+
+    timeConstant = np.full(n, WeightActiveParts * SpecificHeat / SurfaceArea * SpecificHeatDisipation / 3600)
+    maximumTemp = loss * 1000 / SurfaceArea / SpecificHeatDisipation
+    return ThermalTrajectory(ambientTemperature + delta, delta, timeConstant, maximumTemp)
@@ -1,19 +1,28 @@
 #!/usr/bin/env python
-import minimalmodbus
+import time
 
-minimalmodbus.CLOSE_PORT_AFTER_EACH_CALL = True
+from modbusPoller import ModbusPoller, ModbusPoint
 
-instrument = minimalmodbus.Instrument('COM5', 1) # port name, slave address (in decimal)
+# Torque / speed transducer on RS485 (port name, slave address in decimal)
+PORT = 'COM5'
+UNIT = 1
 
-instrument.serial.port =  'COM5'         # this is the serial port name
-instrument.serial.baudrate = 19200   # Baud
-instrument.serial.bytesize = 8
-instrument.serial.stopbits = 1
-instrument.serial.timeout  = 0.05   # seconds
-instrument.debug = True
-## Read temperature (PV = ProcessValue) ##
-value = instrument.read_registers(0, 2)[1] # Registernumber, number of decimals
-#2,2 for speed at second element
-#0,2 for torque
-print(value)
+# Registers 0-1 and 2-3; the value is the second register of each pair
+POINTS = [
+    ModbusPoint("torque", UNIT, 1),
+    ModbusPoint("speed", UNIT, 3),
+]
 
+# Port stays open; torque and speed are merged into one read and polled back to back
+poller = ModbusPoller(PORT, POINTS, baudrate=19200, bytesize=8, stopbits=1)
+poller.start()
+try:
+    while True:
+        time.sleep(1.0)
+        for timestamp, unit, values in poller.drain():
+            print(f"{timestamp:.4f} unit {unit}: torque {values['torque']} speed {values['speed']}")
+        print(poller.stats())
+except KeyboardInterrupt:
+    pass
+finally:
+    poller.stop()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driveSimulator import DriveSimulator
+
+
+@pytest.fixture
+def simulator():
+    """A simulated PowerFlex525 on an ephemeral local port."""
+    sim = DriveSimulator(port=0, seed=1).start()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def drive(simulator, tmp_path, monkeypatch):
+    """PowerFlex525 connected to the simulator, descriptors cached under tmp_path."""
+    from AB525 import PowerFlex525
+    monkeypatch.setenv("PF525_PARAM_CACHE", str(tmp_path / "param_descriptors.json"))
+    pf = PowerFlex525(simulator.path)
+    pf.connect()
+    yield pf
+    pf.disconnect()
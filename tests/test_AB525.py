@@ -0,0 +1,36 @@
+import struct
+
+from AB525 import build_multiple_service_request, parse_multiple_service_response
+
+
+def test_build_multiple_service_request():
+    data = build_multiple_service_request([(0x0E, 0x93, 41, 9, b""), (0x10, 0x93, 300, 9, b"\x01\x00")])
+    first = bytes([0x0E, 3, 0x20, 0x93, 0x24, 41, 0x30, 9])
+    second = bytes([0x10, 4, 0x20, 0x93, 0x25, 0x00]) + struct.pack("<H", 300) + bytes([0x30, 9, 1, 0])
+    assert data == struct.pack("<3H", 2, 6, 6 + len(first)) + first + second
+
+
+def test_parse_multiple_service_response():
+    replies = [
+        bytes([0x8E, 0, 0, 0]) + struct.pack("<h", -5),     # success with data
+        bytes([0x8E, 0, 0x05, 0]),                           # path destination unknown
+        bytes([0x90, 0, 0x1F, 1]) + b"\x34\x12",             # error with one extended status word
+        bytes([0x90, 0, 0, 0]),                              # success, no data
+    ]
+    offsets, offset = [], 2 + 2 * len(replies)
+    for reply in replies:
+        offsets.append(offset)
+        offset += len(reply)
+    data = struct.pack(f"<{len(replies) + 1}H", len(replies), *offsets) + b"".join(replies)
+    assert parse_multiple_service_response(data) == [(0, struct.pack("<h", -5)), (0x05, b""),
+                                                     (0x1F, b""), (0, b"")]
+
+
+def test_write_params_reports_real_status(drive, simulator):
+    # 41 and 42 have descriptors; 900 does not exist, so it gets no descriptor and its probing write fails
+    flags = drive.write_params([(41, 500), (900, 1), (42, 600)])
+    assert flags == [True, False, True]
+    assert 900 in drive.noDescriptor
+    assert (simulator.model.params[41], simulator.model.params[42]) == (500, 600)
+    assert drive.write_param(900, 1) is False
+    assert drive.write_param(41, 400) is True
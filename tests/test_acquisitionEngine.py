@@ -0,0 +1,109 @@
+import math
+import time
+
+import pytest
+
+from acquisitionEngine import AcquisitionEngine
+
+PERIOD = 0.02
+
+
+class FakeDrive:
+    """Answers telemetry reads after readTime seconds; slow[i] overrides the read time of poll i."""
+
+    def __init__(self, readTime=0.002, slow=None, fail=()):
+        self.ip = "fake"
+        self.io = None
+        self.linkUp = True
+        self.readTime = readTime
+        self.slow = slow or {}
+        self.fail = set(fail)
+        self.calls = []
+
+    def flush_speed(self):
+        return False
+
+    def read_params(self, params, divisors, default=0):
+        poll = sum(1 for c in self.calls if c == "read")
+        self.calls.append("read")
+        time.sleep(self.slow.get(poll, self.readTime))
+        if poll in self.fail:
+            return [default] * len(params)
+        return [230.0, 1.5, 1450, 320]
+
+
+def collect(engine, count, timeout=5.0):
+    engine.start()
+    deadline = time.monotonic() + timeout
+    while engine.pollCount < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+    engine.stop()
+    samples = engine.drain()
+    assert len(samples) >= count
+    return samples[:count]
+
+
+def test_ticks_do_not_drift():
+    engine = AcquisitionEngine(FakeDrive(readTime=0.005), period=PERIOD)
+    samples = collect(engine, 25)
+    start = samples[0].timestamp
+    for k, sample in enumerate(samples):
+        # Each tick keeps the phase of the first one instead of adding up read time and timer error
+        assert sample.timestamp - start == pytest.approx(k * PERIOD, abs=0.008)
+    assert engine.overruns == 0
+    assert all(s.valid for s in samples)
+
+
+def test_slow_poll_skips_missed_ticks_and_keeps_phase():
+    # Poll 3 takes 2.5 periods: the deadlines of the two ticks it overran are skipped
+    engine = AcquisitionEngine(FakeDrive(slow={3: 2.5 * PERIOD}), period=PERIOD)
+    samples = collect(engine, 8)
+    assert engine.overruns == 2
+    start = samples[0].timestamp
+    assert samples[3].timestamp - start == pytest.approx(3 * PERIOD, abs=0.008)
+    assert samples[4].timestamp - start == pytest.approx(6 * PERIOD, abs=0.008)
+    assert samples[5].timestamp - start == pytest.approx(7 * PERIOD, abs=0.008)
+
+
+def test_invalid_samples_are_flagged_and_keep_dt():
+    pf = FakeDrive(fail={2, 3})
+    engine = AcquisitionEngine(pf, period=PERIOD)
+    samples = collect(engine, 6)
+    assert [s.valid for s in samples] == [True, True, False, False, True, True]
+    assert engine.invalidCount == 2
+    assert math.isnan(samples[2].voltage) and not samples[2].stale
+    # The first valid sample after the gap spans it, so no time is lost
+    assert samples[4].dt == pytest.approx(samples[4].timestamp - samples[1].timestamp)
+
+
+def test_failed_read_while_link_down_is_stale():
+    pf = FakeDrive(fail={0})
+    pf.linkUp = False
+    engine = AcquisitionEngine(pf, period=PERIOD)
+    sample = collect(engine, 1)[0]
+    assert not sample.valid and sample.stale
+
+
+def test_commands_run_before_the_next_poll():
+    pf = FakeDrive()
+    engine = AcquisitionEngine(pf, period=PERIOD)
+    engine.submit(pf.calls.append, "start")
+    collect(engine, 2)
+    assert pf.calls[:2] == ["start", "read"]
+
+
+def test_failing_command_does_not_stop_polling(capsys):
+    def broken():
+        raise RuntimeError("no drive")
+    engine = AcquisitionEngine(FakeDrive(), period=PERIOD)
+    engine.submit(broken)
+    collect(engine, 3)
+    assert "ERROR running drive command broken: no drive" in capsys.readouterr().out
+
+
+def test_polls_the_simulator(drive):
+    engine = AcquisitionEngine(drive, period=PERIOD)
+    engine.submit(drive.write_PCCC_param, True)
+    samples = collect(engine, 10)
+    assert all(s.valid for s in samples)
+    assert samples[-1].busVoltage > 0
@@ -0,0 +1,146 @@
+import asyncio
+import struct
+
+import pytest
+
+import enipFrames
+from asyncAB525 import AsyncPowerFlex525, CIPError, EnipTransport, _path
+from driveSimulator import cip_reply
+from enipFrames import CMD_REGISTER_SESSION, CMD_SEND_RR_DATA, ITEM_NULL, ITEM_UNCONNECTED_DATA
+from pcccFrames import CMD_START
+
+SERVICE_GET_ATTRIBUTE_SINGLE = 0x0E
+
+
+async def read_encap(reader):
+    header = await reader.readexactly(enipFrames.HEADER.size)
+    length = struct.unpack_from("<H", header, 2)[0]
+    return enipFrames.parse_encap(header + await reader.readexactly(length))
+
+
+def rr_reply(context, status=0, data=b""):
+    body = struct.pack("<IH", 0, 0) + enipFrames.cpf([(ITEM_NULL, b""),
+                                                     (ITEM_UNCONNECTED_DATA, cip_reply(SERVICE_GET_ATTRIBUTE_SINGLE, status, data))])
+    return enipFrames.encap(CMD_SEND_RR_DATA, body, 1, context=context)
+
+
+async def serve(handler):
+    """Start a scripted EtherNet/IP server; handler(reader, writer) runs after RegisterSession."""
+    async def session(reader, writer):
+        try:
+            command, _, _, context, data = await read_encap(reader)
+            if command == CMD_REGISTER_SESSION:
+                writer.write(enipFrames.encap(command, data, 1, context=context))
+                await handler(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    server = await asyncio.start_server(session, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_pipelined_replies_are_matched_by_context():
+    async def reverse(reader, writer):
+        # Reply only once four requests are outstanding, newest first
+        requests = [await read_encap(reader) for _ in range(4)]
+        for _, _, _, context, data in reversed(requests):
+            instance = data[-3]                     # ... 0x24 <instance> 0x30 <attribute>
+            writer.write(rr_reply(context, data=struct.pack("<H", instance * 10)))
+
+    async def main():
+        server, port = await serve(reverse)
+        transport = EnipTransport("127.0.0.1", port, timeout=2.0)
+        try:
+            replies = await asyncio.gather(*(transport.request(SERVICE_GET_ATTRIBUTE_SINGLE, _path(0x93, n, 9))
+                                             for n in (1, 2, 3, 4)))
+        finally:
+            await transport.close()
+            server.close()
+        return [struct.unpack("<H", r)[0] for r in replies]
+
+    assert asyncio.run(main()) == [10, 20, 30, 40]
+
+
+def test_cip_error_status_raises():
+    async def reject(reader, writer):
+        _, _, _, context, _ = await read_encap(reader)
+        writer.write(rr_reply(context, status=0x05))
+        await reader.read()
+
+    async def main():
+        server, port = await serve(reject)
+        transport = EnipTransport("127.0.0.1", port, timeout=2.0)
+        try:
+            with pytest.raises(CIPError) as info:
+                await transport.request(SERVICE_GET_ATTRIBUTE_SINGLE, _path(0x93, 900, 9))
+            assert info.value.status == 0x05
+            assert transport.connected
+        finally:
+            await transport.close()
+            server.close()
+
+    asyncio.run(main())
+
+
+def test_dropped_link_fails_pending_requests_and_reopens():
+    sessions = []
+
+    async def hang_up_once(reader, writer):
+        sessions.append(writer)
+        _, _, _, context, _ = await read_encap(reader)
+        if len(sessions) == 1:
+            return                                  # close without replying
+        writer.write(rr_reply(context, data=b"\x07\x00"))
+        await reader.read()
+
+    async def main():
+        server, port = await serve(hang_up_once)
+        transport = EnipTransport("127.0.0.1", port, timeout=2.0)
+        try:
+            with pytest.raises(ConnectionError, match="lost"):
+                await transport.request(SERVICE_GET_ATTRIBUTE_SINGLE, _path(0x93, 1, 9))
+            assert not transport.connected
+            assert await transport.request(SERVICE_GET_ATTRIBUTE_SINGLE, _path(0x93, 1, 9)) == b"\x07\x00"
+        finally:
+            await transport.close()
+            server.close()
+        return len(sessions)
+
+    assert asyncio.run(main()) == 2
+
+
+def test_silent_server_times_out_and_stays_closed():
+    async def main():
+        async def silent(reader, writer):
+            await reader.read()
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        transport = EnipTransport("127.0.0.1", server.sockets[0].getsockname()[1], timeout=0.2)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await transport.open()
+            assert not transport.connected
+        finally:
+            server.close()
+
+    asyncio.run(main())
+
+
+def test_drive_calls_against_the_simulator(simulator, tmp_path, monkeypatch):
+    monkeypatch.setenv("PF525_PARAM_CACHE", str(tmp_path / "param_descriptors.json"))
+
+    async def main():
+        async with AsyncPowerFlex525(simulator.path, timeout=2.0) as pf:
+            assert await pf.load_descriptors([41, 42])
+            assert await pf.write_param(41, 250)
+            assert await pf.read_param(41) == 250
+            values = await pf.read_params(list(range(1, 60)), default=None)
+            assert None not in values and len(values) == 59
+            assert await pf.read_param(900, default=-1) == -1
+            assert await pf.control(CMD_START, 20.0)
+            await asyncio.sleep(0.3)
+            return await pf.read_param(1, 100)
+
+    frequency = asyncio.run(main())
+    assert simulator.model.running and simulator.model.reference == 20.0
+    assert frequency > 0
@@ -0,0 +1,85 @@
+import math
+
+import pytest
+
+import derivedQuantities
+import temperatureCalculation
+from acquisitionEngine import Sample
+from derivedQuantities import Pipeline, RECORD_COLUMNS, RECORD_FIELDS, record_row
+
+
+def samples():
+    """A short run: (timestamp, voltage, current, rpm, bus voltage), 50 ms apart."""
+    out = []
+    prev = None
+    for i, (voltage, current, rpm) in enumerate([(0.0, 0.0, 0.0), (115.0, 1.9, 850.0),
+                                                 (230.0, 3.2, 1700.0), (231.5, 3.4, 1712.0)]):
+        timestamp = 100.0 + 0.05 * i
+        out.append(Sample(timestamp, 0.0 if prev is None else timestamp - prev, voltage, current, rpm,
+                          320.0, 0.002))
+        prev = timestamp
+    return out
+
+
+def legacy_process(calculator, sample, torque=None, shaftSpeed=None):
+    """The per-sample arithmetic of CalibrationGUI.processSample before the pipeline existed."""
+    inputPower = sample.voltage * sample.voltage / 1000
+    if torque is None:
+        torque = calculator.TorqueConstant * sample.current
+    if shaftSpeed is None:
+        shaftSpeed = sample.rpm
+    outPower = torque * shaftSpeed / 9550
+    try:
+        efficiency = outPower / inputPower * 100
+    except ZeroDivisionError:
+        efficiency = 0.0
+    loss = inputPower - outPower
+    i2r = sample.current ** 2 * calculator.StatorResistance / 1000
+    calculator.UpdateParameters(loss, sample.dt)
+    return {"inputPower": inputPower, "torque": torque, "shaftPower": outPower, "efficiency": efficiency,
+            "loss": loss, "i2r": i2r, "deltaTemp": calculator.currDeltaTemp,
+            "timeConstant": calculator.timeConstant, "maxTempRise": calculator.maximumTemp,
+            "temperature": calculator.currentTemperature}
+
+
+@pytest.mark.parametrize("measured", [False, True])
+def test_pipeline_matches_legacy_process_sample(measured):
+    pipeline = Pipeline(temperatureCalculation.TemperatureCalculation())
+    legacy = temperatureCalculation.TemperatureCalculation()
+    for sample in samples():
+        torque, speed = (2.5, 1690.0) if measured else (None, None)
+        record = pipeline.process(sample, torque, speed, 30.0)
+        expected = legacy_process(legacy, sample, torque, speed)
+        for name, value in expected.items():
+            assert getattr(record, name) == pytest.approx(value), name
+        assert record.commandedFreq == 30.0
+
+
+def test_time_is_relative_to_first_sample():
+    pipeline = Pipeline(temperatureCalculation.TemperatureCalculation())
+    times = [pipeline.process(sample).time for sample in samples()]
+    assert times == pytest.approx([0.0, 0.05, 0.1, 0.15])
+    pipeline.reset()
+    assert pipeline.process(samples()[2]).time == 0.0
+
+
+def test_evaluation_order_respects_dependencies():
+    pipeline = Pipeline(temperatureCalculation.TemperatureCalculation())
+    available = set(derivedQuantities.MEASURED_FIELDS)
+    for name, _, inputs in pipeline.steps:
+        assert set(inputs) <= available, name
+        available.add(name)
+    assert {name for name, _, _ in pipeline.steps} == set(derivedQuantities.QUANTITIES)
+
+
+def test_nan_measurement_falls_back_to_model():
+    model = temperatureCalculation.TemperatureCalculation()
+    assert derivedQuantities.torque(model, 2.0, math.nan) == pytest.approx(2.0 * model.TorqueConstant)
+    assert derivedQuantities.shaftSpeed(model, 1700.0, math.nan) == 1700.0
+
+
+def test_record_row_follows_record_columns():
+    record = Pipeline(temperatureCalculation.TemperatureCalculation()).process(samples()[2], commandedFreq=30.0)
+    row = record_row(record)
+    assert len(row) == len(RECORD_COLUMNS)
+    assert dict(zip(RECORD_COLUMNS, row)) == {column: getattr(record, field) for column, field in RECORD_FIELDS}
@@ -0,0 +1,53 @@
+import ipaddress
+
+import discovery
+from discovery import Discovery, list_identity, parse_list_identity
+from driveSimulator import DriveSimulator, PRODUCT_CODE, PRODUCT_NAME, VENDOR_ID
+
+
+def test_parse_list_identity(simulator):
+    device, = parse_list_identity(simulator.identity_items(), ("10.0.0.5", 44818))
+    assert (device.ip, device.port) == ("10.0.0.5", simulator.port)
+    assert (device.vendor, device.productCode, device.serial) == (VENDOR_ID, PRODUCT_CODE, simulator.serial)
+    assert device.productName == PRODUCT_NAME.decode()
+    assert device.revision == "7.1"
+
+
+def test_parse_skips_short_and_foreign_items():
+    assert parse_list_identity(b"\x01\x00\x0c\x00\x02\x00\x01\x00", ("10.0.0.5", 44818)) == []
+
+
+def test_list_identity_unicast(simulator):
+    devices = list_identity(["127.0.0.1"], port=simulator.port, timeout=0.2)
+    assert list(devices) == ["127.0.0.1"]
+    assert devices["127.0.0.1"].serial == simulator.serial
+
+
+def test_sweep_finds_simulator_and_caches(monkeypatch):
+    sim = DriveSimulator(port=0).start()
+    finder = Discovery(timeout=0.2, port=sim.port)
+    try:
+        devices = finder.scan(sweep=True, networks=["127.0.0.0/30"])
+    finally:
+        sim.stop()
+    assert [d.serial for d in devices] == [sim.serial]
+
+    # Within the TTL the same scan is answered from the cache without sending anything
+    monkeypatch.setattr(discovery, "list_identity", None)
+    assert finder.scan(sweep=True, networks=["127.0.0.0/30"]) == devices
+
+
+def test_scan_targets_broadcasts_then_sweep_hosts(monkeypatch):
+    calls = []
+
+    def fake_list_identity(targets, port, timeout, parallel):
+        calls.append([str(t) for t in targets])
+        return {}
+
+    monkeypatch.setattr(discovery, "list_identity", fake_list_identity)
+    finder = Discovery(ttl=0.0)
+    finder.scan(sweep=True, networks=[ipaddress.IPv4Network("192.168.1.0/30")])
+    finder.scan(networks=["192.168.1.0/30"], refresh=True)
+    assert calls == [["255.255.255.255", "192.168.1.3", "192.168.1.1", "192.168.1.2"],
+                     ["255.255.255.255", "192.168.1.3"]]
+    assert finder.devices() == []
@@ -0,0 +1,123 @@
+import struct
+
+import pytest
+
+from driveConfig import DriveConfigurator, DriveImage, MAXIMUM_FREQ, MOTOR_PARAMS, motor_config
+from paramCache import ParamDescriptor
+
+
+class FakeDrive:
+    """Stores raw values the way the drive does (float32 for REAL parameters)."""
+
+    def __init__(self, descriptors, values):
+        self.descriptors = descriptors
+        self.values = dict(values)
+        self.revisionKey = "150-7.1"
+        self.reject = set()
+
+    def read_params(self, params, divideBy=1, default=0):
+        return [self.values.get(param, default) for param in params]
+
+    def write_params(self, values):
+        flags = []
+        for param, value in values:
+            desc = self.descriptors[param]
+            if param not in self.reject:
+                self.values[param] = desc.decode(desc.encode(value))
+            flags.append(param not in self.reject)
+        return flags
+
+    def fetch_descriptors(self, params):
+        return True
+
+
+def test_drive_image_round_trip(tmp_path):
+    path = str(tmp_path / "bench.drv")
+    image = DriveImage({31: 230, 41: 1000, 600: 1.25, 44: 15000}, "150-7.1", created=1700000000.5)
+    image.save(path)
+    loaded = DriveImage.load(path)
+    assert loaded.values == image.values
+    assert isinstance(loaded.values[31], int)
+    assert loaded.revisionKey == "150-7.1"
+    assert loaded.created == 1700000000.5
+    assert list(tmp_path.iterdir()) == [tmp_path / "bench.drv"]
+
+
+def test_drive_image_without_revision(tmp_path):
+    path = str(tmp_path / "bench.drv")
+    DriveImage({}).save(path)
+    loaded = DriveImage.load(path)
+    assert loaded.values == {}
+    assert loaded.revisionKey is None
+
+
+def test_drive_image_rejects_bad_files(tmp_path):
+    path = str(tmp_path / "bench.drv")
+    DriveImage({31: 230, 32: 60}).save(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-4])
+    with pytest.raises(ValueError, match="truncated"):
+        DriveImage.load(path)
+    with open(path, "wb") as f:
+        f.write(b"not an image")
+    with pytest.raises(ValueError):
+        DriveImage.load(path)
+
+
+def test_motor_config_scales_and_orders():
+    motor = {"npVolts": 230, "npHz": 60, "olCurrent": 4.6, "npFla": 4.6, "numPoles": 4, "npRpm": 1750,
+             "npPower": 0.75, "irVolt": 5.2, "ixdVolt": 1.1, "ixqVolt": 2.3, "bemf": 210}
+    config = motor_config(motor)
+    assert list(config) == [MAXIMUM_FREQ[0]] + [param for param, _, _ in MOTOR_PARAMS]
+    assert config[33] == pytest.approx(46)
+    assert config[37] == pytest.approx(75)
+    assert config[504] == pytest.approx(2100)
+
+
+def real(number):
+    return ParamDescriptor(number, "Gain", "", "REAL", "f", 0, -1e6, 1e6, 0.0)
+
+
+def uint(number):
+    return ParamDescriptor(number, "Word", "", "UINT", "H", 0, 0, 65535, 0)
+
+
+def test_real_values_converge_after_apply():
+    pf = FakeDrive({600: real(600), 601: uint(601)}, {600: 0.0, 601: 0})
+    config = DriveConfigurator(pf)
+    result = config.apply({600: 0.1, 601: 40000})
+    assert result and result.changed == [600, 601]
+    assert pf.values[600] == struct.unpack("<f", struct.pack("<f", 0.1))[0]
+    assert config.diff({600: 0.1, 601: 40000}) == {}
+    assert not config.apply({600: 0.1}).changed
+
+
+def test_rejected_write_is_reported():
+    pf = FakeDrive({600: real(600), 601: uint(601)}, {600: 0.0, 601: 0})
+    pf.reject.add(601)
+    result = DriveConfigurator(pf).apply({600: 2.5, 601: 7})
+    assert not result
+    assert result.failed == [601] and result.mismatched == {}
+
+
+def test_upload_leaves_out_parameters_without_descriptor(capsys):
+    pf = FakeDrive({601: uint(601)}, {601: 40000, 602: -1})
+    image = DriveConfigurator(pf).upload([601, 602])
+    assert image.values == {601: 40000}
+    assert image.revisionKey == "150-7.1"
+    assert "1 parameter(s) without a descriptor" in capsys.readouterr().out
+
+
+def test_upload_and_download_against_the_simulator(drive, simulator):
+    config = DriveConfigurator(drive)
+    image = config.upload(range(31, 61))
+    assert len(image.values) == 30
+    assert image.values[41] == simulator.model.params[41]
+
+    image.values[41] = 750
+    image.values[42] = 1250
+    result = config.download(image)
+    assert result and sorted(result.changed) == [41, 42]
+    assert simulator.model.params[41] == 750
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from AB525 import PowerFlex525
+from driveFleet import DriveFleet
+from driveSimulator import DriveSimulator
+
+PERIOD = 0.02
+
+
+class FakeDrive:
+    """Minimal PowerFlex525 stand-in recording what the fleet did with it."""
+
+    def __init__(self, readTime=0.001):
+        self.ip = "fake"
+        self.io = None
+        self.linkUp = True
+        self.readTime = readTime
+        self.calls = []
+
+    def connect(self):
+        self.calls.append("connect")
+
+    def disconnect(self):
+        self.calls.append("disconnect")
+
+    def flush_speed(self):
+        return False
+
+    def read_params(self, params, divisors, default=0):
+        time.sleep(self.readTime)
+        return [230.0, 1.5, 1450, 320]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def fleet():
+    fleet = DriveFleet(workers=4)
+    yield fleet
+    fleet.stop()
+
+
+def test_polls_every_drive_on_its_period(fleet):
+    drives = {name: FakeDrive() for name in ("a", "b", "c")}
+    for name, pf in drives.items():
+        fleet.add_drive(name, None, period=PERIOD, pf=pf)
+    fleet.start()
+    wait_for(lambda: all(d.pollCount >= 10 for d in fleet.drives.values()))
+
+    samples = fleet.drain()
+    for name, pf in drives.items():
+        own = [s for n, s in samples if n == name]
+        assert pf.calls[0] == "connect"
+        assert all(s.valid for s in own)
+        span = own[-1].timestamp - own[0].timestamp
+        assert span == pytest.approx((len(own) - 1) * PERIOD, abs=0.01)
+    assert all(d.overruns == 0 for d in fleet.drives.values())
+
+
+def test_busy_drive_counts_overruns(fleet):
+    fleet.add_drive("slow", None, period=PERIOD, pf=FakeDrive(readTime=2.5 * PERIOD))
+    fleet.start()
+    wait_for(lambda: fleet.drives["slow"].pollCount >= 4)
+    # Each poll takes 2.5 periods, so at least one tick per poll finds the drive busy
+    assert fleet.drives["slow"].overruns >= fleet.drives["slow"].pollCount
+
+
+def test_commands_run_on_the_drive_before_its_poll(fleet):
+    pf = FakeDrive()
+    fleet.add_drive("a", None, period=PERIOD, pf=pf)
+    fleet.submit("a", pf.calls.append, "start")
+    fleet.start()
+    wait_for(lambda: fleet.drives["a"].pollCount >= 1)
+    assert pf.calls[:2] == ["connect", "start"]
+
+
+def test_remove_runs_queued_commands_then_disconnects(fleet):
+    pf = FakeDrive()
+    fleet.add_drive("a", None, period=PERIOD, pf=pf)
+    fleet.start()
+    wait_for(lambda: fleet.drives["a"].pollCount >= 2)
+    fleet.submit("a", pf.calls.append, "stop")
+    fleet.remove_drive("a")
+    wait_for(lambda: "disconnect" in pf.calls)
+    assert pf.calls[-2:] == ["stop", "disconnect"]
+    assert "a" not in fleet.drives
+
+
+def test_remove_before_start_drops_the_drive(fleet):
+    pf = FakeDrive()
+    fleet.add_drive("a", None, period=PERIOD, pf=pf)
+    fleet.remove_drive("a")
+    assert fleet.drives == {}
+    assert pf.calls == []
+
+
+def test_polls_simulated_drives(tmp_path, monkeypatch):
+    monkeypatch.setenv("PF525_PARAM_CACHE", str(tmp_path / "param_descriptors.json"))
+    sims = [DriveSimulator(port=0, seed=i).start() for i in range(3)]
+    fleet = DriveFleet(workers=2)
+    try:
+        for i, sim in enumerate(sims):
+            fleet.add_drive(f"drive{i}", None, period=PERIOD, pf=PowerFlex525(sim.path))
+        fleet.start()
+        wait_for(lambda: all(d.pollCount >= 5 for d in fleet.drives.values()))
+        stats = fleet.stats()
+        assert all(s["linkUp"] and s["invalid"] == 0 for s in stats.values())
+        assert {name for name, _ in fleet.drain()} == set(stats)
+    finally:
+        fleet.stop()
+        for sim in sims:
+            sim.stop()
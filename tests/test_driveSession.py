@@ -0,0 +1,152 @@
+import pytest
+from pycomm3 import CommError
+
+import driveSession
+from driveSession import ManagedSession, SessionUnavailable
+from driveSimulator import DriveSimulator
+
+
+class FakeDriver:
+    """CIPDriver stand-in; fail holds the number of upcoming generic_message calls that raise."""
+
+    opened = []
+    fail = 0
+    refuse = 0
+
+    def __init__(self, path):
+        self.path = path
+        self.requests = []
+
+    def open(self):
+        if FakeDriver.refuse:
+            FakeDriver.refuse -= 1
+            raise CommError("connection refused")
+        FakeDriver.opened.append(self)
+
+    def close(self):
+        pass
+
+    def generic_message(self, **kwargs):
+        self.requests.append(kwargs)
+        if FakeDriver.fail:
+            FakeDriver.fail -= 1
+            raise CommError("connection reset")
+        return kwargs["instance"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(driveSession.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def session(clock):
+    FakeDriver.opened, FakeDriver.fail, FakeDriver.refuse = [], 0, 0
+    session = ManagedSession("drive", driverFactory=FakeDriver)
+    session.open()
+    return session
+
+
+def request(session, instance=1):
+    return session.generic_message(service=b"\x0e", class_code=0x93, instance=instance, attribute=9)
+
+
+def test_drop_reconnects_and_replays_once(session):
+    FakeDriver.fail = 1
+    assert request(session, 7) == 7
+    first, second = FakeDriver.opened
+    assert [r["instance"] for r in first.requests] == [7]
+    assert [r["instance"] for r in second.requests] == [7]
+    assert session.connected and session.reconnects == 1 and session.failures == 0
+
+
+def test_failed_replay_raises(session, clock):
+    FakeDriver.fail = 2
+    with pytest.raises(SessionUnavailable):
+        request(session)
+    assert not session.connected
+    assert len(FakeDriver.opened) == 2                  # one replay, no retry loop
+    assert session.nextAttempt == clock.now             # the link came up, so no backoff yet
+
+
+def test_requests_fail_fast_until_the_next_attempt(session, clock):
+    FakeDriver.fail = 2
+    with pytest.raises(SessionUnavailable):
+        request(session)
+    FakeDriver.refuse = 1
+    with pytest.raises(SessionUnavailable, match="reconnect to drive failed"):
+        request(session)
+    assert session.nextAttempt == pytest.approx(clock.now + session.backoffInitial)
+
+    opened = len(FakeDriver.opened)
+    with pytest.raises(SessionUnavailable, match="offline, reconnect in"):
+        request(session)
+    assert len(FakeDriver.opened) == opened
+
+    clock.now += session.backoffInitial
+    assert request(session, 3) == 3
+    assert session.connected and session.failures == 0
+
+
+def test_backoff_doubles_up_to_the_maximum(session, clock):
+    FakeDriver.fail = 2
+    with pytest.raises(SessionUnavailable):
+        request(session)
+    delays = []
+    FakeDriver.refuse = 9
+    for _ in range(9):
+        clock.now = session.nextAttempt
+        with pytest.raises(SessionUnavailable, match="reconnect to drive failed"):
+            request(session)
+        delays.append(session.nextAttempt - clock.now)
+    assert delays == [0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0, 30.0]
+
+
+def test_close_stops_reconnecting(session, clock):
+    session.close()
+    clock.now += 1000
+    with pytest.raises(SessionUnavailable):
+        request(session)
+    assert len(FakeDriver.opened) == 1
+
+
+def test_keepalive_only_when_idle(session, clock):
+    driver = FakeDriver.opened[0]
+    session.keepalive()
+    assert driver.requests == []
+    clock.now += session.keepaliveInterval
+    session.keepalive()
+    assert [r["class_code"] for r in driver.requests] == [driveSession.IDENTITY_CLASS]
+
+
+def test_reconnects_to_a_restarted_simulator():
+    sim = DriveSimulator(port=0).start()
+    port = sim.port
+    session = ManagedSession(sim.path, backoffInitial=0.01)
+    try:
+        session.open()
+        session.keepalive()
+        sim.stop()
+        session.keepaliveInterval = 0
+        with pytest.raises(SessionUnavailable):
+            session.generic_message(service=b"\x0e", class_code=0x01, instance=1, attribute=1)
+        assert not session.connected
+
+        sim = DriveSimulator(port=port).start()
+        session.nextAttempt = 0.0
+        response = session.generic_message(service=b"\x0e", class_code=0x01, instance=1, attribute=1)
+        assert not response.error
+        assert session.reconnects == 1
+    finally:
+        session.close()
+        sim.stop()
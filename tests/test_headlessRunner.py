@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+import headlessRunner
+from driveConfig import start_drive
+from headlessRunner import HeadlessRun, EXIT_COMPLETED
+from sampleRecorder import read_binary
+
+MOTOR = {"npVolts": 230, "npHz": 60, "olCurrent": 4.6, "npFla": 4.6, "numPoles": 4, "npRpm": 1750,
+         "npPower": 0.75, "irVolt": 5.2, "ixdVolt": 1.1, "ixqVolt": 2.3, "bemf": 210}
+
+
+@pytest.fixture
+def run_profile(simulator, tmp_path, monkeypatch):
+    monkeypatch.setenv("PF525_PARAM_CACHE", str(tmp_path / "param_descriptors.json"))
+    return {"drive": simulator.path, "motor": MOTOR, "speed": [[0.3, 20], [0.3, 40]], "pollPeriod": 0.02}
+
+
+def test_profile_starts_after_the_drive(run_profile, simulator, tmp_path, monkeypatch):
+    events = []
+
+    def slow_start_drive(pf, config):
+        time.sleep(0.3)
+        result = start_drive(pf, config)
+        events.append(("started", time.perf_counter()))
+        return result
+
+    class Runner(headlessRunner.ProfileRunner):
+        def run(self):
+            events.append(("profile", time.perf_counter()))
+            super().run()
+
+    monkeypatch.setattr(headlessRunner, "start_drive", slow_start_drive)
+    monkeypatch.setattr(headlessRunner, "ProfileRunner", Runner)
+
+    output = str(tmp_path / "run.bin")
+    run = HeadlessRun(run_profile, output)
+    assert run.run() == EXIT_COMPLETED
+    assert [name for name, _ in events] == ["started", "profile"]
+    assert events[1][1] >= events[0][1]
+
+    columns, rows = read_binary(output)
+    assert len(rows) > 10
+    assert not simulator.model.running                 # stopped on the way out
+
+
+def test_failed_start_ends_the_run(run_profile, tmp_path, monkeypatch):
+    def broken(pf, config):
+        raise RuntimeError("start refused")
+
+    monkeypatch.setattr(headlessRunner, "start_drive", broken)
+    run = HeadlessRun(run_profile, str(tmp_path / "run.csv"))
+    with pytest.raises(RuntimeError, match="start refused"):
+        run.run()
+    assert run.runner is None
+
+
+def test_model_integrator_from_profile(run_profile, tmp_path):
+    profiles = tmp_path / "motor_profiles.json"
+    profiles.write_text('{"10340": {"SpecificHeat": 500.0, "integrator": "exact"}}', encoding="utf-8")
+    run_profile["thermalProfile"] = "10340"
+    assert headlessRunner.build_model(run_profile, str(profiles)).integrator == "exact"
+    run_profile["model"] = {"integrator": "network"}
+    assert headlessRunner.build_model(run_profile, str(profiles)).integrator == "network"
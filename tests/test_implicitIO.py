@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from implicitIO import IOConnection, INPUT_FIELDS
+from pcccFrames import CMD_START
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_open_io_exchanges_data_with_the_simulator(drive, simulator):
+    assert drive.open_io(rpi=0.010, localPort=0)
+    io = drive.io
+    try:
+        assert io.toApi == pytest.approx(0.010)
+        assert io.localPort != 0
+        wait_for(lambda: io.packetsIn >= 50)
+        assert io.alive and drive.linkUp
+        assert io.lost == 0 and io.duplicates == 0 and io.timeouts == 0
+        assert set(io.values()) == set(INPUT_FIELDS)
+        assert io.values()["busVoltage"] > 0
+        assert simulator.stats()["ioConnections"] == 1
+        assert simulator.ioPacketsIn > 0
+    finally:
+        drive.close_io()
+    assert drive.io is None
+    assert not io.connected
+    assert simulator.stats()["ioConnections"] == 0
+
+
+def test_output_image_reaches_the_drive(simulator):
+    io = IOConnection("127.0.0.1", 0.010, tcpPort=simulator.port, localPort=0)
+    io.open()
+    try:
+        io.pulse(CMD_START, 30.0)
+        wait_for(lambda: simulator.model.running and simulator.model.reference == 30.0)
+        wait_for(lambda: io.values()["frequency"] > 0)
+    finally:
+        io.close()
+
+
+def test_silent_adapter_times_out(simulator):
+    io = IOConnection("127.0.0.1", 0.010, tcpPort=simulator.port, localPort=0)
+    io.open()
+    try:
+        wait_for(lambda: io.alive)
+        simulator.stop()                            # no more T->O packets
+        wait_for(lambda: io.timeouts == 1)
+        assert not io.alive
+    finally:
+        io.close()
@@ -0,0 +1,80 @@
+import sys
+import threading
+
+import metrics
+
+
+def make_registry():
+    registry = metrics.Registry()
+    registry.enabled = True
+    return registry
+
+
+def test_disabled_registry_records_nothing():
+    registry = metrics.Registry()
+    registry.inc("requests_total")
+    assert registry.timer("request_seconds") is metrics.NULL_TIMER
+    assert registry.snapshot() == []
+
+
+def test_mixed_label_types_snapshot_and_export():
+    registry = make_registry()
+    registry.inc("param_read_errors_total", param=3)
+    registry.inc("param_read_errors_total", param="batch")
+    registry.inc("param_read_errors_total", param=3)
+
+    snapshot = registry.snapshot()
+    assert [(labels["param"], metric.value) for _, labels, metric in snapshot] == [("3", 2.0), ("batch", 1.0)]
+
+    text = registry.export_text()
+    assert 'param_read_errors_total{param="3"} 2.0' in text
+    assert 'param_read_errors_total{param="batch"} 1.0' in text
+
+
+def test_int_and_str_label_share_a_series():
+    registry = make_registry()
+    registry.inc("param_writes_total", param=41)
+    registry.inc("param_writes_total", param="41")
+    assert len(registry.snapshot()) == 1
+
+
+def test_histogram_buckets_and_quantile():
+    registry = make_registry()
+    for value in (0.001, 0.002, 0.003, 0.004):
+        registry.observe("request_seconds", value)
+    (_, _, histogram), = registry.snapshot()
+    assert histogram.count == 4
+    assert histogram.max == 0.004
+    assert 0.001 <= histogram.quantile(0.5) <= 0.0025
+
+    text = registry.export_text()
+    assert 'request_seconds_bucket{le="+Inf"} 4' in text
+    assert "request_seconds_count 4" in text
+
+
+def test_write_prometheus(tmp_path):
+    registry = make_registry()
+    registry.inc("poll_overruns_total")
+    path = str(tmp_path / "cortex.prom")
+    registry.write_prometheus(path)
+    with open(path, encoding="utf-8") as f:
+        assert "poll_overruns_total 1.0" in f.read()
+
+
+def test_counter_increments_from_many_threads_are_not_lost():
+    registry = make_registry()
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)                 # switch threads as often as possible
+    try:
+        def work():
+            for _ in range(20000):
+                registry.inc("poll_overruns_total", drive="a")
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    (_, _, counter), = registry.snapshot()
+    assert counter.value == 8 * 20000
@@ -0,0 +1,46 @@
+import struct
+
+from modbusPoller import FUNC_READ_INPUT, ModbusPoint, ReadBlock, crc16, frame_timing, merge_ranges
+
+
+def test_crc16_known_frames():
+    assert struct.pack("<H", crc16(bytes.fromhex("010300000002"))) == bytes.fromhex("c40b")
+    assert struct.pack("<H", crc16(bytes.fromhex("1103006b0003"))) == bytes.fromhex("7687")
+    assert crc16(b"") == 0xFFFF
+
+
+def test_frame_timing():
+    charTime, t15, t35 = frame_timing(9600)
+    assert charTime == 10 / 9600
+    assert t35 == 3.5 * charTime
+    assert frame_timing(115200)[1:] == (0.00075, 0.00175)
+
+
+def test_merge_ranges_bridges_small_gaps():
+    points = [
+        ModbusPoint("torque", 1, 0, "i"),
+        ModbusPoint("speed", 1, 4, "H"),            # 2 register gap: same block
+        ModbusPoint("far", 1, 40, "H"),             # past DEFAULT_MAX_GAP: new block
+        ModbusPoint("other", 2, 0, "f"),
+        ModbusPoint("input", 1, 0, "H", function=FUNC_READ_INPUT),
+    ]
+    blocks = merge_ranges(points)
+    assert [(b.unit, b.function, b.address, b.count, [p.name for p in b.points]) for b in blocks] == [
+        (1, 3, 0, 5, ["torque", "speed"]),
+        (1, 3, 40, 1, ["far"]),
+        (1, 4, 0, 1, ["input"]),
+        (2, 3, 0, 2, ["other"]),
+    ]
+
+
+def test_merge_ranges_respects_max_registers():
+    points = [ModbusPoint(f"p{i}", 1, i * 4, "H") for i in range(10)]
+    blocks = merge_ranges(points, maxGap=8, maxRegisters=10)
+    assert all(b.count <= 10 for b in blocks)
+    assert sorted(p.name for b in blocks for p in b.points) == sorted(p.name for p in points)
+
+
+def test_read_block_decode():
+    block = ReadBlock(1, 3, 10, 4, [ModbusPoint("torque", 1, 10, "i", 100), ModbusPoint("speed", 1, 13, "h")])
+    registers = list(struct.unpack(">4H", struct.pack(">ihh", -12345, 0, -7)))
+    assert block.decode(registers) == {"torque": -123.45, "speed": -7.0}
@@ -0,0 +1,57 @@
+import json
+import struct
+
+import pytest
+
+import paramCache
+from paramCache import ParamCache, ParamDescriptor, decode_read_basic
+
+
+def read_basic(descriptor, value, minimum, maximum, default, name, units, fmt="i"):
+    return (struct.pack("<I" + fmt * 4, descriptor, value, minimum, maximum, default)
+            + name.encode("ascii").ljust(16, b"\x00") + units.encode("ascii").ljust(4, b"\x00"))
+
+
+def test_decode_signed_int_with_decimals():
+    # UINT (3) + signed bit, 2 decimal places
+    desc = decode_read_basic(41, read_basic(0x0B | 2 << 8, 1000, 0, 60000, 1000, "Accel Time 1", "Secs"))
+    assert desc == ParamDescriptor(41, "Accel Time 1", "Secs", "INT", "h", 2, 0, 60000 - 65536, 1000)
+    assert desc.divisor == 100
+    assert desc.size == 2
+    assert desc.encode(-2) == b"\xfe\xff"
+    assert desc.decode(b"\x10\x27") == 10000
+
+
+def test_decode_unsigned_and_real():
+    desc = decode_read_basic(5, read_basic(0x03, 320, 0, 1200, 0, "DC Bus Voltage", "VDC"))
+    assert (desc.dataType, desc.format, desc.maximum) == ("UINT", "H", 1200)
+    real = decode_read_basic(600, read_basic(0x06 | 1 << 8, 0, 0, 0, 0, "Gain", "", fmt="I"))
+    assert (real.dataType, real.format, real.decimals) == ("REAL", "f", 1)
+    assert real.encode(1.5) == struct.pack("<f", 1.5)
+
+
+def test_decode_short_reply():
+    with pytest.raises(ValueError):
+        decode_read_basic(1, b"\x00" * 39)
+
+
+def test_cache_save_merges_other_writers(tmp_path):
+    path = str(tmp_path / "cache" / "descriptors.json")
+    first = ParamCache(path)
+    second = ParamCache(path)
+    desc = decode_read_basic(41, read_basic(0x0B, 1000, 0, 6000, 1000, "Accel Time 1", "Secs"))
+    first.update("150-7.1", [desc])
+    second.update("150-8.0", [desc._replace(number=42)])
+    assert first.save() and second.save()
+
+    with open(path, encoding="utf-8") as f:
+        assert sorted(json.load(f)) == ["150-7.1", "150-8.0"]
+    assert ParamCache(path).descriptors("150-7.1")[41] == desc
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == ["descriptors.json"]
+
+
+def test_default_cache_path(monkeypatch, tmp_path):
+    monkeypatch.setenv(paramCache.PARAM_CACHE_ENV, str(tmp_path / "x.json"))
+    assert paramCache.default_cache_path() == str(tmp_path / "x.json")
+    monkeypatch.delenv(paramCache.PARAM_CACHE_ENV)
+    assert paramCache.default_cache_path().endswith(paramCache.PARAM_CACHE_FILE)
@@ -0,0 +1,50 @@
+import struct
+
+import pcccFrames
+from pcccFrames import PCCCEncoder, check_reply
+
+
+HEADER = bytes.fromhex("074d0031558b09")    # requestor ID
+
+
+def test_control_frame_layout():
+    buffer, tns = PCCCEncoder().control(pcccFrames.CMD_START, 30.0)
+    assert tns == 1
+    assert bytes(buffer) == (HEADER + bytes.fromhex("0f00" "0100" "67" "0000" "0300")
+                             + b"\x00$N41:0\x00" + bytes.fromhex("9909" "07" "42")
+                             + struct.pack("<3H", pcccFrames.CMD_START, 0, 3000))
+
+
+def test_typed_read_layout():
+    buffer, tns = PCCCEncoder().typed_read("N41:0", 3)
+    assert bytes(buffer) == (HEADER + bytes.fromhex("0f00" "0100" "68" "0000" "0300")
+                             + b"\x00$N41:0\x00" + struct.pack("<H", 3))
+
+
+def test_frame_buffer_is_reused_and_patched():
+    encoder = PCCCEncoder()
+    first, _ = encoder.control(pcccFrames.CMD_START, 10.0)
+    second, tns = encoder.control(pcccFrames.CMD_STOP, 20.5)
+    assert first is second
+    assert struct.unpack_from("<H", second, pcccFrames.TNS_OFFSET)[0] == tns == 2
+    assert struct.unpack_from("<3H", second, len(second) - 6) == (pcccFrames.CMD_STOP, 0, 2050)
+
+
+def test_negative_words_are_twos_complement():
+    buffer, _ = PCCCEncoder().typed_write("N41:0", [-1])
+    assert bytes(buffer[-2:]) == b"\xff\xff"
+
+
+def test_tns_wraps_and_skips_zero():
+    encoder = PCCCEncoder()
+    encoder._tns = 0xFFFE
+    assert [encoder.next_tns() for _ in range(3)] == [0xFFFF, 1, 2]
+
+
+def test_check_reply():
+    reply = HEADER + bytes([0x4F, 0x00]) + struct.pack("<H", 7) + b"\x01\x02"
+    assert check_reply(reply, 7) == (True, 0, b"\x01\x02")
+    assert check_reply(reply, 8)[0] is False
+    failed = HEADER + bytes([0x4F, 0x10]) + struct.pack("<H", 7)
+    assert check_reply(failed, 7) == (False, 0x10, b"")
+    assert check_reply(b"\x00", 7) == (False, None, b"")
@@ -0,0 +1,53 @@
+import pytest
+
+from sampleRecorder import SampleRecorder, read_binary
+
+
+COLUMNS = ["time_s", "voltage_V", "temperature_C"]
+ROWS = [(0.05 * i, 230.0 + i, 25.0 + 0.01 * i) for i in range(100)]
+
+
+def test_binary_round_trip(tmp_path):
+    path = str(tmp_path / "run.bin")
+    recorder = SampleRecorder(path, COLUMNS, chunkRows=16)
+    for row in ROWS:
+        recorder.append(row)
+    recorder.close()
+    assert recorder.rowsWritten == len(ROWS)
+    assert read_binary(path) == (COLUMNS, ROWS)
+
+
+def test_binary_ignores_partial_trailing_record(tmp_path):
+    path = str(tmp_path / "run.bin")
+    recorder = SampleRecorder(path, COLUMNS)
+    for row in ROWS[:3]:
+        recorder.append(row)
+    recorder.close()
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 5)
+    assert read_binary(path) == (COLUMNS, ROWS[:3])
+
+
+def test_binary_rotation(tmp_path):
+    recorder = SampleRecorder(str(tmp_path / "run.bin"), COLUMNS, chunkRows=10, rotateBytes=200)
+    for row in ROWS:
+        recorder.append(row)
+    recorder.close()
+    assert len(recorder.paths) > 1
+    assert [row for path in recorder.paths for row in read_binary(path)[1]] == ROWS
+
+
+def test_csv_header_and_rows(tmp_path):
+    path = str(tmp_path / "run.csv")
+    recorder = SampleRecorder(path, COLUMNS)
+    recorder.append((1.0, 2.5, 3.0))
+    recorder.close()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "time_s,voltage_V,temperature_C\n1.0,2.5,3.0\n"
+
+
+def test_read_binary_rejects_other_files(tmp_path):
+    path = tmp_path / "run.bin"
+    path.write_bytes(b"time_s,voltage_V\n")
+    with pytest.raises(ValueError):
+        read_binary(str(path))
@@ -0,0 +1,68 @@
+import pytest
+
+from acquisitionEngine import Sample
+from sensorFusion import SensorFusion
+
+
+def drive_sample(timestamp):
+    return Sample(timestamp, 0.05, 230.0, 3.0, 1700.0, 320.0, 0.002)
+
+
+def test_interpolates_between_readings():
+    fusion = SensorFusion()
+    fusion.add_transducer(1.0, {"torque": 10.0, "speed": 100.0})
+    fusion.add_transducer(1.1, {"torque": 20.0, "speed": 200.0})
+    sample = drive_sample(1.05)
+    fusion.add_drive(sample)
+    (fused,) = fusion.pop_ready(1.1)
+    assert fused.sample is sample
+    assert (fused.torque, fused.speed) == pytest.approx((15.0, 150.0))
+    assert fused.measured
+    assert fusion.stats()["interpolated"] == 1
+
+
+def test_waits_then_holds_or_gives_up():
+    fusion = SensorFusion(maxWait=0.2, maxAge=0.5)
+    fusion.add_transducer(1.0, {"torque": 10.0, "speed": 100.0})
+    fusion.add_drive(drive_sample(1.2))
+    fusion.add_drive(drive_sample(2.0))
+    assert fusion.pop_ready(1.3) == []                  # still inside maxWait
+
+    held, = fusion.pop_ready(1.45)
+    assert (held.torque, held.speed) == (10.0, 100.0)   # 0.2 s old: last reading is held
+
+    unmeasured, = fusion.pop_ready(2.3)
+    assert unmeasured.torque is None and not unmeasured.measured
+    assert fusion.stats() == {"interpolated": 0, "held": 1, "unmeasured": 1, "pending": 0}
+
+
+def test_keeps_order_and_flushes():
+    fusion = SensorFusion()
+    fusion.add_transducer(1.0, {"torque": 1.0, "speed": 1.0})
+    fusion.add_drive(drive_sample(1.5))
+    fusion.add_drive(drive_sample(0.99))
+    # The second sample could be aligned, but not ahead of the first one
+    assert fusion.pop_ready(1.6) == []
+    flushed = fusion.pop_ready(float("inf"))
+    assert [f.sample.timestamp for f in flushed] == [1.5, 0.99]
+
+
+def test_out_of_order_readings_are_dropped():
+    fusion = SensorFusion()
+    fusion.add_transducer(2.0, {"torque": 1.0, "speed": 1.0})
+    fusion.add_transducer(1.0, {"torque": 5.0, "speed": 5.0})
+    fusion.add_drive(drive_sample(2.0))
+    (fused,) = fusion.pop_ready(2.0)
+    assert fused.torque == 1.0
+
+
+def test_readings_without_torque_or_speed_are_ignored():
+    fusion = SensorFusion()
+    fusion.add_transducer(1.0, {"torque": 10.0, "speed": 100.0})
+    fusion.add_transducer(1.05, {"temperature": 41.5})         # thermocouple polled on its own
+    fusion.add_transducer(1.1, {"torque": 20.0, "speed": 200.0})
+    fusion.add_drive(drive_sample(1.04))
+    fusion.add_drive(drive_sample(1.06))
+    first, second = fusion.pop_ready(1.1)
+    assert (first.torque, first.speed) == pytest.approx((14.0, 140.0))
+    assert (second.torque, second.speed) == pytest.approx((16.0, 160.0))
@@ -0,0 +1,49 @@
+import pytest
+
+from speedProfile import SpeedProfile, duty_cycle
+
+
+def test_steps_ramps_and_repeats():
+    profile = SpeedProfile.from_json({"segments": [
+        {"step": 30, "duration": 10},
+        {"ramp": [30, 60], "duration": 5},
+        {"repeat": 2, "segments": [{"step": 60, "duration": 2}, {"step": 0, "duration": 1}]},
+    ]})
+    assert profile.duration == 21
+    assert profile.setpoint(0) == 30
+    assert profile.setpoint(9.99) == 30
+    assert profile.setpoint(12.5) == pytest.approx(45)
+    assert profile.setpoint(15) == 60
+    assert profile.setpoint(17.5) == 0
+    assert profile.setpoint(18) == 60
+    assert profile.setpoint(21) is None
+    assert profile.setpoint(-1) is None
+    assert profile.finalHz == 0
+    assert profile.next_boundary(0) == 10
+    assert profile.next_boundary(10) == 15
+    assert profile.next_boundary(20.5) == 21
+
+
+def test_shorthand_pairs():
+    profile = SpeedProfile.from_json([[60, 30], [3600, 60]])
+    assert profile.timeline == [(0.0, 60.0, 30.0, 30.0), (60.0, 3600.0, 60.0, 60.0)]
+
+
+@pytest.mark.parametrize("segment", [{"step": 30, "duration": 0}, {"hold": 30, "duration": 1}])
+def test_invalid_segments(segment):
+    with pytest.raises(ValueError):
+        SpeedProfile([segment])
+
+
+def test_duty_cycles():
+    assert duty_cycle("S1", 50, period=60, cycles=3) == [{"step": 50, "duration": 180}]
+    assert duty_cycle("S2", 50, period=60, dutyFactor=0.25) == [{"step": 50, "duration": 15},
+                                                                {"step": 0.0, "duration": 45}]
+    s3 = SpeedProfile(duty_cycle("S3", 50, period=60, dutyFactor=0.25, cycles=4))
+    assert s3.duration == 240
+    assert [s3.setpoint(t) for t in (0, 15, 60, 75)] == [50, 0, 50, 0]
+    s6 = SpeedProfile(duty_cycle("S6", 50, period=60, dutyFactor=0.5, cycles=2, restHz=20))
+    assert [s6.setpoint(t) for t in (0, 30, 60, 90)] == [50, 20, 50, 20]
+    assert duty_cycle("S3", 50, dutyFactor=1.0) == [{"repeat": 1, "segments": [{"step": 50, "duration": 600.0}]}]
+    with pytest.raises(ValueError):
+        duty_cycle("S4", 50)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import temperatureCalculation
+from temperatureCalculation import TemperatureCalculation, replay_trajectory
+
+
+def run():
+    """Losses (kW) and irregular sample times, including a stretch with no loss."""
+    rng = np.random.default_rng(7)
+    n = 600
+    times = np.cumsum(rng.uniform(0.04, 0.06, n))
+    times[300:] += 2.0                                          # a stall between samples
+    loss = np.where(np.arange(n) < 400, 0.3 + 0.05 * rng.standard_normal(n), 0.0)
+    return loss, times
+
+
+@pytest.mark.parametrize("integrator", ["euler", "exact"])
+def test_replay_matches_step_by_step(integrator):
+    loss, times = run()
+    model = TemperatureCalculation()
+    model.integrator = integrator
+    expected = []
+    prev = times[0]
+    for value, t in zip(loss, times):
+        model.UpdateParameters(value, t - prev)
+        prev = t
+        expected.append((model.currentTemperature, model.currDeltaTemp, model.maximumTemp))
+
+    trajectory = replay_trajectory(loss, times, model.SurfaceArea, model.SpecificHeatDisipation,
+                                   model.WeightActiveParts, model.SpecificHeat, model.ambientTemperature,
+                                   integrator=integrator)
+    expected = np.array(expected)
+    np.testing.assert_allclose(trajectory.temperature, expected[:, 0], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(trajectory.deltaTemp, expected[:, 1], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(trajectory.maximumTemp, expected[:, 2])
+
+
+def test_euler_snaps_small_rise_to_zero():
+    model = TemperatureCalculation()
+    model.UpdateParameters(0.0, 0.05)
+    assert model.currDeltaTemp == 0
+    trajectory = replay_trajectory([0.0, 0.0], [0.0, 0.05], model.SurfaceArea, model.SpecificHeatDisipation,
+                                   model.WeightActiveParts, model.SpecificHeat, 25.0)
+    assert list(trajectory.temperature) == [25.0, 25.0]
+
+
+def test_replay_run_uses_model_constants():
+    loss, times = run()
+    model = TemperatureCalculation()
+    model.ApplyProfile({"integrator": "exact", "ambientTemperature": 20.0})
+    trajectory = model.ReplayRun(loss, times)
+    assert trajectory.temperature[0] == pytest.approx(20.0)
+    assert model.currDeltaTemp == 0                              # live state untouched
+
+
+def test_replay_rejects_network_integrator():
+    with pytest.raises(ValueError):
+        replay_trajectory([0.1], [0.0], 1, 1, 1, 1, 25, integrator="network")
+
+
+def test_exact_step_reaches_steady_state():
+    model = TemperatureCalculation()
+    model.integrator = "exact"
+    for _ in range(200):
+        model.UpdateParameters(0.5, 3600 * 30)
+    assert model.currDeltaTemp == pytest.approx(model.maximumTemp)
+    assert temperatureCalculation.INTEGRATORS == ("euler", "exact", "network")
+
+
+def test_apply_profile_selects_integrator():
+    model = TemperatureCalculation()
+    model.ApplyProfile({"integrator": "network"})
+    assert model.integrator == "network"
+    assert model.timeScale == pytest.approx(1 / 30)
+    with pytest.raises(ValueError, match="unknown integrator"):
+        model.ApplyProfile({"integrator": "rk4"})
+    assert model.integrator == "network"
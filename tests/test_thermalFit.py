@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+
+import temperatureCalculation
+import thermalFit
+from acquisitionEngine import Sample
+from derivedQuantities import Pipeline, RECORD_COLUMNS, record_row
+from sampleRecorder import SampleRecorder
+
+
+def record_run(path, measured):
+    """A recording as the GUI / headless runner write it, with the given thermocouple readings."""
+    pipeline = Pipeline(temperatureCalculation.TemperatureCalculation())
+    recorder = SampleRecorder(path, RECORD_COLUMNS)
+    for i, temperature in enumerate(measured):
+        sample = Sample(10.0 + i, 0.0 if i == 0 else 1.0, 230.0, 3.0, 1700.0, 320.0, 0.002)
+        recorder.append(record_row(pipeline.process(sample, commandedFreq=60.0, measuredTemp=temperature)))
+    recorder.close()
+
+
+@pytest.mark.parametrize("ext", [".csv", ".bin"])
+def test_load_run_from_own_recording(tmp_path, ext):
+    path = str(tmp_path / ("run" + ext))
+    record_run(path, [None, 25.0, 25.5, None, 26.0])
+    run = thermalFit.load_run(path)
+    assert run["time"] == pytest.approx([0, 1, 2, 3, 4])
+    assert math.isnan(run["measured"][0]) and math.isnan(run["measured"][3])
+    assert run["ambient"] == 25.0
+    assert run["maxStep"] == pytest.approx(1.0)
+
+
+def test_load_run_without_thermocouple(tmp_path):
+    path = str(tmp_path / "run.csv")
+    record_run(path, [None, None])
+    with pytest.raises(ValueError, match="no measured temperatures"):
+        thermalFit.load_run(path)
+
+
+def test_load_run_with_external_columns(tmp_path):
+    path = tmp_path / "logger.csv"
+    path.write_text("t,P_loss,TC1\n0,0.2,21.0\n5,0.2,21.4\n", encoding="utf-8")
+    run = thermalFit.load_run(str(path), "t", "P_loss", "TC1")
+    np.testing.assert_allclose(run["loss"], [0.2, 0.2])
+    assert run["ambient"] == 21.0
+    with pytest.raises(ValueError, match="'measured_temp_C'"):
+        thermalFit.load_run(str(path), "t", "P_loss")
+
+
+def synthetic_run(integrator, timeScale, heatCapacity=4000.0, dissipation=2.0, n=400, step=5.0):
+    times = np.arange(n) * step
+    loss = np.where(np.arange(n) < n // 2, 0.05, 0.0)
+    trajectory = temperatureCalculation.replay_trajectory(loss, times, 1.0, dissipation, 1.0, heatCapacity, 22.0,
+                                                          integrator=integrator, timeScale=timeScale)
+    return {"time": times, "loss": loss, "measured": trajectory.temperature, "ambient": 22.0,
+            "maxStep": step}
+
+
+def test_run_cost_guard_uses_time_scale():
+    run = synthetic_run("euler", 1 / 30)
+    # dissipation * dt * timeScale / heat capacity: 1000 * 5 / 30 / 4000 < 2, but 1000 * 5 * 2 / 4000 >= 2
+    assert math.isfinite(thermalFit.run_cost([run], 4000.0, 1000.0, "euler", 1 / 30))
+    assert thermalFit.run_cost([run], 4000.0, 1000.0, "euler", 2.0) == math.inf
+    # The exact step cannot diverge
+    assert math.isfinite(thermalFit.run_cost([run], 4000.0, 1000.0, "exact", 2.0))
+
+
+def test_run_cost_is_zero_for_the_generating_model():
+    run = synthetic_run("exact", 0.5)
+    assert thermalFit.run_cost([run], 4000.0, 2.0, "exact", 0.5) == pytest.approx(0.0, abs=1e-12)
+    assert thermalFit.run_cost([run], 4000.0, 2.0, "euler", 0.5) > 1e-6
+
+
+def test_fit_uses_the_profile_integrator():
+    run = synthetic_run("exact", 0.5)
+    initial = dict(thermalFit.calculator_profile(), WeightActiveParts=1.0, SpecificHeat=3000.0,
+                   SurfaceArea=1.0, SpecificHeatDisipation=3.0, integrator="exact", timeScale=0.5)
+    profile, cost = thermalFit.fit_runs([run], initial, workers=1, points=9, levels=8, span=4.0)
+    assert (profile["integrator"], profile["timeScale"]) == ("exact", 0.5)
+    assert profile["SpecificHeat"] == pytest.approx(4000.0, rel=0.02)
+    assert profile["SpecificHeatDisipation"] == pytest.approx(2.0, rel=0.02)
+
+
+def test_fit_rejects_the_network_integrator():
+    with pytest.raises(ValueError, match="network"):
+        thermalFit.fit_runs([], dict(thermalFit.calculator_profile(), integrator="network"), workers=1)
@@ -0,0 +1,228 @@
+"""
+Fit motor thermal constants for TemperatureCalculation against recorded runs.
+
+A run is a recording (CSV or .bin from SampleRecorder) that also holds a measured
+winding/frame temperature column. headlessRunner recordings have it as measured_temp_C,
+filled in when a thermocouple is configured on the transducer bus (see headlessRunner.py);
+the GUI does not read a thermocouple, so its recordings leave that column empty.
+Recordings from elsewhere work too: name their time, loss (kW) and temperature columns
+with --time-column / --loss-column / --measured-column.
+Candidate constants are replayed through temperatureCalculation.replay_trajectory with
+the integrator and timeScale of the model being fitted (the starting profile's, or
+--integrator / --time-scale) and scored by the sum of squared errors against the
+measured temperature. The network integrator has no batch replay and cannot be fitted.
+
+The model only depends on two groups of constants:
+    heat capacity  = WeightActiveParts * SpecificHeat
+    dissipation    = SurfaceArea * SpecificHeatDisipation
+so those are what is fitted. WeightActiveParts and SurfaceArea are physical quantities
+you can measure; they are held at the starting profile's values and SpecificHeat /
+SpecificHeatDisipation absorb the fitted result.
+
+Usage:
+    python thermalFit.py run1.csv run2.bin --name 10340 --profiles motor_profiles.json
+    python thermalFit.py logger.csv --name 10340 --time-column t --loss-column P_loss --measured-column TC1
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import temperatureCalculation
+from sampleRecorder import read_binary
+
+
+PROFILE_FILE = "motor_profiles.json"
+PROFILE_FIELDS = ["SurfaceArea", "StatorResistance", "WeightActiveParts", "SpecificHeat",
+                  "SpecificHeatDisipation", "TorqueConstant", "ambientTemperature",
+                  "integrator", "timeScale"]
+FIT_INTEGRATORS = ("euler", "exact")    # integrators replay_trajectory can replay
+
+TIME_COLUMN = "time_s"
+LOSS_COLUMN = "power_loss_kW"
+MEASURED_COLUMN = "measured_temp_C"     # derivedQuantities.RECORD_FIELDS measuredTemp
+
+GRID_POINTS = 24        # candidates per axis on each refinement level
+GRID_LEVELS = 6         # zoom levels
+GRID_SPAN = 100.0       # first level searches initial / SPAN .. initial * SPAN on each axis
+
+
+# -------------------------------------------------------------
+# Runs
+# -------------------------------------------------------------
+
+def load_run(path, timeColumn=TIME_COLUMN, lossColumn=LOSS_COLUMN, measuredColumn=MEASURED_COLUMN):
+    """Load one recorded run as a dict of float arrays: time, loss, measured."""
+    if path.lower().endswith(".bin"):
+        columns, rows = read_binary(path)
+        data = np.array(rows, dtype=float).reshape(-1, len(columns))
+        get = lambda name: data[:, columns.index(name)]
+    else:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+            columns = reader.fieldnames or []
+        get = lambda name: np.array([float(r[name]) if r[name] != "" else math.nan for r in rows])
+
+    missing = [name for name in (timeColumn, lossColumn, measuredColumn) if name not in columns]
+    if missing:
+        raise ValueError(f"{path}: no column {', '.join(map(repr, missing))} (columns: {', '.join(columns)})")
+    run = {"time": get(timeColumn), "loss": get(lossColumn), "measured": get(measuredColumn)}
+    valid = run["measured"][np.isfinite(run["measured"])]
+    if not valid.size:
+        raise ValueError(f"{path}: no measured temperatures in column {measuredColumn!r}")
+    # Motor starts the run at ambient, so the first reading is the ambient for that run
+    run["ambient"] = float(valid[0])
+    run["maxStep"] = float(np.max(np.diff(run["time"]), initial=0.0))
+    return run
+
+
+# -------------------------------------------------------------
+# Cost evaluation (runs in worker processes)
+# -------------------------------------------------------------
+
+_workerRuns = None
+_workerModel = {}
+
+
+def _init_worker(runs, model):
+    global _workerRuns, _workerModel
+    _workerRuns = runs
+    _workerModel = model
+
+
+def run_cost(runs, heatCapacity, dissipation, integrator="euler",
+             timeScale=temperatureCalculation.TemperatureCalculation.timeScale):
+    """
+    Sum of squared temperature errors over all runs for one (heat capacity, dissipation)
+    pair, replayed with the given integrator and deltaTime scaling.
+    """
+    cost = 0.0
+    for run in runs:
+        # The Euler step diverges once dissipation * dt * timeScale / heat capacity exceeds 2
+        if integrator == "euler" and dissipation * run["maxStep"] * timeScale / heatCapacity >= 2:
+            return math.inf
+        # Unit surface area / weight: the replay only sees the products
+        model = temperatureCalculation.replay_trajectory(
+            run["loss"], run["time"], 1.0, dissipation, 1.0, heatCapacity, run["ambient"],
+            integrator=integrator, timeScale=timeScale)
+        err = model.temperature - run["measured"]
+        with np.errstate(over="ignore", invalid="ignore"):
+            cost += float(np.nansum(err * err))
+    return cost
+
+
+def _cost_batch(candidates):
+    return [run_cost(_workerRuns, hc, dis, **_workerModel) for hc, dis in candidates]
+
+
+# -------------------------------------------------------------
+# Fitting
+# -------------------------------------------------------------
+
+def fit_runs(runs, initial, workers=None, points=GRID_POINTS, levels=GRID_LEVELS, span=GRID_SPAN):
+    """
+    Least-squares fit of the motor's thermal constants.
+    initial: dict with at least the four thermal constants (e.g. a motor profile); its
+    integrator and timeScale, if present, select how the model is replayed
+    Returns (profile, cost) where profile is a copy of initial with fitted constants.
+
+    Every level evaluates a points x points log-spaced grid of candidates in parallel
+    across a process pool, then zooms in around the best candidate.
+    """
+    model = {"integrator": initial.get("integrator", temperatureCalculation.TemperatureCalculation.integrator),
+             "timeScale": initial.get("timeScale", temperatureCalculation.TemperatureCalculation.timeScale)}
+    if model["integrator"] not in FIT_INTEGRATORS:
+        raise ValueError(f"cannot fit the {model['integrator']!r} integrator, only {', '.join(FIT_INTEGRATORS)}")
+    heatCapacity = initial["WeightActiveParts"] * initial["SpecificHeat"]
+    dissipation = initial["SurfaceArea"] * initial["SpecificHeatDisipation"]
+    logSpan = math.log(span)
+    best = (math.inf, heatCapacity, dissipation)
+
+    nWorkers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=nWorkers, initializer=_init_worker, initargs=(runs, model)) as pool:
+        for _ in range(levels):
+            offsets = np.linspace(-logSpan, logSpan, points)
+            candidates = [(best[1] * math.exp(a), best[2] * math.exp(b)) for a in offsets for b in offsets]
+
+            # One batch per worker keeps the runs resident and the IPC small
+            size = math.ceil(len(candidates) / nWorkers)
+            batches = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+            costs = [c for batch in pool.map(_cost_batch, batches) for c in batch]
+
+            i = int(np.argmin(costs))
+            if costs[i] < best[0]:
+                best = (costs[i], candidates[i][0], candidates[i][1])
+            # Next level searches +/- two grid steps around the best point
+            logSpan = 2 * (2 * logSpan / (points - 1))
+
+    cost, heatCapacity, dissipation = best
+    profile = dict(initial, **model)
+    profile["SpecificHeat"] = heatCapacity / initial["WeightActiveParts"]
+    profile["SpecificHeatDisipation"] = dissipation / initial["SurfaceArea"]
+    return profile, cost
+
+
+# -------------------------------------------------------------
+# Motor profiles
+# -------------------------------------------------------------
+
+def calculator_profile(calculator=None):
+    """Current constants of a TemperatureCalculation (class defaults if none given) as a profile dict."""
+    calculator = calculator or temperatureCalculation.TemperatureCalculation
+    return {name: getattr(calculator, name) for name in PROFILE_FIELDS}
+
+
+def load_profiles(path=PROFILE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_profile(name, profile, path=PROFILE_FILE):
+    profiles = load_profiles(path)
+    profiles[name] = {k: profile[k] for k in PROFILE_FIELDS if k in profile}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Fit motor thermal constants to recorded runs")
+    parser.add_argument("runs", nargs="+", help="CSV or .bin recordings with a measured temperature column")
+    parser.add_argument("--name", required=True, help="motor profile name to save the result as")
+    parser.add_argument("--profiles", default=PROFILE_FILE, help="motor profile file")
+    parser.add_argument("--start", help="existing profile to start from (default: TemperatureCalculation constants)")
+    parser.add_argument("--time-column", default=TIME_COLUMN, help="elapsed time column (s)")
+    parser.add_argument("--loss-column", default=LOSS_COLUMN, help="power loss column (kW)")
+    parser.add_argument("--measured-column", default=MEASURED_COLUMN, help="measured temperature column (degC)")
+    parser.add_argument("--integrator", choices=FIT_INTEGRATORS,
+                        help="TemperatureCalculation integrator to fit for (default: the starting profile's)")
+    parser.add_argument("--time-scale", type=float,
+                        help="deltaTime scaling of the model (default: the starting profile's, 1/30)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    initial = load_profiles(args.profiles)[args.start] if args.start else calculator_profile()
+    if args.integrator:
+        initial["integrator"] = args.integrator
+    if args.time_scale:
+        initial["timeScale"] = args.time_scale
+    runs = [load_run(p, args.time_column, args.loss_column, args.measured_column) for p in args.runs]
+
+    profile, cost = fit_runs(runs, initial, workers=args.workers)
+    samples = sum(int(np.isfinite(r["measured"]).sum()) for r in runs)
+    print(f"RMS error: {math.sqrt(cost / max(samples, 1)):.3f} C over {samples} samples")
+    print(f"SpecificHeat = {profile['SpecificHeat']:.6g}")
+    print(f"SpecificHeatDisipation = {profile['SpecificHeatDisipation']:.6g}")
+
+    save_profile(args.name, profile, args.profiles)
+    print(f"Saved profile '{args.name}' to {args.profiles}")